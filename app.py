@@ -1,12 +1,16 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 import os
-from transformers import pipeline, AutoTokenizer, AutoModelForQuestionAnswering
-import torch
 import re
 import logging
 from datetime import datetime
 
+from utils.bm25 import get_chunk_retriever
+from utils.corpus_watcher import CorpusWatcher
+from utils.model_registry import model_registry, warm_up
+from utils.warmup import Warmup
+from utils.sse import PERSONA_HEADERS, SSE_HEADERS, sse_event, strip_persona_header
+
 app = Flask(__name__)
 CORS(app)
 
@@ -33,6 +37,25 @@ def extract_md_text(md_path):
         logger.error(f"Erro ao extrair arquivo Markdown: {e}")
         return ""
 
+def reload_md_text(key, path):
+    """Recarrega o Markdown alterado sem reiniciar; o índice BM25 é refeito para o novo texto"""
+    global md_text
+    new_text = extract_md_text(path)
+    if new_text:
+        md_text = new_text
+
+def load_md_content():
+    """Carrega o Markdown e passa a observar mudanças no arquivo"""
+    global md_text
+    if os.path.exists(MD_PATH):
+        md_text = extract_md_text(MD_PATH)
+    else:
+        logger.warning(f"Arquivo Markdown não encontrado: {MD_PATH}")
+        md_text = "Arquivo Markdown não disponível"
+    
+    # Observa o Markdown e recarrega o conteúdo quando ele mudar
+    CorpusWatcher({"tese": MD_PATH}, reload_md_text).start()
+
 def load_ai_model():
     """Carrega o modelo de IA gratuito do Hugging Face"""
     global qa_pipeline, tokenizer, model
@@ -41,28 +64,24 @@ def load_ai_model():
         model_name = "kimie/kimie2-pt-qa:free"
         logger.info(f"Carregando modelo: {model_name}")
         
-        qa_pipeline = pipeline(
-            "question-answering",
-            model=model_name,
-            tokenizer=model_name,
-            device=-1 if not torch.cuda.is_available() else 0
-        )
+        # Modelo compartilhado do processo; backend por QA_BACKEND (torch/quantized/onnx),
+        # requisições concorrentes compartilham o forward pass
+        qa_pipeline = model_registry.acquire("qa", model_name)
+        warm_up("qa", qa_pipeline)
         logger.info("Modelo carregado com sucesso")
     except Exception as e:
         logger.error(f"Erro ao carregar modelo: {e}")
         qa_pipeline = None
+        raise
+
+# Conteúdo e modelo carregados em segundo plano; o servidor aceita conexões desde o início
+warmup = Warmup("app-warmup").add("md_text", load_md_content).add("qa_model", load_ai_model)
 
 def find_relevant_context(question, full_text, max_length=4000):
     """Encontra o contexto mais relevante para a pergunta"""
-    # Divide o texto em chunks menores
-    chunks = []
-    chunk_size = 2000
-    overlap = 200
-    
-    for i in range(0, len(full_text), chunk_size - overlap):
-        chunk = full_text[i:i + chunk_size]
-        if chunk.strip():
-            chunks.append(chunk)
+    # Índice BM25 dos chunks (construído uma vez por corpus)
+    retriever = get_chunk_retriever(full_text, 2000, 200)
+    chunks = retriever.documents
     
     # Se temos poucos chunks, retorna o texto completo
     if len(chunks) <= 2:
@@ -73,19 +92,8 @@ def find_relevant_context(question, full_text, max_length=4000):
         return chunks[0][:max_length]
     
     # Busca por palavras-chave na pergunta
-    question_words = set(re.findall(r'\w+', question.lower()))
-    
-    best_chunk = chunks[0]
-    best_score = 0
-    
-    for chunk in chunks:
-        chunk_words = set(re.findall(r'\w+', chunk.lower()))
-        common_words = question_words.intersection(chunk_words)
-        score = len(common_words) / len(question_words) if question_words else 0
-        
-        if score > best_score:
-            best_score = score
-            best_chunk = chunk
+    results = retriever.search(question, top_k=1)
+    best_chunk = chunks[results[0][0]] if results else chunks[0]
     
     return best_chunk[:max_length]
 
@@ -93,9 +101,16 @@ def answer_question(question, persona):
     """Responde à pergunta usando o modelo de IA"""
     global qa_pipeline, md_text
     
-    if not qa_pipeline or not md_text:
+    # Corpus ainda carregando: espera limitada, como o modelo de QA; contingência só se a carga falhou
+    if not md_text:
+        warmup.wait("md_text")
+    if not md_text:
         return fallback_response(persona, "Modelo não disponível")
     
+    # Modelo ainda carregando (espera limitada) ou indisponível: resposta só por palavras-chave
+    if not qa_pipeline and not warmup.wait("qa_model"):
+        return enhanced_fallback_response(question, persona, find_relevant_context(question, md_text))
+    
     try:
         # Encontra contexto relevante
         context = find_relevant_context(question, md_text)
@@ -315,6 +330,34 @@ def chat_api():
         logger.error(f"Erro na API de chat: {e}")
         return jsonify({"error": "Erro interno do servidor"}), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream_api():
+    """Versão em streaming (SSE) de /api/chat: cabeçalho da persona primeiro, depois a resposta do QA"""
+    data = request.get_json(force=True, silent=True)
+    if not data:
+        return jsonify({"error": "JSON inválido ou vazio"}), 400
+
+    question = data.get('question', '').strip()
+    personality_id = data.get('personality_id')
+
+    if not question:
+        return jsonify({"error": "Pergunta não fornecida"}), 400
+
+    if not personality_id or personality_id not in ['dr_gasnelio', 'ga']:
+        return jsonify({"error": "Personalidade inválida"}), 400
+
+    def generate():
+        yield sse_event("header", {"text": PERSONA_HEADERS[personality_id]})
+        try:
+            response = answer_question(question, personality_id)
+            yield sse_event("delta", {"text": strip_persona_header(personality_id, response["answer"])})
+            yield sse_event("done", {"confidence": response.get("confidence")})
+        except Exception as e:
+            logger.error(f"Erro na API de chat (stream): {e}")
+            yield sse_event("error", {"error": "Erro interno do servidor"})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Verificação de saúde da API"""
@@ -322,6 +365,9 @@ def health_check():
         "status": "healthy",
         "model_loaded": qa_pipeline is not None,
         "pdf_loaded": len(md_text) > 0,
+        "qa_batcher": qa_pipeline.stats() if qa_pipeline is not None else None,
+        "models": model_registry.memory_report(),
+        "readiness": warmup.report(),
         "timestamp": datetime.now().isoformat()
     })
 
@@ -341,18 +387,8 @@ def api_info():
     })
 
 if __name__ == '__main__':
-    # Inicialização
     logger.info("Iniciando aplicação...")
-    
-    # Carrega o PDF
-    if os.path.exists(MD_PATH):
-        md_text = extract_md_text(MD_PATH)
-    else:
-        logger.warning(f"Arquivo Markdown não encontrado: {MD_PATH}")
-        md_text = "Arquivo Markdown não disponível"
-    
-    # Carrega o modelo de IA
-    load_ai_model()
+    warmup.start()
     
     # Inicia o servidor
     port = int(os.environ.get('PORT', 5000))
@@ -1,17 +1,17 @@
 from flask import Flask, request, jsonify, render_template_string
 from flask_cors import CORS
 import os
-import json
-import re
-from transformers import pipeline
-import torch
-from sentence_transformers import SentenceTransformer
-import numpy as np
 import hashlib
-import pickle
 from datetime import datetime
 import logging
 
+from utils.corpus_store import CorpusStore
+from utils.embedding_index import EmbeddingIndex
+from utils.index_artifact import CHUNK_SIZE, IndexArtifact, chunk_source, read_source
+from utils.query_embedding_cache import query_embedding_cache
+from utils.model_registry import model_registry, warm_up
+from utils.warmup import Warmup
+
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,30 +19,70 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
 class MultiDiseaseChatbot:
     def __init__(self):
         self.diseases = {}
         self.qa_pipeline = None
+        self.qa_engine = None
         self.embedding_model = None
         self.cache = {}
-        self.load_models()
+        self.corpus_store = CorpusStore(self.build_corpus)
+        self.corpus_store.listeners.append(self.on_corpus_swap)
+        self.index_artifact = IndexArtifact.open()
         self.load_diseases()
+        
+        # Modelos (com inferência de aquecimento) em segundo plano: o servidor sobe sem esperá-los;
+        # a carga começa no processo que atende (hook do gunicorn, __main__ ou primeira pergunta)
+        self.warmup = Warmup("multi-disease-warmup").add("models", self.load_models)
     
     def load_models(self):
         """Carrega os modelos de IA"""
         try:
             logger.info("Carregando modelos de IA...")
-            self.qa_pipeline = pipeline(
-                "question-answering",
-                model="deepset/roberta-base-squad2",
-                device=-1 if not torch.cuda.is_available() else 0
-            )
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            # Modelos compartilhados do processo; backend por QA_BACKEND (torch/quantized/onnx),
+            # requisições de qualquer doença compartilham o forward pass
+            self.qa_pipeline = model_registry.acquire("qa", "deepset/roberta-base-squad2")
+            self.qa_engine = self.qa_pipeline.pipeline
+            self.embedding_model = model_registry.acquire("embedding", EMBEDDING_MODEL)
+            warm_up("qa", self.qa_pipeline)
+            warm_up("embedding", self.embedding_model)
             logger.info("Modelos carregados com sucesso!")
         except Exception as e:
             logger.error(f"Erro ao carregar modelos: {e}")
             raise
     
+    def build_corpus(self, pdf_path, previous=None):
+        """Extrai, divide e indexa o PDF de uma doença (chamado pelo corpus_store)"""
+        corpus = None
+        if self.index_artifact is not None and previous is None:
+            corpus = self.index_artifact.source_corpus(pdf_path, EMBEDDING_MODEL)
+        if corpus is None:
+            text = self.extract_text_from_pdf(pdf_path)
+            chunks = self.chunk_text(text) if text else []
+            # PDF alterado: só os chunks novos são recalculados
+            reuse = (previous.chunks, previous.index) if previous is not None else None
+            index = EmbeddingIndex.build(chunks, self.embedding_model, EMBEDDING_MODEL, previous=reuse,
+                                         source=os.path.basename(pdf_path))
+            corpus = (text, chunks, index)
+        # Tokens dos chunks para o modelo de QA calculados na indexação
+        if self.qa_engine is not None:
+            self.qa_engine.pretokenize(corpus[1])
+        return corpus
+    
+    def answer_cache_key(self, disease_id, personality_id, question):
+        """Chave do cache de respostas com a versão (hash) do corpus; None se o corpus não está carregado e atual"""
+        version = self.corpus_store.version(disease_id, self.diseases[disease_id]["pdf_path"])
+        if version is None:
+            return None
+        return f"{disease_id}_{version[:16]}_{personality_id}_{hashlib.md5(question.encode()).hexdigest()}"
+    
+    def on_corpus_swap(self, disease_id, previous, current):
+        """Libera as respostas em cache da versão anterior do PDF (a chave já inclui a versão)"""
+        for cache_key in [key for key in list(self.cache) if key.startswith(f"{disease_id}_")]:
+            self.cache.pop(cache_key, None)
+    
     def load_diseases(self):
         """Carrega todas as doenças configuradas"""
         try:
@@ -125,7 +165,8 @@ class MultiDiseaseChatbot:
                 "id": disease_id,
                 "name": disease["name"],
                 "description": disease["description"],
-                "pdf_exists": os.path.exists(disease["pdf_path"])
+                "pdf_exists": os.path.exists(disease["pdf_path"]),
+                "corpus": self.corpus_store.status(disease_id, disease["pdf_path"])
             }
             for disease_id, disease in self.diseases.items()
         ]
@@ -145,54 +186,20 @@ class MultiDiseaseChatbot:
             for personality_id, personality in self.diseases[disease_id]["personalities"].items()
         ]
     
-    def chunk_text(self, text, chunk_size=2000, overlap=200):
-        """Divide o texto em chunks menores"""
-        if len(text) <= chunk_size:
-            return [text]
-        
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            
-            if end >= len(text):
-                chunks.append(text[start:])
-                break
-            
-            # Tenta quebrar em uma quebra de linha ou espaço
-            last_newline = text.rfind('\n', start, end)
-            last_space = text.rfind(' ', start, end)
-            
-            if last_newline > start + chunk_size * 0.8:
-                end = last_newline + 1
-            elif last_space > start + chunk_size * 0.8:
-                end = last_space + 1
-            
-            chunks.append(text[start:end])
-            start = end - overlap
-        
-        return chunks
+    def chunk_text(self, text, chunk_size=CHUNK_SIZE):
+        """Divide o texto em chunks por seção/parágrafo (mesmo tamanho do índice em disco)"""
+        return chunk_source(text, chunk_size)
     
     def extract_text_from_pdf(self, pdf_path):
-        """Extrai texto do PDF"""
+        """Extrai texto do PDF (mesma extração do build_index.py)"""
         try:
-            import PyPDF2
-            
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                
-                return text.strip()
+            return read_source(pdf_path)
         except Exception as e:
             logger.error(f"Erro ao extrair texto do PDF {pdf_path}: {e}")
             return ""
     
-    def get_relevant_chunks(self, question, disease_id, top_k=3):
-        """Encontra os chunks mais relevantes para a pergunta"""
+    def get_relevant_chunks(self, question, disease_id, top_k=3, with_scores=False):
+        """Encontra os chunks mais relevantes para a pergunta (com scores, se pedido)"""
         if disease_id not in self.diseases:
             return []
         
@@ -202,27 +209,20 @@ class MultiDiseaseChatbot:
             logger.warning(f"PDF não encontrado: {pdf_path}")
             return []
         
-        # Extrair texto do PDF
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text:
+        # Texto, chunks e embeddings ficam em memória; reconstruídos só se o PDF mudar
+        corpus = self.corpus_store.get(disease_id, pdf_path)
+        if corpus is None or not corpus.chunks:
             return []
         
-        # Dividir em chunks
-        chunks = self.chunk_text(text)
-        
-        # Calcular embeddings
-        question_embedding = self.embedding_model.encode(question)
-        chunk_embeddings = self.embedding_model.encode(chunks)
-        
-        # Calcular similaridade
-        similarities = np.dot(chunk_embeddings, question_embedding) / (
-            np.linalg.norm(chunk_embeddings, axis=1) * np.linalg.norm(question_embedding)
-        )
+        # Top_k chunks mais relevantes (busca aproximada IVF em corpora grandes)
+        # Embedding compartilhado entre doenças e personalidades
+        question_embedding = query_embedding_cache.encode(self.embedding_model, question, EMBEDDING_MODEL)
+        top_indices, similarities = corpus.index.search(question_embedding, top_k)
         
-        # Pegar os top_k chunks mais relevantes
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        
-        return [chunks[i] for i in top_indices if similarities[i] > 0.1]
+        scored_chunks = [(corpus.chunks[i], float(score)) for i, score in zip(top_indices, similarities) if score > 0.1]
+        if with_scores:
+            return scored_chunks
+        return [chunk for chunk, _ in scored_chunks]
     
     def answer_question(self, question, disease_id, personality_id):
         """Responde uma pergunta sobre uma doença específica"""
@@ -238,13 +238,27 @@ class MultiDiseaseChatbot:
                 "available_personalities": self.get_disease_personalities(disease_id)
             }
         
-        # Verificar cache
-        cache_key = f"{disease_id}_{personality_id}_{hashlib.md5(question.encode()).hexdigest()}"
-        if cache_key in self.cache:
+        # Verificar cache (só vale para a versão atual do PDF)
+        cache_key = self.answer_cache_key(disease_id, personality_id, question)
+        if cache_key is not None and cache_key in self.cache:
             return self.cache[cache_key]
         
+        # Modelos ainda carregando (espera limitada) ou indisponíveis: resposta de contingência, sem cache
+        if not self.warmup.wait("models"):
+            personality = self.diseases[disease_id]["personalities"][personality_id]
+            return {
+                "answer": personality["fallback"],
+                "confidence": 0.0,
+                "source": "warming_up" if self.warmup.loading("models") else "models_unavailable",
+                "personality": personality["name"],
+                "disease": self.diseases[disease_id]["name"]
+            }
+        
         # Obter chunks relevantes
-        relevant_chunks = self.get_relevant_chunks(question, disease_id)
+        scored_chunks = self.get_relevant_chunks(question, disease_id, with_scores=True)
+        relevant_chunks = [chunk for chunk, _ in scored_chunks]
+        # A resposta fica em cache sob a versão do corpus efetivamente usada
+        cache_key = self.answer_cache_key(disease_id, personality_id, question)
         
         if not relevant_chunks:
             # Fallback baseado na personalidade
@@ -265,13 +279,14 @@ class MultiDiseaseChatbot:
                     "personality": personality["name"],
                     "disease": self.diseases[disease_id]["name"]
                 }
-            self.cache[cache_key] = response
+            if cache_key is not None:
+                self.cache[cache_key] = response
             return response
         
-        # Combinar chunks relevantes
-        context = " ".join(relevant_chunks)
-        
         try:
+            # Contexto montado com os tokens já calculados dos chunks, ajustado a uma única janela do modelo
+            context = self.qa_engine.pack(relevant_chunks, question, [score for _, score in scored_chunks])
+            
             # Fazer pergunta ao modelo
             result = self.qa_pipeline(
                 question=question,
@@ -300,7 +315,8 @@ class MultiDiseaseChatbot:
                 "disease": self.diseases[disease_id]["name"]
             }
             
-            self.cache[cache_key] = response
+            if cache_key is not None:
+                self.cache[cache_key] = response
             return response
             
         except Exception as e:
@@ -313,7 +329,8 @@ class MultiDiseaseChatbot:
                 "personality": personality["name"],
                 "disease": self.diseases[disease_id]["name"]
             }
-            self.cache[cache_key] = response
+            if cache_key is not None:
+                self.cache[cache_key] = response
             return response
 
 # Inicializar chatbot
@@ -1111,11 +1128,17 @@ def health_check():
         "status": "healthy",
         "diseases_loaded": len(chatbot.diseases),
         "models_loaded": chatbot.qa_pipeline is not None and chatbot.embedding_model is not None,
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "qa_batcher": chatbot.qa_pipeline.stats() if chatbot.qa_pipeline is not None else None,
+        "qa_engine": chatbot.qa_engine.stats() if chatbot.qa_engine is not None else None,
+        "models": model_registry.memory_report(),
+        "readiness": chatbot.warmup.report(),
         "timestamp": datetime.now().isoformat()
     })
 
 if __name__ == '__main__':
     print("🏥 Chatbot Multi-Doenças iniciando...")
+    chatbot.warmup.start()
     print(f"📚 Doenças carregadas: {len(chatbot.diseases)}")
     print("🌐 Servidor rodando em http://localhost:5000")
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
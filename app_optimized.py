@@ -1,15 +1,30 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 import os
-from transformers.pipelines import pipeline
-from transformers import AutoTokenizer, AutoModelForQuestionAnswering, AutoModelForCausalLM, AutoModelForSequenceClassification
-import torch
+import time
 import re
 import logging
 from datetime import datetime
 import random
 import json
-import requests
+import heapq
+import hashlib
+import inspect
+from functools import lru_cache
+
+from utils.bm25 import get_chunk_retriever
+from utils.corpus_watcher import CorpusWatcher
+from utils.model_registry import model_registry, warm_up
+from utils.warmup import Warmup
+from utils.deferred_results import DeferredResults
+from utils.hedged_calls import HedgedCaller
+from utils.circuit_breaker import CircuitBreaker
+from utils.rate_limiter import TokenBucket
+from utils.http_client import http_client, retry_after_seconds
+from utils.async_client import async_http_client
+from utils.sse import PERSONA_HEADERS, SSE_HEADERS, iter_openrouter_deltas, sse_event, strip_persona_header
+from utils.query_embedding_cache import normalize_question, query_embedding_cache
+from utils.semantic_cache import SemanticCache
 
 app = Flask(__name__)
 CORS(app)
@@ -21,12 +36,19 @@ logger = logging.getLogger(__name__)
 # Variáveis globais
 MD_PATH = 'PDFs/Roteiro de Dsispensação - Hanseníase.md'
 md_text = ""
+md_version = ""
 qa_pipeline = None
+embedding_model = None
 text_generation_pipeline = None
 sentiment_pipeline = None
 tokenizer = None
 model = None
 
+# Enriquecimento com DialoGPT limitado a um orçamento de latência; o que não couber sai da
+# resposta, fica em cache para a mesma pergunta e pode ser buscado em /api/chat/enrichment/<id>
+GENERATION_BUDGET_MS = float(os.environ.get("GENERATION_BUDGET_MS", 300))
+enrichments = DeferredResults(max_workers=1, max_pending=2, name="dialogpt")  # uma geração por vez (já ocupa a CPU), no máximo uma na fila
+
 # Três chaves e modelos
 OPENROUTER_API_KEY_LLAMA = os.environ.get("OPENROUTER_API_KEY_LLAMA", "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")
 OPENROUTER_API_KEY_QWEN = os.environ.get("OPENROUTER_API_KEY_QWEN", "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")
@@ -35,6 +57,30 @@ LLAMA3_MODEL = "meta-llama/llama-3.3-70b-instruct:free"
 QWEN_MODEL = "qwen/qwen3-14b:free"
 GEMINI_MODEL = "google/gemini-2.0-flash-exp:free"
 
+# Cadeia Llama -> Qwen -> Gemini com hedging (OPENROUTER_HEDGE_DELAY_S, OPENROUTER_DEADLINE_S)
+OPENROUTER_CHAIN = [
+    (LLAMA3_MODEL, OPENROUTER_API_KEY_LLAMA),
+    (QWEN_MODEL, OPENROUTER_API_KEY_QWEN),
+    (GEMINI_MODEL, OPENROUTER_API_KEY_GEMINI),
+]
+openrouter_caller = HedgedCaller()
+
+# Circuit breaker por par modelo/chave: modelos com limite de uso estourado ou fora do ar são pulados
+model_breakers = {(model, api_key): CircuitBreaker(model) for model, api_key in OPENROUTER_CHAIN}
+
+# Token bucket por chave (cota por minuto dos modelos :free, dividida entre os WEB_CONCURRENCY workers):
+# sem ficha, a chamada espera na fila até RATE_LIMIT_MAX_WAIT_S ou é recusada na hora e o hedging
+# segue para o próximo modelo
+key_limiters = {
+    api_key: TokenBucket(", ".join(model for model, key in OPENROUTER_CHAIN if key == api_key))
+    for _, api_key in OPENROUTER_CHAIN
+}
+
+# Respostas do OpenRouter reaproveitadas para perguntas equivalentes (mesma persona e mesma versão
+# do Markdown), pela similaridade dos embeddings (SEMANTIC_CACHE_THRESHOLD, _SIZE, _TTL)
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+semantic_cache = SemanticCache()
+
 # Templates de linguagem natural para cada persona
 NATURAL_TEMPLATES = {
     "dr_gasnelio": {
@@ -93,6 +139,12 @@ NATURAL_TEMPLATES = {
     }
 }
 
+def corpus_text():
+    """md_text, esperando (no máximo WARMUP_WAIT_SECONDS) a carga ainda em andamento"""
+    if not md_text:
+        warmup.wait("md_text")
+    return md_text
+
 def extract_md_text(md_path):
     """Extrai texto do arquivo Markdown"""
     global md_text
@@ -105,59 +157,91 @@ def extract_md_text(md_path):
         logger.error(f"Erro ao extrair arquivo Markdown: {e}")
         return ""
 
-def load_ai_models():
-    """Carrega múltiplos modelos de IA gratuitos do Hugging Face"""
-    global qa_pipeline, text_generation_pipeline, sentiment_pipeline, tokenizer, model
+def set_md_text(text):
+    """Troca o Markdown em uso; a nova versão invalida as respostas do cache semântico"""
+    global md_text, md_version
+    md_text = text
+    md_version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+def reload_md_text(key, path):
+    """Recarrega o Markdown alterado sem reiniciar; o índice BM25 é refeito para o novo texto"""
+    new_text = extract_md_text(path)
+    if new_text:
+        set_md_text(new_text)
+
+def load_md_content():
+    """Carrega o Markdown e passa a observar mudanças no arquivo"""
+    if os.path.exists(MD_PATH):
+        set_md_text(extract_md_text(MD_PATH))
+    else:
+        logger.warning(f"Arquivo Markdown não encontrado: {MD_PATH}")
+        set_md_text("Arquivo Markdown não disponível")
+    
+    # Observa o Markdown e recarrega o conteúdo quando ele mudar
+    CorpusWatcher({"tese": MD_PATH}, reload_md_text).start()
+
+def load_embedding_model():
+    """Carrega o modelo de embeddings das perguntas (cache semântico das respostas)"""
+    global embedding_model
+    logger.info(f"Carregando modelo de embeddings: {EMBEDDING_MODEL}")
+    embedding_model = model_registry.acquire("embedding", EMBEDDING_MODEL)
+    warm_up("embedding", embedding_model)
+
+def load_qa_model():
+    """Carrega o modelo de QA (principal) do Hugging Face"""
+    global qa_pipeline
     try:
         # Modelo principal para QA (mais robusto)
         model_name = "deepset/roberta-base-squad2"
         logger.info(f"Carregando modelo QA: {model_name}")
         
-        qa_pipeline = pipeline(
-            "question-answering",
-            model=model_name,
-            tokenizer=model_name,
-            device=-1 if not torch.cuda.is_available() else 0
-        )
-        
-        # Modelo para geração de texto (mais natural)
-        generation_model = "microsoft/DialoGPT-medium"
-        logger.info(f"Carregando modelo de geração: {generation_model}")
-        
-        text_generation_pipeline = pipeline(
-            "text-generation",
-            model=generation_model,
-            tokenizer=generation_model,
-            device=-1 if not torch.cuda.is_available() else 0,
-            max_length=100,
-            do_sample=True,
-            temperature=0.7
-        )
-        
-        # Modelo para análise de sentimento/contexto (comentado temporariamente)
-        # sentiment_model = "cardiffnlp/twitter-roberta-base-sentiment"
-        # logger.info(f"Carregando modelo de sentimento: {sentiment_model}")
-        
-        # sentiment_pipeline = pipeline(
-        #     "sentiment-analysis",
-        #     model=sentiment_model,
-        #     device=-1 if not torch.cuda.is_available() else 0
-        # )
-        sentiment_pipeline = None
-        
-        logger.info("Todos os modelos carregados com sucesso")
+        # Modelo compartilhado do processo; backend por QA_BACKEND (torch/quantized/onnx)
+        qa_pipeline = model_registry.acquire("qa", model_name)
     except Exception as e:
-        logger.error(f"Erro ao carregar modelos: {e}")
-        # Fallback para modelo único se houver erro
+        logger.error(f"Erro ao carregar modelo QA: {e}")
+        # Fallback para o modelo fp32 se o backend escolhido falhar
         try:
-            qa_pipeline = pipeline(
-                "question-answering",
-                model="deepset/roberta-base-squad2",
-                device=-1 if not torch.cuda.is_available() else 0
-            )
+            qa_pipeline = model_registry.acquire("qa", "deepset/roberta-base-squad2", backend="torch")
         except Exception as e2:
             logger.error(f"Erro no fallback: {e2}")
             qa_pipeline = None
+            raise
+    warm_up("qa", qa_pipeline)
+
+def load_generation_model():
+    """Carrega o modelo de geração de texto (complementar às respostas de QA)"""
+    global text_generation_pipeline, sentiment_pipeline
+    # Modelo para geração de texto (mais natural)
+    generation_model = "microsoft/DialoGPT-medium"
+    logger.info(f"Carregando modelo de geração: {generation_model}")
+    
+    text_generation_pipeline = model_registry.acquire(
+        "text-generation",
+        generation_model,
+        max_length=100,
+        do_sample=True,
+        temperature=0.7
+    )
+    warm_up("text-generation", text_generation_pipeline)
+    
+    # Modelo para análise de sentimento/contexto (comentado temporariamente)
+    # sentiment_model = "cardiffnlp/twitter-roberta-base-sentiment"
+    # logger.info(f"Carregando modelo de sentimento: {sentiment_model}")
+    
+    # sentiment_pipeline = pipeline(
+    #     "sentiment-analysis",
+    #     model=sentiment_model,
+    #     device=-1 if not torch.cuda.is_available() else 0
+    # )
+    sentiment_pipeline = None
+
+# Conteúdo e modelos carregados em segundo plano; o servidor aceita conexões desde o início
+# (embeddings primeiro, por serem leves; o QA antes da geração, que só complementa as respostas)
+warmup = (Warmup("optimized-warmup")
+          .add("md_text", load_md_content)
+          .add("embedding_model", load_embedding_model)
+          .add("qa_model", load_qa_model)
+          .add("generation_model", load_generation_model))
 
 def get_natural_phrase(persona, category, confidence_level="medium"):
     """Retorna uma frase natural baseada na persona e contexto"""
@@ -172,48 +256,41 @@ def get_natural_phrase(persona, category, confidence_level="medium"):
         return random.choice(category_templates)
     return ""
 
+MEDICAL_TERMS = ['medicamento', 'dose', 'tratamento', 'reação', 'efeito', 'hanseníase', 'clofazimina', 'rifampicina', 'dapsona', 'acompanhamento', 'dispensação', 'paciente']
+
+@lru_cache(maxsize=8)
+def get_enhanced_retriever(full_text):
+    """Índice BM25 e bônus de termos médicos por chunk, calculados uma vez por corpus"""
+    retriever = get_chunk_retriever(full_text, 1000, 300)  # chunks de 1000 com overlap de 300
+    medical_bonus = [
+        0.1 * sum(1 for term in MEDICAL_TERMS if term in chunk.lower())
+        for chunk in retriever.documents
+    ]
+    # Ordem estática dos chunks pelo bônus (candidatos mesmo sem palavras em comum)
+    bonus_order = sorted(range(len(medical_bonus)), key=lambda i: medical_bonus[i], reverse=True)
+    return retriever, medical_bonus, bonus_order
+
 def find_relevant_context_enhanced(question, full_text, max_length=800):
     """Encontra contexto mais relevante usando múltiplas estratégias"""
-    # Divide o texto em chunks menores com overlap
-    chunks = []
-    chunk_size = 1000  # Aumentado para pegar mais contexto
-    overlap = 300      # Aumentado o overlap
-    
-    for i in range(0, len(full_text), chunk_size - overlap):
-        chunk = full_text[i:i + chunk_size]
-        if chunk.strip():
-            chunks.append(chunk)
+    retriever, medical_bonus, bonus_order = get_enhanced_retriever(full_text)
+    chunks = retriever.documents
     
     if len(chunks) <= 2:
         return full_text[:max_length]
     
-    # Busca por palavras-chave na pergunta
-    question_words = set(re.findall(r'\w+', question.lower()))
-    
-    best_chunks = []
-    chunk_scores = []
-    
-    for chunk in chunks:
-        chunk_words = set(re.findall(r'\w+', chunk.lower()))
-        common_words = question_words.intersection(chunk_words)
-        score = len(common_words) / len(question_words) if question_words else 0
-        
-        # Bônus para chunks que contêm termos médicos específicos
-        medical_terms = ['medicamento', 'dose', 'tratamento', 'reação', 'efeito', 'hanseníase', 'clofazimina', 'rifampicina', 'dapsona', 'acompanhamento', 'dispensação', 'paciente']
-        for term in medical_terms:
-            if term in chunk.lower():
-                score += 0.1
-        
-        chunk_scores.append((chunk, score))
-    
-    # Ordena por score e pega os melhores
-    chunk_scores.sort(key=lambda x: x[1], reverse=True)
+    # BM25 normalizado (0-1) + bônus para chunks que contêm termos médicos específicos
+    results = retriever.search(question)
+    max_score = results[0][1] if results else 0.0
+    chunk_scores = {doc_id: score / max_score + medical_bonus[doc_id] for doc_id, score in results}
+    for doc_id in bonus_order[:2]:
+        chunk_scores.setdefault(doc_id, medical_bonus[doc_id])
     
     # Combina os 2 melhores chunks
+    best_chunks = heapq.nlargest(2, chunk_scores.items(), key=lambda item: item[1])
     combined_context = ""
-    for chunk, score in chunk_scores[:2]:
+    for doc_id, score in best_chunks:
         if score > 0.05:  # Threshold mínimo
-            combined_context += chunk + "\n\n"
+            combined_context += chunks[doc_id] + "\n\n"
     
     return combined_context[:max_length] if combined_context else chunks[0][:max_length]
 
@@ -254,20 +331,31 @@ def answer_question_enhanced(question, persona, conversation_history=None):
     """Resposta aprimorada usando múltiplos modelos"""
     global qa_pipeline, md_text
     
-    if not qa_pipeline or not md_text:
+    # Corpus ainda carregando: espera limitada, como o modelo de QA; contingência só se a carga falhou
+    if not corpus_text():
         return enhanced_fallback_response(question, persona, "")
     
+    # Modelo ainda carregando (espera limitada) ou indisponível: resposta só por palavras-chave
+    if not qa_pipeline and not warmup.wait("qa_model"):
+        return enhanced_fallback_response(question, persona, find_relevant_context_enhanced(question, md_text))
+    
     try:
+        timings = {}
+        
         # Encontra contexto relevante
+        stage = time.perf_counter()
         context = find_relevant_context_enhanced(question, md_text)
+        timings["retrieval_ms"] = round(1000 * (time.perf_counter() - stage), 1)
         
         # Faz a pergunta ao modelo QA
+        stage = time.perf_counter()
         result = qa_pipeline(
             question=question,
             context=context,
             max_answer_len=300,
             handle_impossible_answer=True
         )
+        timings["qa_ms"] = round(1000 * (time.perf_counter() - stage), 1)
         
         # Acessa os resultados de forma segura
         if isinstance(result, dict):
@@ -294,11 +382,29 @@ def answer_question_enhanced(question, persona, conversation_history=None):
             logger.info("Usando fallback aprimorado - confiança baixa")
             return enhanced_fallback_response(question, persona, context)
         
-        # Melhora a resposta com geração de texto
-        enhanced_answer = enhance_response_with_generation(answer, question, persona)
+        # Melhora a resposta com geração de texto, se couber no orçamento; senão a resposta
+        # base (formatada com linguagem natural) sai na hora e a enriquecida chega depois
+        stage = time.perf_counter()
+        status, response, enrichment_id = "skipped", None, None
+        if text_generation_pipeline is not None:
+            status, response, enrichment_id = enrichments.run(
+                (persona, confidence_level, normalize_question(question), answer),
+                lambda: format_persona_answer_enhanced(
+                    enhance_response_with_generation(answer, question, persona), persona, confidence_level
+                ),
+                GENERATION_BUDGET_MS
+            )
+        if response is None:
+            response = format_persona_answer_enhanced(answer, persona, confidence_level)
+        timings["generation_ms"] = round(1000 * (time.perf_counter() - stage), 1)
+        timings["generation_budget_ms"] = GENERATION_BUDGET_MS
+        timings["generation"] = status
+        logger.info(f"Tempos por etapa: {timings}")
         
-        # Formata com linguagem natural
-        return format_persona_answer_enhanced(enhanced_answer, persona, confidence_level)
+        response = dict(response, timings=timings)
+        if enrichment_id:
+            response["enrichment_id"] = enrichment_id
+        return response
         
     except Exception as e:
         logger.error(f"Erro ao processar pergunta: {e}")
@@ -592,7 +698,8 @@ def fallback_response(persona, reason=""):
             "confidence": "low"
         }
 
-def call_openrouter_model(question, context, persona, model, api_key):
+def openrouter_request(question, context, persona, model, api_key):
+    """URL, cabeçalhos e payload da chamada de chat ao OpenRouter"""
     url = "https://openrouter.ai/api/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -615,8 +722,15 @@ def call_openrouter_model(question, context, persona, model, api_key):
             {"role": "user", "content": question}
         ]
     }
+    return url, headers, payload
+
+def call_openrouter_model(question, context, persona, model, api_key):
+    url, headers, payload = openrouter_request(question, context, persona, model, api_key)
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
+        # Conexão keep-alive do pool compartilhado; 429/5xx repetidos com backoff e Retry-After
+        response = http_client.post(url, headers=headers, json=payload)
+        if response.status_code == 429:
+            key_limiters[api_key].penalize(retry_after_seconds(response) or 0)
         if response.status_code != 200:
             raise Exception(f"Erro OpenRouter: {response.status_code} - {response.text}")
         data = response.json()
@@ -625,21 +739,136 @@ def call_openrouter_model(question, context, persona, model, api_key):
         print(f"Erro ao chamar OpenRouter ({model}): {e}\nResposta: {getattr(e, 'response', None)}")
         return None
 
-# Função principal com fallback (Llama -> Qwen -> Gemini)
+async def call_openrouter_model_async(question, context, persona, model, api_key):
+    """Versão assíncrona de call_openrouter_model (roda no loop do async_http_client)"""
+    url, headers, payload = openrouter_request(question, context, persona, model, api_key)
+    # 429/5xx repetidos com backoff e Retry-After (mesma política do http_client), dentro do prazo
+    response = await async_http_client.post(url, openrouter_caller.deadline, headers=headers, json=payload)
+    if response.status == 429:
+        key_limiters[api_key].penalize(retry_after_seconds(response) or 0)
+    if response.status != 200:
+        raise Exception(f"Erro OpenRouter: {response.status} - {response.data}")
+    return response.data['choices'][0]['message']['content']
+
+# Função principal com fallback (Llama -> Qwen -> Gemini): o Llama começa na hora e os seguintes
+# entram após o atraso de hedging ou quando os anteriores falham; vence a primeira resposta
+def openrouter_attempts(call_model, question, context, persona):
+    """
+    Tentativas da cadeia na ordem de preferência, sem os modelos com circuito aberto. Cada tentativa
+    passa primeiro pelo limitador da chave (recusa por cota local não conta no circuit breaker)
+    """
+    is_async = inspect.iscoroutinefunction(call_model)
+    attempts = []
+    for model, api_key in OPENROUTER_CHAIN:
+        breaker = model_breakers[(model, api_key)]
+        if not breaker.available():
+            continue
+        limiter = key_limiters[api_key]
+        call = lambda model=model, api_key=api_key: call_model(question, context, persona, model, api_key)
+        if is_async:
+            # Corrotinas usam acall: cancelar a tentativa não conta como falha e devolve a ficha
+            async def attempt(breaker=breaker, limiter=limiter, call=call):
+                await limiter.acquire_async()
+                return await breaker.acall(call)
+        else:
+            def attempt(breaker=breaker, limiter=limiter, call=call):
+                limiter.acquire()
+                return breaker.call(call)
+        attempts.append((model, attempt))
+    return attempts
+
+def question_embedding(question):
+    """Embedding da pergunta para o cache semântico; None enquanto o modelo não carregou"""
+    if embedding_model is None:
+        return None
+    try:
+        return query_embedding_cache.encode(embedding_model, question, EMBEDDING_MODEL)
+    except Exception as e:
+        logger.error(f"Erro ao calcular embedding da pergunta: {e}")
+        return None
+
+def cached_answer(question, persona):
+    """
+    Resposta já dada a uma pergunta equivalente: (entrada do cache ou None, similaridade, embedding)
+    """
+    embedding = question_embedding(question)
+    if embedding is None:
+        return None, None, None
+    entry, similarity = semantic_cache.lookup(persona, md_version, embedding)
+    if entry:
+        logger.info(f"Cache semântico: '{question}' ~ '{entry.question}' (similaridade {similarity:.3f})")
+    return entry, similarity, embedding
+
 def call_chatbot_with_fallback(question, context, persona):
-    # 1. Llama
-    resposta = call_openrouter_model(question, context, persona, LLAMA3_MODEL, OPENROUTER_API_KEY_LLAMA)
-    if resposta:
-        return resposta
-    # 2. Qwen
-    resposta = call_openrouter_model(question, context, persona, QWEN_MODEL, OPENROUTER_API_KEY_QWEN)
+    """Retorna (resposta, modelo que respondeu)"""
+    attempts = openrouter_attempts(call_openrouter_model, question, context, persona)
+    resposta, modelo, _ = openrouter_caller.call(attempts)
     if resposta:
-        return resposta
-    # 3. Gemini
-    resposta = call_openrouter_model(question, context, persona, GEMINI_MODEL, OPENROUTER_API_KEY_GEMINI)
+        return resposta, modelo
+    return "[Erro ao consultar os modelos OpenRouter. Por favor, tente novamente mais tarde.]", None
+
+async def call_chatbot_with_fallback_async(question, context, persona):
+    """Versão assíncrona de call_chatbot_with_fallback: as tentativas perdedoras são canceladas"""
+    attempts = openrouter_attempts(call_openrouter_model_async, question, context, persona)
+    resposta, modelo, _ = await openrouter_caller.acall(attempts)
     if resposta:
-        return resposta
-    return "[Erro ao consultar os modelos OpenRouter. Por favor, tente novamente mais tarde.]"
+        return resposta, modelo
+    return "[Erro ao consultar os modelos OpenRouter. Por favor, tente novamente mais tarde.]", None
+
+def stream_openrouter_model(question, context, persona, model, api_key):
+    """Trechos da resposta do OpenRouter conforme são gerados (stream: true)"""
+    url, headers, payload = openrouter_request(question, context, persona, model, api_key)
+    response = http_client.post(url, headers=headers, json=dict(payload, stream=True), stream=True)
+    try:
+        if response.status_code == 429:
+            key_limiters[api_key].penalize(retry_after_seconds(response) or 0)
+        if response.status_code != 200:
+            raise Exception(f"Erro OpenRouter: {response.status_code} - {response.text}")
+        yield from iter_openrouter_deltas(response)
+    finally:
+        response.close()
+
+def open_openrouter_stream(question, context, persona, model, api_key):
+    """Abre o stream e espera o primeiro trecho: (primeiro trecho, restante) ou None se veio vazio"""
+    deltas = stream_openrouter_model(question, context, persona, model, api_key)
+    first = next(deltas, None)
+    if not first:
+        deltas.close()
+        return None
+    return first, deltas
+
+def close_openrouter_stream(opened):
+    """Fecha um stream aberto que não vai ser lido (perdeu o hedging): devolve a conexão ao pool"""
+    opened[1].close()
+
+def stream_chatbot_with_fallback(question, context, persona, embedding=None):
+    """
+    Eventos SSE da resposta: tokens do primeiro modelo da cadeia (com hedging) que começar
+    a responder; sem nenhum, a resposta do QA local. Com o embedding da pergunta, a resposta
+    completa do OpenRouter entra no cache semântico
+    """
+    attempts = openrouter_attempts(open_openrouter_stream, question, context, persona)
+    opened, modelo, _ = openrouter_caller.call(attempts, discard=close_openrouter_stream)
+    if opened:
+        first, deltas = opened
+        parts = [first]
+        try:
+            yield sse_event("delta", {"text": first})
+            for delta in deltas:
+                parts.append(delta)
+                yield sse_event("delta", {"text": delta})
+        finally:
+            # Cliente desconectado (GeneratorExit) ou erro: fecha o stream do vencedor também
+            deltas.close()
+        if embedding is not None:
+            semantic_cache.store(persona, md_version, question, embedding, "".join(parts), {"model": modelo})
+        yield sse_event("done", {"model": modelo})
+        return
+    
+    logger.info("Nenhum modelo OpenRouter respondeu, usando o QA local")
+    response = answer_question_enhanced(question, persona)
+    yield sse_event("delta", {"text": strip_persona_header(persona, response["answer"])})
+    yield sse_event("done", {"model": None, "confidence": response.get("confidence")})
 
 @app.route('/')
 def index():
@@ -674,15 +903,97 @@ def chat_api():
             return jsonify({"error": "Pergunta não fornecida"}), 400
         if personality_id not in ['dr_gasnelio', 'ga']:
             return jsonify({"error": "Personalidade inválida"}), 400
+        # Pergunta equivalente já respondida para esta persona e versão do Markdown
+        entry, similarity, embedding = cached_answer(question, personality_id)
+        if entry:
+            return jsonify({"answer": entry.answer, "model": entry.metadata.get("model"),
+                            "cached": True, "similarity": round(similarity, 3)})
         # Extrai contexto relevante do Markdown
-        context = find_relevant_context_enhanced(question, md_text, max_length=800)
+        context = find_relevant_context_enhanced(question, corpus_text(), max_length=800)
         # Chama o modelo Llama-3 via OpenRouter
-        resposta = call_chatbot_with_fallback(question, context, personality_id)
-        return jsonify({"answer": resposta})
+        resposta, modelo = call_chatbot_with_fallback(question, context, personality_id)
+        if modelo and embedding is not None:
+            semantic_cache.store(personality_id, md_version, question, embedding, resposta, {"model": modelo})
+        return jsonify({"answer": resposta, "model": modelo})
     except Exception as e:
         logger.error(f"Erro na API de chat: {e}")
         return jsonify({"error": "Erro interno do servidor"}), 500
 
+@app.route('/api/chat/async', methods=['POST'])
+async def chat_async_api():
+    """
+    /api/chat com as chamadas ao OpenRouter no loop assíncrono compartilhado: a espera pela rede
+    não ocupa uma thread por tentativa (view async: requer flask[async]; sem aiohttp, usa o cliente síncrono)
+    """
+    try:
+        data = request.get_json(force=True, silent=True)
+        if not data:
+            return jsonify({"error": "JSON inválido ou vazio"}), 400
+        question = data.get('question', '').strip()
+        personality_id = data.get('personality_id', 'dr_gasnelio')
+        if not question:
+            return jsonify({"error": "Pergunta não fornecida"}), 400
+        if personality_id not in ['dr_gasnelio', 'ga']:
+            return jsonify({"error": "Personalidade inválida"}), 400
+        entry, similarity, embedding = cached_answer(question, personality_id)
+        if entry:
+            return jsonify({"answer": entry.answer, "model": entry.metadata.get("model"),
+                            "cached": True, "similarity": round(similarity, 3)})
+        context = find_relevant_context_enhanced(question, corpus_text(), max_length=800)
+        if async_http_client.available:
+            resposta, modelo = await async_http_client.wrap(
+                call_chatbot_with_fallback_async(question, context, personality_id)
+            )
+        else:
+            resposta, modelo = call_chatbot_with_fallback(question, context, personality_id)
+        if modelo and embedding is not None:
+            semantic_cache.store(personality_id, md_version, question, embedding, resposta, {"model": modelo})
+        return jsonify({"answer": resposta, "model": modelo})
+    except Exception as e:
+        logger.error(f"Erro na API de chat (async): {e}")
+        return jsonify({"error": "Erro interno do servidor"}), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream_api():
+    """Versão em streaming (SSE) de /api/chat: o primeiro byte sai antes da resposta do modelo"""
+    data = request.get_json(force=True, silent=True)
+    if not data:
+        return jsonify({"error": "JSON inválido ou vazio"}), 400
+    question = data.get('question', '').strip()
+    personality_id = data.get('personality_id', 'dr_gasnelio')
+    if not question:
+        return jsonify({"error": "Pergunta não fornecida"}), 400
+    if personality_id not in ['dr_gasnelio', 'ga']:
+        return jsonify({"error": "Personalidade inválida"}), 400
+    
+    def generate():
+        # Cabeçalho da persona antes de qualquer processamento
+        yield sse_event("header", {"text": PERSONA_HEADERS[personality_id]})
+        try:
+            entry, similarity, embedding = cached_answer(question, personality_id)
+            if entry:
+                yield sse_event("delta", {"text": strip_persona_header(personality_id, entry.answer)})
+                yield sse_event("done", {"model": entry.metadata.get("model"), "cached": True,
+                                         "similarity": round(similarity, 3)})
+                return
+            context = find_relevant_context_enhanced(question, corpus_text(), max_length=800)
+            yield from stream_chatbot_with_fallback(question, context, personality_id, embedding)
+        except Exception as e:
+            logger.error(f"Erro na API de chat (stream): {e}")
+            yield sse_event("error", {"error": "Erro interno do servidor"})
+    
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+@app.route('/api/chat/enrichment/<enrichment_id>', methods=['GET'])
+def chat_enrichment(enrichment_id):
+    """Resposta enriquecida pelo modelo de geração que não coube no orçamento da requisição original"""
+    status, response = enrichments.poll(enrichment_id)
+    if status == "ready":
+        return jsonify(dict(response, status=status))
+    if status == "unknown":
+        return jsonify({"status": status, "error": "Enriquecimento não encontrado"}), 404
+    return jsonify({"status": status})
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Verificação de saúde da API"""
@@ -692,6 +1003,15 @@ def health_check():
         "generation_model_loaded": text_generation_pipeline is not None,
         "sentiment_model_loaded": sentiment_pipeline is not None,
         "md_loaded": len(md_text) > 0,
+        "models": model_registry.memory_report(),
+        "readiness": warmup.report(),
+        "generation_enrichment": dict(enrichments.stats(), budget_ms=GENERATION_BUDGET_MS),
+        "openrouter": openrouter_caller.stats(),
+        "circuit_breakers": [breaker.report() for breaker in model_breakers.values()],
+        "rate_limiters": [limiter.stats() for limiter in key_limiters.values()],
+        "http_client": http_client.stats(),
+        "async_http_client": async_http_client.stats(),
+        "semantic_cache": dict(semantic_cache.stats(), corpus_version=md_version),
         "timestamp": datetime.now().isoformat()
     })
 
@@ -724,18 +1044,8 @@ def api_info():
     })
 
 if __name__ == '__main__':
-    # Inicialização
     logger.info("Iniciando aplicação híbrida otimizada...")
-    
-    # Carrega o arquivo Markdown
-    if os.path.exists(MD_PATH):
-        md_text = extract_md_text(MD_PATH)
-    else:
-        logger.warning(f"Arquivo Markdown não encontrado: {MD_PATH}")
-        md_text = "Arquivo Markdown não disponível"
-    
-    # Carrega os modelos de IA
-    load_ai_models()
+    warmup.start()
     
     # Inicia o servidor
     port = int(os.environ.get('PORT', 5000))
@@ -12,6 +12,8 @@ import logging
 from datetime import datetime
 import requests
 
+from utils.async_client import async_http_client
+
 app = Flask(__name__)
 CORS(app)
 
@@ -103,47 +105,87 @@ class SimpleHanseniaseChatbot:
         # Usar busca simples
         return self._simple_answer(question, personality)
     
+    async def answer_question_async(self, question: str, personality: str = "dr_gasnelio") -> dict:
+        """
+        Versão assíncrona de answer_question: a espera pelo Langflow fica no loop do
+        async_http_client, sem ocupar uma thread por chamada
+        """
+        cache_key = f"{question}_{personality}"
+        if cache_key in self.cache:
+            cached_response = self.cache[cache_key]
+            cached_response["source"] = "cache"
+            return cached_response
+        
+        if self.use_langflow and async_http_client.available:
+            result = await async_http_client.wrap(self._langflow_answer_async(question, personality))
+            if result.get("success"):
+                self.cache[cache_key] = result
+                return result
+            logger.warning(f"Langflow falhou, usando busca simples ({result.get('error')})")
+        elif self.use_langflow:
+            return self.answer_question(question, personality)
+        
+        return self._simple_answer(question, personality)
+    
+    def _langflow_request(self, question: str, personality: str) -> tuple:
+        """URL, payload e headers da chamada ao Langflow"""
+        payload = {
+            "question": question,
+            "personality": personality
+        }
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        return f"{self.langflow_url}/api/v1/process", payload, headers
+    
+    def _langflow_result(self, status: int, result, question: str, personality: str) -> dict:
+        """Resposta do Langflow no formato do chatbot"""
+        if status == 200:
+            return {
+                "success": True,
+                "answer": result.get("output", ""),
+                "confidence": result.get("confidence", 0.8),
+                "personality": personality,
+                "timestamp": datetime.now().isoformat(),
+                "source": "langflow",
+                "question": question
+            }
+        else:
+            return {
+                "success": False,
+                "error": f"Langflow retornou status {status}"
+            }
+    
     def _langflow_answer(self, question: str, personality: str) -> dict:
         """Resposta via Langflow"""
         try:
-            payload = {
-                "question": question,
-                "personality": personality
-            }
+            url, payload, headers = self._langflow_request(question, personality)
             
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
+            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            
+            result = response.json() if response.status_code == 200 else None
+            return self._langflow_result(response.status_code, result, question, personality)
+                
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
             }
+    
+    async def _langflow_answer_async(self, question: str, personality: str, deadline: float = 10) -> dict:
+        """Versão assíncrona de _langflow_answer (roda no loop do async_http_client)"""
+        try:
+            url, payload, headers = self._langflow_request(question, personality)
             
-            response = requests.post(
-                f"{self.langflow_url}/api/v1/process",
-                json=payload,
-                headers=headers,
-                timeout=10
-            )
+            status, result = await async_http_client.post_json(url, deadline, json=payload, headers=headers)
             
-            if response.status_code == 200:
-                result = response.json()
-                return {
-                    "success": True,
-                    "answer": result.get("output", ""),
-                    "confidence": result.get("confidence", 0.8),
-                    "personality": personality,
-                    "timestamp": datetime.now().isoformat(),
-                    "source": "langflow",
-                    "question": question
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"Langflow retornou status {response.status_code}"
-                }
+            return self._langflow_result(status, result, question, personality)
                 
         except Exception as e:
             return {
                 "success": False,
-                "error": str(e)
+                "error": str(e) or type(e).__name__
             }
     
     def _simple_answer(self, question: str, personality: str) -> dict:
@@ -308,6 +350,32 @@ def chat():
         logger.error(f"Erro no endpoint /api/chat: {e}")
         return jsonify({"error": "Erro interno do servidor"}), 500
 
+@app.route('/api/chat/async', methods=['POST'])
+async def chat_async():
+    """Endpoint do chat com a chamada ao Langflow assíncrona (view async: requer flask[async])"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({"error": "Dados não fornecidos"}), 400
+        
+        question = data.get('question', '').strip()
+        personality = data.get('personality', 'dr_gasnelio')
+        
+        if not question:
+            return jsonify({"error": "Pergunta não fornecida"}), 400
+        
+        if personality not in ['dr_gasnelio', 'ga']:
+            return jsonify({"error": "Personalidade inválida"}), 400
+        
+        response = await chatbot.answer_question_async(question, personality)
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        logger.error(f"Erro no endpoint /api/chat/async: {e}")
+        return jsonify({"error": "Erro interno do servidor"}), 500
+
 @app.route('/api/health')
 def health():
     """Health check"""
@@ -7,6 +7,8 @@ from dotenv import load_dotenv
 import re
 from datetime import datetime
 
+from utils.async_client import async_http_client
+
 try:
     from astrapy import DataAPIClient
 except ImportError:
@@ -148,40 +150,62 @@ class VectorStoreRAGIntegration:
             logger.error(f"❌ Erro ao criar fluxo Vector Store RAG: {e}")
             return False
     
+    def _run_request(self, question):
+        """URL, headers e dados da execução do fluxo"""
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        # Dados para execução do fluxo
+        execution_data = {
+            "flow_id": self.flow_id,
+            "input_data": {
+                "input_node": {"text": question}
+            }
+        }
+        return f'{self.langflow_url}/api/v1/flows/{self.flow_id}/run', headers, execution_data
+    
+    def _run_result(self, status, result):
+        """Texto do nó de saída, ou None se o fluxo falhou"""
+        if status == 200:
+            return result.get('output', {}).get('output_node', {}).get('text', '')
+        else:
+            logger.error(f"❌ Erro ao executar fluxo: {status}")
+            return None
+    
     def process_question(self, question):
         """Processa uma pergunta usando Vector Store RAG"""
         if not self.is_available or not self.flow_id:
             return None
             
         try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
+            url, headers, execution_data = self._run_request(question)
             
-            # Dados para execução do fluxo
-            execution_data = {
-                "flow_id": self.flow_id,
-                "input_data": {
-                    "input_node": {"text": question}
-                }
-            }
+            response = requests.post(url, headers=headers, json=execution_data, timeout=60)
             
-            response = requests.post(f'{self.langflow_url}/api/v1/flows/{self.flow_id}/run',
-                                   headers=headers,
-                                   json=execution_data,
-                                   timeout=60)
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get('output', {}).get('output_node', {}).get('text', '')
-            else:
-                logger.error(f"❌ Erro ao executar fluxo: {response.status_code}")
-                return None
+            result = response.json() if response.status_code == 200 else None
+            return self._run_result(response.status_code, result)
                 
         except Exception as e:
             logger.error(f"❌ Erro ao processar pergunta: {e}")
             return None
+    
+    async def process_question_async(self, question, deadline=60):
+        """Versão assíncrona de process_question (roda no loop do async_http_client)"""
+        if not self.is_available or not self.flow_id:
+            return None
+            
+        try:
+            url, headers, execution_data = self._run_request(question)
+            
+            status, result = await async_http_client.post_json(url, deadline, headers=headers, json=execution_data)
+            
+            return self._run_result(status, result)
+                
+        except Exception as e:
+            logger.error(f"❌ Erro ao processar pergunta: {e!r}")
+            return None
 
 class SimpleChatbot:
     """Sistema simples de fallback"""
@@ -6,11 +6,8 @@ Versão que usa Langflow quando disponível, senão usa sistema padrão
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
 import os
-import json
-import re
 import logging
 from datetime import datetime
-import random
 
 # Tentar importar a integração Langflow
 try:
@@ -21,12 +18,12 @@ except ImportError:
     print("⚠️ Langflow não disponível. Usando sistema padrão.")
 
 # Importar sistema padrão como fallback
-from transformers.pipelines import pipeline
-import torch
-from sentence_transformers import SentenceTransformer
-import numpy as np
-import hashlib
-import pickle
+from utils.embedding_index import EmbeddingIndex
+from utils.markdown_chunker import chunk_markdown
+from utils.query_embedding_cache import query_embedding_cache
+from utils.model_registry import model_registry
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 app = Flask(__name__)
 CORS(app)
@@ -46,6 +43,7 @@ class HanseniaseChatbotAdvanced:
         self.cache = {}
         self.pdf_text = ""
         self.chunks = []
+        self.embedding_index = None
         
         # Inicializar sistemas
         self._initialize_systems()
@@ -82,12 +80,8 @@ class HanseniaseChatbotAdvanced:
             logger.info("Carregando sistema padrão...")
             
             # Carregar modelos
-            self.qa_pipeline = pipeline(
-                "question-answering",
-                model="deepset/roberta-base-squad2",
-                device=-1 if not torch.cuda.is_available() else 0
-            )
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.qa_pipeline = model_registry.acquire("qa", "deepset/roberta-base-squad2")
+            self.embedding_model = model_registry.acquire("embedding", EMBEDDING_MODEL)
             
             # Carregar PDF
             self._load_pdf_content()
@@ -109,6 +103,9 @@ class HanseniaseChatbotAdvanced:
                 
                 # Chunking inteligente
                 self.chunks = self._chunk_text(self.pdf_text)
+                # Embeddings dos chunks calculados uma vez (cache em disco por hash do corpus)
+                self.embedding_index = EmbeddingIndex.build(self.chunks, self.embedding_model, EMBEDDING_MODEL,
+                                                            source=os.path.basename(pdf_path))
                 logger.info(f"PDF carregado: {len(self.chunks)} chunks")
             else:
                 logger.warning(f"PDF não encontrado: {pdf_path}")
@@ -120,28 +117,9 @@ class HanseniaseChatbotAdvanced:
             self.pdf_text = ""
             self.chunks = []
     
-    def _chunk_text(self, text, chunk_size=1500, overlap=300):
-        """Divide o texto em chunks menores"""
-        if not text:
-            return []
-        
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            
-            if end > len(text):
-                end = len(text)
-            
-            chunk = text[start:end]
-            chunks.append(chunk)
-            
-            start = end - overlap
-            if start >= len(text):
-                break
-        
-        return chunks
+    def _chunk_text(self, text, chunk_size=1500):
+        """Divide o texto em chunks por seção/parágrafo (offsets sobre o texto, sem sobreposição)"""
+        return chunk_markdown(text, chunk_size)
     
     def answer_question(self, question: str, personality: str = "dr_gasnelio") -> dict:
         """
@@ -223,31 +201,16 @@ class HanseniaseChatbotAdvanced:
     
     def _find_best_chunk(self, question: str) -> str:
         """Encontra o chunk mais relevante para a pergunta"""
-        if not self.chunks:
+        if not self.chunks or self.embedding_index is None:
             return ""
         
-        # Embeddings da pergunta
-        question_embedding = self.embedding_model.encode([question])[0]
-        
-        best_chunk = ""
-        best_score = 0
-        
-        for chunk in self.chunks:
-            # Embedding do chunk
-            chunk_embedding = self.embedding_model.encode([chunk])[0]
-            
-            # Similaridade cosseno
-            similarity = np.dot(question_embedding, chunk_embedding) / (
-                np.linalg.norm(question_embedding) * np.linalg.norm(chunk_embedding)
-            )
-            
-            if similarity > best_score:
-                best_score = similarity
-                best_chunk = chunk
+        # Embedding da pergunta (compartilhado entre personalidades)
+        question_embedding = query_embedding_cache.encode(self.embedding_model, question, EMBEDDING_MODEL)
+        top_indices, top_scores = self.embedding_index.search(question_embedding, 1)
         
         # Threshold mínimo
-        if best_score > 0.3:
-            return best_chunk
+        if len(top_indices) and top_scores[0] > 0.3:
+            return self.chunks[top_indices[0]]
         else:
             return ""
     
@@ -4,17 +4,24 @@ import signal, sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
+import re
 import logging
 from datetime import datetime
 
+from utils.bm25 import get_chunk_retriever
+from utils.corpus_watcher import CorpusWatcher
+from utils.model_registry import model_registry, warm_up
+from utils.warmup import Warmup
+
 # Remover import antigo (chatbot.py não existe mais)
 # from chatbot import ChatbotService  # Removido
 
 # Novo import do chatbot
 from functions.api import HanseniaseChatbot
 
-# Inicializar o chatbot globalmente
-chatbot = HanseniaseChatbot()
+# Inicializar o chatbot globalmente; modelos e PDF carregam em segundo plano para o
+# import (e o bind do gunicorn) não esperar o download dos modelos
+chatbot = HanseniaseChatbot(background=True)
 
 app = Flask(__name__)
 CORS(app)
@@ -51,6 +58,25 @@ def extract_md_text(md_path):
         logger.error(f"Erro ao extrair arquivo Markdown: {e}")
         return ""
 
+def reload_md_text(key, path):
+    """Recarrega o Markdown alterado sem reiniciar; o índice BM25 é refeito para o novo texto"""
+    global md_text
+    new_text = extract_md_text(path)
+    if new_text:
+        md_text = new_text
+
+def load_md_content():
+    """Carrega o Markdown e passa a observar mudanças no arquivo"""
+    global md_text
+    if os.path.exists(MD_PATH):
+        md_text = extract_md_text(MD_PATH)
+    else:
+        logger.warning(f"Arquivo Markdown não encontrado: {MD_PATH}")
+        md_text = "Arquivo Markdown não disponível"
+    
+    # Observa o Markdown e recarrega o conteúdo quando ele mudar
+    CorpusWatcher({"tese": MD_PATH}, reload_md_text).start()
+
 def load_ai_model():
     """Carrega o modelo de IA gratuito do Hugging Face"""
     global qa_pipeline, tokenizer, model
@@ -59,28 +85,23 @@ def load_ai_model():
         model_name = "deepset/roberta-base-squad2"
         logger.info(f"Carregando modelo: {model_name}")
         
-        qa_pipeline = pipeline(
-            "question-answering",
-            model=model_name,
-            tokenizer=model_name,
-            device=-1 if not torch.cuda.is_available() else 0
-        )
+        # Mesmo registro de modelos do chatbot: o roberta não é carregado em dobro no processo
+        qa_pipeline = model_registry.acquire("qa", model_name)
+        warm_up("qa", qa_pipeline)
         logger.info("Modelo carregado com sucesso")
     except Exception as e:
         logger.error(f"Erro ao carregar modelo: {e}")
         qa_pipeline = None
+        raise
+
+# Conteúdo e modelo carregados em segundo plano; o servidor aceita conexões desde o início
+warmup = Warmup("backend-warmup").add("md_text", load_md_content).add("qa_model", load_ai_model)
 
 def find_relevant_context(question, full_text, max_length=4000):
     """Encontra o contexto mais relevante para a pergunta"""
-    # Divide o texto em chunks menores
-    chunks = []
-    chunk_size = 2000
-    overlap = 200
-    
-    for i in range(0, len(full_text), chunk_size - overlap):
-        chunk = full_text[i:i + chunk_size]
-        if chunk.strip():
-            chunks.append(chunk)
+    # Índice BM25 dos chunks (construído uma vez por corpus)
+    retriever = get_chunk_retriever(full_text, 2000, 200)
+    chunks = retriever.documents
     
     # Se temos poucos chunks, retorna o texto completo
     if len(chunks) <= 2:
@@ -91,19 +112,8 @@ def find_relevant_context(question, full_text, max_length=4000):
         return chunks[0][:max_length]
     
     # Busca por palavras-chave na pergunta
-    question_words = set(re.findall(r'\w+', question.lower()))
-    
-    best_chunk = chunks[0]
-    best_score = 0
-    
-    for chunk in chunks:
-        chunk_words = set(re.findall(r'\w+', chunk.lower()))
-        common_words = question_words.intersection(chunk_words)
-        score = len(common_words) / len(question_words) if question_words else 0
-        
-        if score > best_score:
-            best_score = score
-            best_chunk = chunk
+    results = retriever.search(question, top_k=1)
+    best_chunk = chunks[results[0][0]] if results else chunks[0]
     
     return best_chunk[:max_length]
 
@@ -111,9 +121,16 @@ def answer_question(question, persona):
     """Responde à pergunta usando o modelo de IA"""
     global qa_pipeline, md_text
     
-    if not qa_pipeline or not md_text:
+    # Corpus ainda carregando: espera limitada, como o modelo de QA; contingência só se a carga falhou
+    if not md_text:
+        warmup.wait("md_text")
+    if not md_text:
         return fallback_response(persona, "Modelo não disponível")
     
+    # Modelo ainda carregando (espera limitada) ou indisponível: resposta só por palavras-chave
+    if not qa_pipeline and not warmup.wait("qa_model"):
+        return enhanced_fallback_response(question, persona, find_relevant_context(question, md_text))
+    
     try:
         # Encontra contexto relevante
         context = find_relevant_context(question, md_text)
@@ -349,6 +366,9 @@ def health_check():
         "status": "healthy",
         "model_loaded": qa_pipeline is not None,
         "pdf_loaded": len(md_text) > 0,
+        "models": model_registry.memory_report(),
+        "readiness": warmup.report(),
+        "chatbot_readiness": chatbot.warmup.report(),
         "timestamp": datetime.now().isoformat()
     })
 
@@ -368,18 +388,9 @@ def api_info():
     })
 
 if __name__ == '__main__':
-    # Inicialização
     logger.info("Iniciando aplicação...")
-    
-    # Carrega o PDF
-    if os.path.exists(MD_PATH):
-        md_text = extract_md_text(MD_PATH)
-    else:
-        logger.warning(f"Arquivo Markdown não encontrado: {MD_PATH}")
-        md_text = "Arquivo Markdown não disponível"
-    
-    # Carrega o modelo de IA
-    load_ai_model()
+    warmup.start()
+    chatbot.warmup.start()
     
     # Inicia o servidor
     port = int(os.environ.get('PORT', 5000))
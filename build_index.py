@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Gera o índice em disco usado pelos chatbots a partir de PDFs/*.md e PDFs/*.pdf
+
+Cada versão fica em index/v<FORMAT_VERSION>-<hash>/ (hoje v2-<12 hex>), e index/current.json
+aponta para a versão em uso. Conteúdo de cada versão:
+- corpus.txt: texto de todas as fontes concatenado
+- spans.npy: offsets (início, fim) de cada chunk em corpus.txt
+- sections.json: caminho de títulos (seção) de cada chunk
+- embeddings.f16.npy: embeddings normalizados em float16 (ausente com --no-embeddings)
+- terms.json + postings_*.npy + doc_lengths.npy: índice invertido BM25
+- manifest.json: versão do formato, fontes (hash SHA-256) e parâmetros (extração e tamanho dos chunks,
+  conferidos pelos chatbots antes de usar o índice)
+
+Uso:
+    python build_index.py [--source-dir PDFs] [--output index] [--no-embeddings]
+"""
+
+import os
+import sys
+import glob
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from utils.bm25 import BM25Retriever
+from utils.corpus_store import file_sha256
+from utils.embedding_index import normalize_rows
+from utils.index_artifact import (CHUNK_SIZE, DEFAULT_INDEX_DIR, EXTRACTOR_VERSION, FORMAT_VERSION,
+                                  chunk_source, read_source)
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+SOURCE_SEPARATOR = "\n\n"
+
+def find_sources(source_dir):
+    """Arquivos .md e .pdf do diretório, em ordem estável"""
+    paths = glob.glob(os.path.join(source_dir, "*.md")) + glob.glob(os.path.join(source_dir, "*.pdf"))
+    return sorted(paths)
+
+def build_postings_arrays(chunks):
+    """Converte os postings BM25 em arrays CSR (um bloco contíguo por termo)"""
+    postings, doc_lengths = BM25Retriever.build_postings(chunks)
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    doc_ids = []
+    tfs = []
+    for i, term in enumerate(terms):
+        for doc_id, tf in postings[term]:
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+        offsets[i + 1] = len(doc_ids)
+    return terms, offsets, np.array(doc_ids, dtype=np.int32), np.array(tfs, dtype=np.int32), np.array(doc_lengths, dtype=np.int32)
+
+def build_index(source_dir, output_dir, chunk_size=CHUNK_SIZE, with_embeddings=True):
+    """Gera uma nova versão do índice e atualiza index/current.json"""
+    paths = find_sources(source_dir)
+    if not paths:
+        print(f"❌ Nenhum arquivo .md ou .pdf encontrado em {source_dir}")
+        return None
+    
+    corpus_parts = []
+    sources = []
+    spans = []
+    sections = []
+    offset = 0
+    for path in paths:
+        text = read_source(path)
+        first_chunk = len(spans)
+        chunked = chunk_source(text, chunk_size)
+        spans.extend((offset + start, offset + end) for start, end in chunked.spans)
+        sections.extend(chunked.sections)
+        sources.append({
+            "path": path.replace(os.sep, "/"),
+            "sha256": file_sha256(path),
+            "start": offset,
+            "end": offset + len(text),
+            "chunks": [first_chunk, len(spans)]
+        })
+        print(f"📄 {path}: {len(text)} caracteres, {len(spans) - first_chunk} chunks")
+        corpus_parts.append(text)
+        offset += len(text) + len(SOURCE_SEPARATOR)
+    corpus = SOURCE_SEPARATOR.join(corpus_parts)
+    chunks = [corpus[start:end] for start, end in spans]
+    
+    model_name = EMBEDDING_MODEL if with_embeddings else None
+    digest = hashlib.sha256(f"{FORMAT_VERSION}:{EXTRACTOR_VERSION}:{chunk_size}:{model_name}".encode("utf-8"))
+    for source in sources:
+        digest.update(source["sha256"].encode("utf-8"))
+    corpus_hash = digest.hexdigest()
+    version = f"v{FORMAT_VERSION}-{corpus_hash[:12]}"
+    version_path = os.path.join(output_dir, version)
+    
+    if os.path.exists(os.path.join(version_path, "manifest.json")):
+        print(f"✅ Índice já atualizado: {version_path}")
+    else:
+        tmp_path = f"{version_path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        
+        with open(os.path.join(tmp_path, "corpus.txt"), "w", encoding="utf-8", newline="") as file:
+            file.write(corpus)
+        np.save(os.path.join(tmp_path, "spans.npy"), np.array(spans, dtype=np.int64).reshape(-1, 2))
+        with open(os.path.join(tmp_path, "sections.json"), "w", encoding="utf-8") as file:
+            json.dump([list(section) for section in sections], file, ensure_ascii=False)
+        
+        dim = 0
+        if with_embeddings:
+            from sentence_transformers import SentenceTransformer
+            print(f"🧠 Calculando embeddings com {EMBEDDING_MODEL}...")
+            model = SentenceTransformer(EMBEDDING_MODEL)
+            embeddings = normalize_rows(model.encode(chunks, batch_size=64, show_progress_bar=True))
+            dim = int(embeddings.shape[1])
+            np.save(os.path.join(tmp_path, "embeddings.f16.npy"), embeddings.astype(np.float16))
+        
+        terms, offsets, doc_ids, tfs, doc_lengths = build_postings_arrays(chunks)
+        with open(os.path.join(tmp_path, "terms.json"), "w", encoding="utf-8") as file:
+            json.dump(terms, file, ensure_ascii=False)
+        np.save(os.path.join(tmp_path, "postings_offsets.npy"), offsets)
+        np.save(os.path.join(tmp_path, "postings_docs.npy"), doc_ids)
+        np.save(os.path.join(tmp_path, "postings_tfs.npy"), tfs)
+        np.save(os.path.join(tmp_path, "doc_lengths.npy"), doc_lengths)
+        
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "corpus_hash": corpus_hash,
+            "created_at": datetime.now().isoformat(),
+            "embedding_model": model_name,
+            "embedding_dim": dim,
+            "extractor": EXTRACTOR_VERSION,
+            "chunk_size": chunk_size,
+            "n_chunks": len(chunks),
+            "n_terms": len(terms),
+            "sources": sources
+        }
+        with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+        
+        shutil.rmtree(version_path, ignore_errors=True)
+        os.replace(tmp_path, version_path)
+        print(f"✅ Índice gerado: {version_path} ({len(chunks)} chunks, {len(terms)} termos)")
+    
+    # Troca atômica do ponteiro para a versão atual
+    pointer_tmp = os.path.join(output_dir, f"current.json.{os.getpid()}.tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as file:
+        json.dump({"version": version}, file)
+    os.replace(pointer_tmp, os.path.join(output_dir, "current.json"))
+    return version_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o índice em disco dos documentos da tese")
+    parser.add_argument("--source-dir", default="PDFs", help="Diretório com os arquivos .md/.pdf")
+    parser.add_argument("--output", default=DEFAULT_INDEX_DIR, help="Diretório de saída do índice")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Tamanho máximo dos chunks (deve ser o CHUNK_SIZE dos chatbots)")
+    parser.add_argument("--no-embeddings", action="store_true", help="Gera apenas texto e postings")
+    args = parser.parse_args()
+    
+    result = build_index(args.source_dir, args.output, args.chunk_size,
+                         with_embeddings=not args.no_embeddings)
+    sys.exit(0 if result else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,17 @@
 import os
-import numpy as np
-import torch
 import hashlib
 import logging
-import pickle
 
 from datetime import datetime
-from transformers.pipelines import pipeline
-from sentence_transformers import SentenceTransformer
 from PyPDF2 import PdfReader
 
+from utils.embedding_index import EmbeddingIndex
+from utils.markdown_chunker import chunk_markdown
+from utils.query_embedding_cache import query_embedding_cache
+from utils.model_registry import model_registry
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -19,6 +21,7 @@ class DispensacaoChatbot:
         self.qa_pipeline = None
         self.embedding_model = None
         self.chunks = []
+        self.embedding_index = None
         self.cache = {}
         self.load_models()
         self.load_pdf_content()
@@ -26,12 +29,8 @@ class DispensacaoChatbot:
     def load_models(self):
         try:
             logger.info("Carregando modelos de IA...")
-            self.qa_pipeline = pipeline(
-                "question-answering",
-                model="deepset/roberta-base-squad2",
-                device=0 if torch.cuda.is_available() else -1
-            )
-            self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+            self.qa_pipeline = model_registry.acquire("qa", "deepset/roberta-base-squad2")
+            self.embedding_model = model_registry.acquire("embedding", EMBEDDING_MODEL)
             logger.info("Modelos carregados com sucesso!")
         except Exception as e:
             logger.error(f"Erro ao carregar modelos: {e}")
@@ -45,6 +44,8 @@ class DispensacaoChatbot:
 
             text = self.extract_text_from_pdf(self.pdf_path)
             self.chunks = self.chunk_text(text)
+            self.embedding_index = EmbeddingIndex.build(self.chunks, self.embedding_model, EMBEDDING_MODEL,
+                                                        source=os.path.basename(self.pdf_path))
             logger.info(f"PDF processado em {len(self.chunks)} trechos.")
         except Exception as e:
             logger.error(f"Erro ao processar PDF: {e}")
@@ -57,37 +58,16 @@ class DispensacaoChatbot:
             logger.error(f"Erro ao extrair texto do PDF: {e}")
             return ""
 
-    def chunk_text(self, text, chunk_size=1500, overlap=300):
-        if len(text) <= chunk_size:
-            return [text]
-
-        chunks = []
-        start = 0
-        while start < len(text):
-            end = start + chunk_size
-            best_break = max(
-                text.rfind(sep, start, end) for sep in ['\n\n', '. ', '\n', ' '] if text.rfind(sep, start, end) != -1
-            )
-            if best_break < start + chunk_size * 0.7:
-                best_break = end
-            chunks.append(text[start:best_break].strip())
-            start = best_break - overlap
-
-        return chunks
+    def chunk_text(self, text, chunk_size=1500):
+        return chunk_markdown(text, chunk_size)
 
     def get_relevant_chunks(self, question, top_k=3):
-        if not self.chunks:
+        if not self.chunks or self.embedding_index is None:
             return []
 
-        question_embedding = self.embedding_model.encode(question)
-        chunk_embeddings = self.embedding_model.encode(self.chunks)
-
-        similarities = np.dot(chunk_embeddings, question_embedding) / (
-            np.linalg.norm(chunk_embeddings, axis=1) * np.linalg.norm(question_embedding)
-        )
-
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        return [self.chunks[i] for i in top_indices if similarities[i] > 0.1]
+        question_embedding = query_embedding_cache.encode(self.embedding_model, question, EMBEDDING_MODEL)
+        top_indices, similarities = self.embedding_index.search(question_embedding, top_k)
+        return [self.chunks[i] for i, score in zip(top_indices, similarities) if score > 0.1]
 
     def answer_question(self, question):
         cache_key = hashlib.md5(question.encode()).hexdigest()
@@ -160,11 +160,27 @@ class ChatbotInterface {
         this.showTypingIndicator();
         
         try {
-            const responseText = await this.fetchLLMResponse(message);
-            this.hideTypingIndicator();
-            // Processa o texto sem markdownit para evitar erros
-            const processedText = this.processText(responseText);
-            this.addMessage(processedText, 'bot');
+            // Streaming: a bolha aparece com o cabeçalho da persona e cresce a cada trecho
+            let bubble = null;
+            const streamedText = await this.fetchLLMStream(message, (text) => {
+                if (!bubble) {
+                    this.hideTypingIndicator();
+                    bubble = this.renderMessage(text, 'bot');
+                } else {
+                    bubble.innerHTML = this.processText(text);
+                }
+                this.scrollToBottom();
+            });
+            if (bubble) {
+                this.recordMessage(streamedText, 'bot');
+            } else {
+                // Servidor sem streaming: resposta completa de /api/chat
+                const responseText = await this.fetchLLMResponse(message);
+                this.hideTypingIndicator();
+                // Processa o texto sem markdownit para evitar erros
+                const processedText = this.processText(responseText);
+                this.addMessage(processedText, 'bot');
+            }
         } catch (error) {
             this.hideTypingIndicator();
             this.showError('Desculpe, ocorreu um erro ao conectar. Tente novamente.');
@@ -175,6 +191,71 @@ class ChatbotInterface {
         }
     }
 
+    async fetchLLMStream(userMessage, onText) {
+        // Versão em streaming (SSE) da API; retorna null se o servidor não oferecer streaming
+        const apiUrl = '/api/chat/stream';
+        const personality_id = this.currentPersona === 'professor' ? 'dr_gasnelio' : 'ga';
+
+        let response;
+        try {
+            response = await fetch(apiUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream'
+                },
+                body: JSON.stringify({ question: userMessage, personality_id: personality_id }),
+            });
+        } catch (error) {
+            console.warn('Streaming indisponível, usando /api/chat:', error);
+            return null;
+        }
+
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!response.ok || !response.body || !contentType.includes('text/event-stream')) {
+            return null;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const event = this.parseSSE(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (event.type === 'header' || event.type === 'delta') {
+                    text += event.data.text;
+                    onText(text);
+                } else if (event.type === 'error') {
+                    throw new Error(event.data.error);
+                } else if (event.type === 'done') {
+                    console.log('Resposta em streaming concluída:', event.data);
+                    return text;
+                }
+            }
+        }
+        return text;
+    }
+
+    parseSSE(rawEvent) {
+        let type = 'message';
+        const dataLines = [];
+        for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event:')) {
+                type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trimStart());
+            }
+        }
+        return { type, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : {} };
+    }
+
     async fetchLLMResponse(userMessage) {
         // Configuração da API com melhorias implementadas
         const apiUrl = '/api/chat';
@@ -223,6 +304,12 @@ class ChatbotInterface {
     }
     
     addMessage(text, sender) {
+        const messageBubble = this.renderMessage(text, sender);
+        this.recordMessage(text, sender);
+        return messageBubble;
+    }
+
+    renderMessage(text, sender) {
         const messageContainer = document.createElement('div');
         messageContainer.className = `w-full flex gap-3 items-end ${sender === 'user' ? 'justify-end' : 'justify-start'} message-slide-in`;
         const messageBubble = document.createElement('div');
@@ -244,7 +331,11 @@ class ChatbotInterface {
             messageContainer.appendChild(messageBubble);
         }
         this.chatWindow.appendChild(messageContainer);
-        
+        this.scrollToBottom();
+        return messageBubble;
+    }
+
+    recordMessage(text, sender) {
         // Salva no histórico visual com informações da persona
         const messageData = { 
             text, 
@@ -254,7 +345,6 @@ class ChatbotInterface {
         };
         this.chatHistory.push(messageData);
         this.saveHistory();
-        this.scrollToBottom();
     }
     
     showTypingIndicator() {
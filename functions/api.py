@@ -4,7 +4,6 @@ import sys
 import logging
 from datetime import datetime
 import numpy as np
-from numpy import zeros, dot, argsort, linalg
 import hashlib
 import re
 
@@ -15,16 +14,18 @@ logger = logging.getLogger(__name__)
 # Adicionar o diretório atual ao path para importar módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
-    from transformers.pipelines import pipeline
-    import torch
-    from sentence_transformers import SentenceTransformer
-    import PyPDF2
-except ImportError as e:
-    logger.error(f"Erro ao importar dependências: {e}")
-    raise
+from utils.embedding_index import EmbeddingIndex, top_k_indices
+from utils.index_artifact import CHUNK_SIZE, IndexArtifact, chunk_source, read_source
+from utils.corpus_store import CorpusStore
+from utils.corpus_watcher import CorpusWatcher
+from utils.synonym_expander import SynonymExpander
+from utils.term_matrix import TermMatrix
+from utils.query_embedding_cache import query_embedding_cache
+from utils.model_registry import model_registry, warm_up
+from utils.warmup import Warmup
 
 KIMIE2_MODEL = "kimie/kimie2-pt-qa:free"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY_KIMIE2", "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")
 
 ASTRA_DB_ENDPOINT = os.environ.get("ASTRA_DB_ENDPOINT")
@@ -36,12 +37,24 @@ logger.info(f"ASTRA_DB_TOKEN set: {bool(ASTRA_DB_TOKEN)}")
 logger.info(f"OPENROUTER_API_KEYROTEIRO_DISP_KIMIE_K2FREE set: {bool(OPENROUTER_API_KEYROTEIRO_DISP_KIMIE_K2FREE)}")
 
 class HanseniaseChatbot:
-    def __init__(self):
+    def __init__(self, background=False):
+        """
+        Args:
+            background: Carrega modelos e PDF em uma thread de fundo (servidores HTTP);
+                sem ele, o construtor só retorna com tudo carregado (Netlify Functions)
+        """
         self.pdf_path = "PDFs/Roteiro de Dsispensação - Hanseníase F.docx.pdf"
         self.qa_pipeline = None
+        self.qa_engine = None
         self.embedding_model = None
         self.cache = {}
         
+        # Corpus atual (texto, chunks e índice); trocado atomicamente quando o arquivo muda
+        self.corpus = None
+        self.corpus_store = CorpusStore(self.build_corpus)
+        self.corpus_store.listeners.append(self.on_corpus_swap)
+        self.corpus_watcher = None
+        
         # Dicionário de sinônimos e termos relacionados
         self.synonyms = {
             'hanseníase': ['lepra', 'doença de hansen', 'mycobacterium leprae'],
@@ -75,170 +88,193 @@ class HanseniaseChatbot:
             'compliance': ['aderência', 'cumprimento', 'seguimento do tratamento'],
             'monitoramento': ['acompanhamento', 'vigilância', 'supervisão']
         }
+        self.synonym_expander = SynonymExpander(self.synonyms)
         
-        self.load_models()
-        self.load_pdf_content()
+        # Modelos (com inferência de aquecimento) e depois o PDF, que depende do modelo de embeddings
+        self.warmup = Warmup("hanseniase-warmup")
+        self.warmup.add("models", self.load_models).add("corpus", self.load_pdf_content)
+        # Em segundo plano, a carga começa no processo que atende (hook do gunicorn, __main__ ou
+        # primeira pergunta), nunca no import: threads não passam pelo fork do preload_app
+        if not background:
+            self.warmup.run()
     
     def load_models(self):
         """Carrega o modelo Kimie2 via HuggingFace/Transformers"""
         try:
             logger.info("Carregando modelo Kimie2 via HuggingFace...")
-            self.qa_pipeline = pipeline(
-                "question-answering",
-                model=KIMIE2_MODEL,
-                tokenizer=KIMIE2_MODEL,
-                device=-1 if not torch.cuda.is_available() else 0
-            )
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            # Modelos compartilhados com os demais pontos de entrada do processo (carregados uma vez);
+            # backend por QA_BACKEND (torch/quantized/onnx), requisições concorrentes compartilham o forward pass
+            self.qa_pipeline = model_registry.acquire("qa", KIMIE2_MODEL)
+            self.qa_engine = self.qa_pipeline.pipeline
+            self.embedding_model = model_registry.acquire("embedding", EMBEDDING_MODEL)
+            warm_up("qa", self.qa_pipeline)
+            warm_up("embedding", self.embedding_model)
             logger.info("Modelos carregados com sucesso!")
         except Exception as e:
             logger.error(f"Erro ao carregar modelos: {e}")
             raise
     
-    def load_pdf_content(self):
-        """Carrega e processa o conteúdo do PDF"""
-        try:
-            if os.path.exists(self.pdf_path):
-                self.pdf_text = self.extract_text_from_pdf(self.pdf_path)
-                self.chunks = self.chunk_text(self.pdf_text)
-                logger.info(f"PDF carregado: {len(self.chunks)} chunks")
-            else:
-                logger.warning(f"PDF não encontrado: {self.pdf_path}")
-                self.pdf_text = ""
-                self.chunks = []
-        except Exception as e:
-            logger.error(f"Erro ao carregar PDF: {e}")
-            self.pdf_text = ""
-            self.chunks = []
+    @property
+    def pdf_text(self):
+        return self.corpus.text if self.corpus else ""
+    
+    @property
+    def chunks(self):
+        return self.corpus.chunks if self.corpus else []
+    
+    @property
+    def embedding_index(self):
+        return self.corpus.index if self.corpus else None
     
-    def chunk_text(self, text, chunk_size=1500, overlap=300):
-        """Divide o texto em chunks menores com melhor preservação de contexto"""
-        if len(text) <= chunk_size:
-            return [text]
+    def load_pdf_content(self):
+        """Carrega e processa o conteúdo do PDF e passa a observar mudanças no arquivo"""
+        if not os.path.exists(self.pdf_path):
+            logger.warning(f"PDF não encontrado: {self.pdf_path}")
+            return
         
-        chunks = []
-        start = 0
+        self.corpus = self.corpus_store.get("hanseniase", self.pdf_path)
+        if self.corpus is not None:
+            logger.info(f"PDF carregado: {len(self.corpus.chunks)} chunks")
         
-        while start < len(text):
-            end = start + chunk_size
-            
-            if end >= len(text):
-                chunks.append(text[start:])
-                break
-            
-            # Tenta quebrar em parágrafos primeiro
-            last_paragraph = text.rfind('\n\n', start, end)
-            last_newline = text.rfind('\n', start, end)
-            last_sentence = text.rfind('. ', start, end)
-            last_space = text.rfind(' ', start, end)
-            
-            # Prioridade: parágrafo > frase > quebra de linha > espaço
-            if last_paragraph > start + chunk_size * 0.7:
-                end = last_paragraph + 2
-            elif last_sentence > start + chunk_size * 0.7:
-                end = last_sentence + 2
-            elif last_newline > start + chunk_size * 0.7:
-                end = last_newline + 1
-            elif last_space > start + chunk_size * 0.7:
-                end = last_space + 1
+        if self.corpus_watcher is None:
+            self.corpus_watcher = CorpusWatcher({"hanseniase": self.pdf_path}, self.reload_corpus).start()
+    
+    def build_corpus(self, pdf_path, previous=None):
+        """Extrai, divide por seção e indexa o PDF, reaproveitando os embeddings dos chunks inalterados"""
+        corpus = None
+        if previous is None:
+            # Índice gerado por build_index.py: chunks e embeddings mapeados em memória
+            artifact = IndexArtifact.open()
+            corpus = artifact.source_corpus(pdf_path, EMBEDDING_MODEL) if artifact else None
+            if corpus is not None:
+                logger.info("PDF carregado do índice em disco")
+        
+        if corpus is None:
+            text = self.extract_text_from_pdf(pdf_path)
+            # Chunks não atravessam seções: seções inalteradas geram os mesmos chunks e reaproveitam embeddings
+            chunks = self.chunk_text(text)
             
-            chunks.append(text[start:end])
-            start = end - overlap
+            index = None
+            if chunks and self.embedding_model is not None:
+                reuse = (previous.chunks, previous.index) if previous and previous.index is not None else None
+                index = EmbeddingIndex.build(chunks, self.embedding_model, EMBEDDING_MODEL, previous=reuse,
+                                             source=os.path.basename(pdf_path))
+            corpus = (text, chunks, index)
         
-        return chunks
+        # Tokens dos chunks para o modelo de QA calculados na indexação, fora do caminho das perguntas
+        if self.qa_engine is not None:
+            self.qa_engine.pretokenize(corpus[1])
+        return corpus
+    
+    def reload_corpus(self, key, path):
+        """Chamado pelo watcher: reindexa fora do caminho das requisições e troca o corpus"""
+        corpus = self.corpus_store.get(key, path)
+        if corpus is not None:
+            self.corpus = corpus
+    
+    def on_corpus_swap(self, key, previous, current):
+        """Invalida as respostas em cache ligadas à versão anterior do corpus"""
+        self.cache.clear()
+        logger.info(f"Corpus atualizado ({previous.content_hash[:12]} -> {current.content_hash[:12]}), cache de respostas limpo")
+    
+    def chunk_text(self, text, chunk_size=CHUNK_SIZE):
+        """Divide o texto em chunks por seção/parágrafo (mesmo tamanho do índice em disco)"""
+        return chunk_source(text, chunk_size)
     
     def extract_text_from_pdf(self, pdf_path):
-        """Extrai texto do PDF"""
+        """Extrai texto do PDF (mesma extração do build_index.py)"""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                
-                return text.strip()
+            return read_source(pdf_path)
         except Exception as e:
             logger.error(f"Erro ao extrair texto do PDF {pdf_path}: {e}")
             return ""
     
     def expand_query_with_synonyms(self, question):
-        """Expande a pergunta com sinônimos e termos relacionados"""
-        expanded_terms = [question.lower()]
-        
-        for term, synonyms in self.synonyms.items():
-            if term in question.lower():
-                for synonym in synonyms:
-                    expanded_question = question.lower().replace(term, synonym)
-                    if expanded_question not in expanded_terms:
-                        expanded_terms.append(expanded_question)
-        
-        return expanded_terms
+        """Expande a pergunta com sinônimos: dict termo -> peso (termos da pergunta pesam mais)"""
+        return self.synonym_expander.expand(question)
+    
+    def question_variations(self, question, max_synonym_variants=2):
+        """Pergunta original, sem pontuação final e reescrita com sinônimos (sem repetições)"""
+        variations = [question, question.replace("?", "").strip()]
+        variations.extend(self.synonym_expander.variants(question, max_synonym_variants))
+        return list(dict.fromkeys(variation for variation in variations if variation))
     
-    def get_relevant_chunks(self, question, top_k=3):
-        """Encontra os chunks mais relevantes para a pergunta com busca otimizada"""
-        if not self.chunks or self.embedding_model is None:
+    def get_relevant_chunks(self, question, top_k=3, with_scores=False):
+        """Encontra os chunks mais relevantes para a pergunta com busca otimizada (com scores, se pedido)"""
+        corpus = self.corpus
+        if corpus is None or not corpus.chunks or self.embedding_model is None or corpus.index is None:
             return []
+        chunks = corpus.chunks
         
         try:
-            # Busca por palavras-chave primeiro (mais rápida)
-            keyword_scores = zeros(len(self.chunks))
-            question_words = set(question.lower().split())
+            # Busca por palavras-chave primeiro (mais rápida), com a pergunta expandida por sinônimos:
+            # um produto matriz-vetor sobre a matriz chunk x termo do corpus
+            if corpus.term_matrix is None:
+                corpus.term_matrix = TermMatrix(chunks)
+            term_weights = self.expand_query_with_synonyms(question)
+            question_size = sum(1 for weight in term_weights.values() if weight == 1.0)
+            keyword_scores = np.minimum(corpus.term_matrix.dot(term_weights) / max(question_size, 1), 1.0)
             
-            for i, chunk in enumerate(self.chunks):
-                chunk_words = set(chunk.lower().split())
-                common_words = question_words.intersection(chunk_words)
-                if common_words:
-                    keyword_scores[i] = len(common_words) / len(question_words)
+            question_embedding = query_embedding_cache.encode(self.embedding_model, question, EMBEDDING_MODEL)
             
             # Se encontrou chunks com palavras-chave, usar apenas eles
-            keyword_chunks = [i for i, score in enumerate(keyword_scores) if score > 0.1]
+            keyword_mask = keyword_scores > 0.1
             
-            if keyword_chunks:
-                # Usar apenas chunks com palavras-chave para embedding
-                selected_chunks = [self.chunks[i] for i in keyword_chunks]
-                question_embedding = self.embedding_model.encode(question)
-                chunk_embeddings = self.embedding_model.encode(selected_chunks)
+            if keyword_mask.any():
+                # Similaridade com todos os chunks: um único produto matriz-vetor sobre o índice
+                similarities = corpus.index.similarities(question_embedding)
                 
-                # Calcular similaridade
-                similarities = dot(chunk_embeddings, question_embedding) / (
-                    linalg.norm(chunk_embeddings, axis=1) * linalg.norm(question_embedding)
-                )
+                # Combinar scores (chunks sem palavras-chave ficam de fora)
+                final_scores = np.where(keyword_mask, 0.6 * similarities + 0.4 * keyword_scores, -np.inf)
                 
-                # Combinar scores
-                final_scores = 0.6 * similarities + 0.4 * keyword_scores[keyword_chunks]
-                
-                # Pegar os melhores
-                top_indices = argsort(final_scores)[-top_k:][::-1]
-                relevant_chunks = [selected_chunks[i] for i in top_indices if final_scores[i] > 0.05]
+                # Pegar os melhores (argpartition)
+                top_indices = top_k_indices(final_scores, min(top_k, int(keyword_mask.sum())))
+                scored_chunks = [(chunks[i], float(final_scores[i])) for i in top_indices if final_scores[i] > 0.05]
                 
             else:
-                # Fallback: usar embedding em todos os chunks
-                question_embedding = self.embedding_model.encode(question)
-                chunk_embeddings = self.embedding_model.encode(self.chunks)
-                
-                similarities = dot(chunk_embeddings, question_embedding) / (
-                    linalg.norm(chunk_embeddings, axis=1) * linalg.norm(question_embedding)
-                )
-                
-                top_indices = argsort(similarities)[-top_k:][::-1]
-                relevant_chunks = [self.chunks[i] for i in top_indices if similarities[i] > 0.1]
+                # Fallback: busca semântica em todos os chunks (aproximada em corpora grandes)
+                top_indices, top_scores = corpus.index.search(question_embedding, top_k)
+                scored_chunks = [(chunks[i], float(score)) for i, score in zip(top_indices, top_scores) if score > 0.1]
             
-            return relevant_chunks
+            if with_scores:
+                return scored_chunks
+            return [chunk for chunk, _ in scored_chunks]
             
         except Exception as e:
             logger.error(f"Erro ao calcular similaridade: {e}")
             return []
     
+    def warming_up_response(self, personality_id):
+        """Resposta enquanto modelos e PDF ainda estão carregando (não vai para o cache)"""
+        if personality_id == "dr_gasnelio":
+            answer = "Estou terminando de carregar o material da tese. Por favor, envie sua pergunta novamente em alguns instantes."
+            personality_name = "Dr. Gasnelio"
+        else:
+            answer = "Só um instantinho! Ainda estou abrindo o material aqui. Manda a pergunta de novo daqui a pouco? 😊"
+            personality_name = "Gá"
+        return {
+            "answer": answer,
+            "confidence": 0.0,
+            "source": "warming_up",
+            "personality": personality_name,
+            "disease": "Hanseníase"
+        }
+    
     def answer_question(self, question, personality_id):
         """Responde uma pergunta sobre hanseníase com cobertura melhorada"""
-        # Verificar cache
-        cache_key = f"{personality_id}_{hashlib.md5(question.encode()).hexdigest()}"
+        # Inicialização em segundo plano: espera limitada pelos modelos e pelo PDF
+        if not self.warmup.wait() and self.warmup.loading():
+            return self.warming_up_response(personality_id)
+        
+        # Verificar cache (chave inclui a versão do corpus)
+        corpus_version = self.corpus.content_hash[:12] if self.corpus else "none"
+        cache_key = f"{corpus_version}_{personality_id}_{hashlib.md5(question.encode()).hexdigest()}"
         if cache_key in self.cache:
             return self.cache[cache_key]
         
         # Obter chunks relevantes com busca expandida
-        relevant_chunks = self.get_relevant_chunks(question, top_k=3)
+        scored_chunks = self.get_relevant_chunks(question, top_k=3, with_scores=True)
+        relevant_chunks = [chunk for chunk, _ in scored_chunks]
         
         if not relevant_chunks:
             # Sem resposta encontrada no PDF
@@ -269,37 +305,24 @@ class HanseniaseChatbot:
             if self.qa_pipeline is None:
                 raise Exception("Pipeline de QA não disponível")
             
-            # Tentar apenas 2 variações da pergunta para melhor performance
-            question_variations = [
-                question,
-                question.replace("?", "").strip()
-            ]
+            # Variações da pergunta (sem "?" e com sinônimos) avaliadas em um único forward pass
+            question_variations = self.question_variations(question)
             
-            best_result = None
-            best_confidence = 0.0
+            # Contexto montado com os tokens já calculados dos chunks, ajustado a uma única janela
+            # do modelo (passagens por densidade de score) para não haver inferência em várias janelas
+            qa_context = self.qa_engine.pack(relevant_chunks, question_variations,
+                                             [score for _, score in scored_chunks])
+            results = self.qa_pipeline(
+                question=question_variations,
+                context=qa_context,
+                max_answer_len=200,  # Reduzido para melhor performance
+                handle_impossible_answer=True
+            )
             
-            for q_var in question_variations:
-                try:
-                    result = self.qa_pipeline(
-                        question=q_var,
-                        context=context,
-                        max_answer_len=200,  # Reduzido para melhor performance
-                        handle_impossible_answer=True
-                    )
-                    
-                    # Verificar se result é um dicionário
-                    if isinstance(result, dict):
-                        confidence = result.get('score', 0.0)
-                        
-                        if confidence > best_confidence:
-                            best_confidence = confidence
-                            best_result = result
-                        
-                except Exception as e:
-                    logger.debug(f"Erro com variação da pergunta: {e}")
-                    continue
+            best_result = max(results, key=lambda result: result.get('score', 0.0), default=None)
+            best_confidence = best_result.get('score', 0.0) if best_result else 0.0
             
-            if best_result is None:
+            if best_result is None or best_confidence <= 0.0:
                 raise Exception("Nenhuma resposta válida encontrada")
             
             # Verificar confiança
@@ -406,6 +429,11 @@ def handler(event, context):
                     "status": "healthy",
                     "pdf_loaded": len(chatbot.chunks) > 0,
                     "models_loaded": chatbot.qa_pipeline is not None and chatbot.embedding_model is not None,
+                    "query_embedding_cache": query_embedding_cache.stats(),
+                    "qa_batcher": chatbot.qa_pipeline.stats() if chatbot.qa_pipeline is not None else None,
+                    "qa_engine": chatbot.qa_engine.stats() if chatbot.qa_engine is not None else None,
+                    "models": model_registry.memory_report(),
+                    "readiness": chatbot.warmup.report(),
                     "timestamp": datetime.now().isoformat()
                 })
             }
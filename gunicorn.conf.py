@@ -1,7 +1,7 @@
 import os
 
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
-workers = 1
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
 worker_class = "sync"
 worker_connections = 1000
 timeout = 120
@@ -9,4 +9,10 @@ keepalive = 2
 max_requests = 1000
 max_requests_jitter = 50
 preload_app = True
-reload = False 
\ No newline at end of file
+reload = False 
+
+def post_worker_init(worker):
+    """Carga de modelos e corpus em cada worker: com preload_app, threads iniciadas no master não passam pelo fork"""
+    from utils import corpus_watcher, warmup
+    warmup.start_all()
+    corpus_watcher.start_all()
@@ -10,6 +10,8 @@ import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from utils.async_client import async_http_client
+
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -222,41 +224,15 @@ class LangflowIntegration:
         Returns:
             Dict com a resposta processada
         """
-        if not flow_id:
-            # Usar fluxo padrão
-            flow_id = "hanseniase_default"
-        
-        payload = {
-            "flow_id": flow_id,
-            "inputs": {
-                "question": question,
-                "personality": personality
-            }
-        }
+        payload = self._process_payload(question, personality, flow_id)
         
         try:
             response = self.session.post(
                 f"{self.langflow_url}/api/v1/process",
                 json=payload
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return {
-                    "success": True,
-                    "answer": result.get("output", ""),
-                    "confidence": result.get("confidence", 0.0),
-                    "personality": personality,
-                    "timestamp": datetime.now().isoformat(),
-                    "source": "langflow"
-                }
-            else:
-                logger.error(f"Erro ao processar pergunta: {response.status_code}")
-                return {
-                    "success": False,
-                    "error": f"Erro {response.status_code}",
-                    "fallback": True
-                }
+            result = response.json() if response.status_code == 200 else None
+            return self._process_result(response.status_code, result, personality)
                 
         except Exception as e:
             logger.error(f"Erro ao processar pergunta: {e}")
@@ -266,6 +242,66 @@ class LangflowIntegration:
                 "fallback": True
             }
     
+    async def process_question_async(self, question: str, personality: str = "dr_gasnelio",
+                                     flow_id: Optional[str] = None, deadline: float = 30) -> Dict[str, Any]:
+        """
+        Versão assíncrona de process_question (roda no loop do async_http_client)
+        
+        Args:
+            deadline: Tempo máximo da chamada em segundos
+        """
+        payload = self._process_payload(question, personality, flow_id)
+        
+        try:
+            status, result = await async_http_client.post_json(
+                f"{self.langflow_url}/api/v1/process",
+                deadline,
+                json=payload,
+                headers=dict(self.session.headers)
+            )
+            return self._process_result(status, result, personality)
+                
+        except Exception as e:
+            logger.error(f"Erro ao processar pergunta: {e!r}")
+            return {
+                "success": False,
+                "error": str(e) or type(e).__name__,
+                "fallback": True
+            }
+    
+    def _process_payload(self, question: str, personality: str, flow_id: Optional[str]) -> Dict[str, Any]:
+        """Payload de /api/v1/process"""
+        if not flow_id:
+            # Usar fluxo padrão
+            flow_id = "hanseniase_default"
+        
+        return {
+            "flow_id": flow_id,
+            "inputs": {
+                "question": question,
+                "personality": personality
+            }
+        }
+    
+    def _process_result(self, status: int, result: Any, personality: str) -> Dict[str, Any]:
+        """Resposta de /api/v1/process no formato do chatbot"""
+        if status == 200:
+            return {
+                "success": True,
+                "answer": result.get("output", ""),
+                "confidence": result.get("confidence", 0.0),
+                "personality": personality,
+                "timestamp": datetime.now().isoformat(),
+                "source": "langflow"
+            }
+        else:
+            logger.error(f"Erro ao processar pergunta: {status}")
+            return {
+                "success": False,
+                "error": f"Erro {status}",
+                "fallback": True
+            }
+    
     def get_available_flows(self) -> Dict[str, Any]:
         """
         Lista todos os fluxos disponíveis
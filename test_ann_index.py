@@ -0,0 +1,112 @@
+"""
+Testes do índice aproximado IVF (recall contra a busca exata e inserção incremental)
+"""
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.ann_index import IVFIndex
+from utils.embedding_index import normalize_rows
+
+def clustered_vectors(n, dim=32, clusters=50, seed=0):
+    """Vetores normalizados agrupados, como embeddings de chunks de assuntos parecidos"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, n)] + 0.3 * rng.normal(size=(n, dim))
+    return normalize_rows(vectors)
+
+def recall(index, queries, top_k, nprobe=None):
+    hits = 0
+    for query in queries:
+        exact_ids, _ = index.search(query, top_k, exact=True)
+        approx_ids, _ = index.search(query, top_k, nprobe=nprobe)
+        hits += len(set(exact_ids.tolist()) & set(approx_ids.tolist()))
+    return hits / (len(queries) * top_k)
+
+def test_recall_against_exact():
+    """Recall@10 alto com o nprobe padrão e crescente com nprobe"""
+    vectors = clustered_vectors(5000)
+    index = IVFIndex(vectors.shape[1], exact_threshold=1000)
+    index.add(vectors)
+    assert index.trained and index.n_lists == int(np.sqrt(5000))
+
+    queries = clustered_vectors(50, seed=1)
+    low = recall(index, queries, 10, nprobe=1)
+    default = recall(index, queries, 10)
+    full = recall(index, queries, 10, nprobe=index.n_lists)
+    assert default >= 0.9
+    assert low <= default <= full and full == 1.0
+    print(f"✅ Recall@10 contra a busca exata: nprobe=1 {low:.2f}, padrão {default:.2f}, todas as listas {full:.2f}")
+
+def test_exact_below_threshold():
+    """Abaixo do limiar não há treino e a busca é exata, em ordem decrescente"""
+    vectors = clustered_vectors(200)
+    index = IVFIndex(vectors.shape[1], exact_threshold=1000)
+    index.add(vectors)
+    assert not index.trained
+    ids, scores = index.search(vectors[7], top_k=5)
+    assert ids[0] == 7 and abs(scores[0] - 1.0) < 1e-5
+    assert all(scores[i] >= scores[i + 1] for i in range(len(scores) - 1))
+    print("✅ Busca exata abaixo do limiar OK")
+
+def test_incremental_add():
+    """Vetores inseridos depois do treino entram nas listas e são encontrados"""
+    vectors = clustered_vectors(3000)
+    index = IVFIndex(vectors.shape[1], exact_threshold=1000)
+    index.add(vectors[:1500])
+    assert index.trained
+    index.add(vectors[1500:])
+    assert len(index) == 3000
+    found = sum(index.search(vectors[i], top_k=1, nprobe=index.n_lists)[0][0] == i for i in range(1500, 3000, 50))
+    assert found == len(range(1500, 3000, 50))
+    print("✅ Inserção incremental OK")
+
+def test_concurrent_first_searches():
+    """Buscas simultâneas logo após o treino não alteram as listas nem duplicam ids"""
+    vectors = clustered_vectors(3000)
+    index = IVFIndex(vectors.shape[1], exact_threshold=1000)
+    index.add(vectors)
+    queries = clustered_vectors(64, seed=2)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda query: index.search(query, 10, nprobe=index.n_lists)[0], queries))
+    for query, ids in zip(queries, results):
+        assert len(set(ids.tolist())) == len(ids)
+        assert np.array_equal(ids, index.search(query, 10, exact=True)[0])
+    list_ids = np.concatenate(index._lists)
+    assert np.array_equal(np.sort(list_ids), np.arange(3000))
+    print("✅ Buscas concorrentes sem duplicar ids OK")
+
+def test_shared_float16_matrix():
+    """Sobre o memmap float16 do índice em disco: listas só com ids, sem cópia da matriz"""
+    vectors = clustered_vectors(3000)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "embeddings.f16.npy")
+        np.save(path, vectors.astype(np.float16))
+        matrix = np.load(path, mmap_mode="r")
+        index = IVFIndex.over(matrix, exact_threshold=1000)
+        assert index.trained and np.shares_memory(index.vectors, matrix)
+        assert all(ids.dtype == np.int64 and ids.ndim == 1 for ids in index._lists)
+
+        queries = clustered_vectors(50, seed=1)
+        assert recall(index, queries, 10) >= 0.9
+        assert recall(index, queries, 10, nprobe=index.n_lists) == 1.0
+        try:
+            index.add(vectors[:1])
+            assert False, "índice compartilhado aceitou inserção"
+        except ValueError:
+            pass
+        del index, matrix
+    print("✅ Índice sobre matriz float16 compartilhada OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do índice IVF")
+    print("=" * 50)
+    test_recall_against_exact()
+    test_exact_below_threshold()
+    test_incremental_add()
+    test_concurrent_first_searches()
+    test_shared_float16_matrix()
+    print("\n✅ Todos os testes passaram!")
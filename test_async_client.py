@@ -0,0 +1,183 @@
+"""
+Testes do cliente HTTP assíncrono contra um servidor local lento (sem rede externa)
+Centenas de chamadas em andamento no mesmo loop, prazo, limite de concorrência,
+cancelamento das tentativas perdedoras do hedging e novas tentativas com Retry-After
+"""
+
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.async_client import AsyncHttpClient
+from utils.circuit_breaker import CircuitBreaker
+from utils.hedged_calls import HedgedCaller
+from utils.http_client import retry_after_seconds
+
+class SlowStandIn(BaseHTTPRequestHandler):
+    """Imita o endpoint de chat demorando ?delay= segundos para responder"""
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        delay = float(self.path.partition("delay=")[2] or 0)
+        time.sleep(delay)
+        body = json.dumps({"choices": [{"message": {"content": f"ok {delay}"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class RateLimitedStandIn(BaseHTTPRequestHandler):
+    """Responde 429 com Retry-After: ?retry_after= nas primeiras ?fail= chamadas, depois 200"""
+    protocol_version = "HTTP/1.1"
+    calls = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        params = dict(part.split("=") for part in self.path.partition("?")[2].split("&"))
+        RateLimitedStandIn.calls += 1
+        if RateLimitedStandIn.calls <= int(params["fail"]):
+            status, body = 429, json.dumps({"error": "rate limited"}).encode()
+        else:
+            status, body = 200, json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", params["retry_after"])
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_server(handler=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler or SlowStandIn)
+    server.request_queue_size = 512
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/chat"
+
+async def chat(client, url, delay, deadline=5):
+    status, data = await client.post_json(f"{url}?delay={delay}", deadline, json={"q": "x"})
+    assert status == 200
+    return data["choices"][0]["message"]["content"]
+
+def test_hundreds_in_flight():
+    """200 chamadas de 0,3 s no mesmo loop terminam juntas, sem uma thread por chamada"""
+    url = start_server()
+    client = AsyncHttpClient(max_concurrency=200)
+    calls = 200
+
+    async def burst():
+        return await asyncio.gather(*(chat(client, url, 0.3) for _ in range(calls)))
+
+    start = time.perf_counter()
+    answers = client.run(burst(), timeout=30)
+    elapsed = time.perf_counter() - start
+    assert len(answers) == calls
+    assert client.peak_in_flight > 100
+    assert elapsed < 0.3 * calls / 10
+    print(f"✅ {calls} chamadas em {elapsed:.2f}s numa única thread de loop "
+          f"(pico de {client.peak_in_flight} em andamento; sequencial levaria {0.3 * calls:.0f}s)")
+    client.close()
+
+def test_concurrency_limit():
+    """Acima do limite, as chamadas esperam uma vaga"""
+    url = start_server()
+    client = AsyncHttpClient(max_concurrency=5)
+
+    async def burst():
+        return await asyncio.gather(*(chat(client, url, 0.1) for _ in range(20)))
+
+    start = time.perf_counter()
+    client.run(burst(), timeout=10)
+    elapsed = time.perf_counter() - start
+    assert client.peak_in_flight == 5
+    assert elapsed >= 0.4
+    print(f"✅ Limite de concorrência OK (pico {client.peak_in_flight}, {elapsed:.2f}s)")
+    client.close()
+
+def test_deadline():
+    """Chamada que passa do prazo é cancelada e conta como timeout"""
+    url = start_server()
+    client = AsyncHttpClient()
+    start = time.perf_counter()
+    try:
+        client.run(chat(client, url, 2, deadline=0.2), timeout=5)
+        raise AssertionError("prazo não respeitado")
+    except asyncio.TimeoutError:
+        pass
+    assert time.perf_counter() - start < 0.5
+    assert client.stats()["timeouts"] == 1 and client.in_flight == 0
+    print("✅ Prazo por chamada OK")
+    client.close()
+
+def test_hedged_losers_cancelled():
+    """No hedging assíncrono, a tentativa lenta é cancelada quando a rápida responde"""
+    url = start_server()
+    client = AsyncHttpClient()
+    breakers = {"lento": CircuitBreaker("lento"), "rapido": CircuitBreaker("rapido")}
+    caller = HedgedCaller(hedge_delay=0.05, deadline=5)
+    attempts = [
+        ("lento", lambda: breakers["lento"].acall(lambda: chat(client, url, 2))),
+        ("rapido", lambda: breakers["rapido"].acall(lambda: chat(client, url, 0.05))),
+    ]
+
+    start = time.perf_counter()
+    result, name, records = client.run(caller.acall(attempts), timeout=5)
+    elapsed = time.perf_counter() - start
+    assert (result, name) == ("ok 0.05", "rapido")
+    assert [record["status"] for record in records] == ["cancelled", "won"]
+    assert elapsed < 0.5
+    time.sleep(0.05)
+    assert client.stats()["cancelled"] == 1 and client.in_flight == 0
+    # Cancelamento não conta como falha no circuit breaker
+    assert breakers["lento"].report()["calls"] == 0 and breakers["rapido"].report()["calls"] == 1
+    print(f"✅ Hedging assíncrono OK ({elapsed:.2f}s, perdedora cancelada)")
+    client.close()
+
+def test_retry_after():
+    """429 é repetido após o Retry-After pedido; acima do teto, volta ao chamador com o cabeçalho"""
+    url = start_server(RateLimitedStandIn)
+    client = AsyncHttpClient(max_retries=2, backoff_max=2)
+
+    RateLimitedStandIn.calls = 0
+    start = time.perf_counter()
+    response = client.run(client.post(f"{url}?fail=1&retry_after=1", 5, json={}), timeout=10)
+    elapsed = time.perf_counter() - start
+    assert response.status == 200 and response.data["choices"][0]["message"]["content"] == "ok"
+    assert 1.0 <= elapsed < 2.0
+    assert client.stats()["retries"] == 1 and client.stats()["retry_after_waits"] == 1
+
+    RateLimitedStandIn.calls = 0
+    response = client.run(client.post(f"{url}?fail=5&retry_after=30", 5, json={}), timeout=10)
+    assert response.status == 429 and retry_after_seconds(response) == 30
+    assert client.stats()["retry_after_exceeded"] == 1
+    print(f"✅ Retry-After respeitado ({elapsed:.2f}s) e devolvido quando passa do teto")
+    client.close()
+
+def test_wrap_from_other_loop():
+    """Uma view async (outro event loop) aguarda a chamada no loop do cliente"""
+    url = start_server()
+    client = AsyncHttpClient()
+    assert asyncio.run(client.wrap(chat(client, url, 0))) == "ok 0.0"
+    print("✅ Uso a partir de outro event loop OK")
+    client.close()
+
+if __name__ == "__main__":
+    print("🧪 Testes do cliente HTTP assíncrono")
+    print("=" * 50)
+    test_hundreds_in_flight()
+    test_concurrency_limit()
+    test_deadline()
+    test_hedged_losers_cancelled()
+    test_retry_after()
+    test_wrap_from_other_loop()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,66 @@
+"""
+Testes do retriever BM25 (índice invertido) usado pelos apps baseados em Markdown
+"""
+
+import os
+
+from utils.bm25 import BM25Retriever, get_chunk_retriever, split_chunks, tokenize
+
+MD_PATH = 'PDFs/Roteiro de Dsispensação - Hanseníase.md'
+
+def test_tokenize():
+    """Tokenização igual ao re.findall(r'\\w+') em minúsculas"""
+    assert tokenize("Qual a DOSE de Rifampicina?") == ["qual", "a", "dose", "de", "rifampicina"]
+    print("✅ Tokenização OK")
+
+def test_postings_and_ranking():
+    """Documentos com mais ocorrências relevantes ficam no topo"""
+    docs = [
+        "A dapsona é usada no tratamento.",
+        "A rifampicina é dada em dose mensal supervisionada. Rifampicina 300 mg.",
+        "Armazenamento e descarte dos medicamentos.",
+    ]
+    retriever = BM25Retriever(docs)
+    assert retriever.postings["rifampicina"] == [(1, 2)]
+    assert retriever.doc_lengths[2] == len(tokenize(docs[2]))
+    
+    results = retriever.search("dose de rifampicina")
+    assert results[0][0] == 1
+    assert all(score > 0 for _, score in results)
+    assert retriever.search("palavrainexistente") == []
+    assert len(retriever.search("a", top_k=1)) == 1
+    print("✅ Postings e ranking OK")
+
+def test_weighted_query():
+    """Pesos por termo (expansão de sinônimos) alteram o ranking"""
+    retriever = BM25Retriever(["lepra antiga", "hanseníase tratamento"])
+    base = retriever.search({"lepra": 1.0, "hanseníase": 0.1})
+    assert base[0][0] == 0
+    boosted = retriever.search({"lepra": 0.1, "hanseníase": 1.0})
+    assert boosted[0][0] == 1
+    print("✅ Consulta ponderada OK")
+
+def test_shared_retriever_for_corpus():
+    """O índice é construído uma vez e compartilhado entre chamadas"""
+    if not os.path.exists(MD_PATH):
+        print("⚠️ Markdown da tese não encontrado, pulando")
+        return
+    with open(MD_PATH, 'r', encoding='utf-8') as file:
+        text = file.read()
+    first = get_chunk_retriever(text, 2000, 200)
+    second = get_chunk_retriever(text, 2000, 200)
+    assert first is second
+    assert first.documents == split_chunks(text, 2000, 200)
+    
+    results = first.search("clofazimina modo de uso")
+    assert results and "clofazimina" in first.documents[results[0][0]].lower()
+    print(f"✅ Retriever compartilhado OK ({len(first)} chunks, {len(first.postings)} termos)")
+
+if __name__ == "__main__":
+    print("🧪 Testes do retriever BM25")
+    print("=" * 50)
+    test_tokenize()
+    test_postings_and_ranking()
+    test_weighted_query()
+    test_shared_retriever_for_corpus()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,80 @@
+"""
+Testes do circuit breaker por modelo (closed -> open -> half-open -> closed)
+"""
+
+import time
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.hedged_calls import HedgedCaller
+
+def failing():
+    raise RuntimeError("HTTP 429")
+
+def test_opens_on_error_rate():
+    """Taxa de erro acima do limite abre o circuito; chamadas seguintes são recusadas na hora"""
+    breaker = CircuitBreaker("llama", window=10, min_calls=4, failure_rate=0.5, open_seconds=60)
+    assert breaker.call(lambda: "ok") == "ok"
+    for _ in range(3):
+        try:
+            breaker.call(failing)
+        except RuntimeError:
+            pass
+    assert breaker.state == "open" and not breaker.available()
+
+    start = time.perf_counter()
+    try:
+        breaker.call(lambda: "não deveria rodar")
+        raise AssertionError("chamada não recusada")
+    except CircuitOpenError:
+        pass
+    assert time.perf_counter() - start < 0.01
+    report = breaker.report()
+    assert report["rejected"] == 1 and report["times_opened"] == 1 and report["retry_in_s"] > 0
+    print("✅ Abertura por taxa de erro OK")
+
+def test_slow_calls_count_as_bad():
+    """Respostas acima do limite de latência também abrem o circuito"""
+    breaker = CircuitBreaker("qwen", min_calls=2, failure_rate=1.0, slow_call_ms=10)
+    breaker.record(True, 50)
+    breaker.record(True, 80)
+    assert breaker.state == "open"
+    print("✅ Chamadas lentas OK")
+
+def test_half_open_probe():
+    """Após o intervalo, uma única chamada de teste decide: falha reabre, sucesso fecha"""
+    breaker = CircuitBreaker("gemini", min_calls=1, failure_rate=1.0, open_seconds=0.05)
+    breaker.record(False, 5)
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.available() and breaker.report()["state"] == "half_open"
+    assert breaker.allow() and not breaker.allow()
+    breaker.record(False, 5)
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed" and breaker.report()["recent_calls"] == 0
+    print("✅ Chamada de teste no half-open OK")
+
+def test_open_model_is_skipped_in_chain():
+    """Com o primário aberto, a cadeia vai direto para o modelo saudável"""
+    breakers = {"llama": CircuitBreaker("llama", min_calls=1, failure_rate=1.0, open_seconds=60),
+                "qwen": CircuitBreaker("qwen")}
+    breakers["llama"].record(False, 60000)
+    chain = {"llama": lambda: time.sleep(1) or "lento", "qwen": lambda: "rápido"}
+    attempts = [(name, lambda name=name: breakers[name].call(chain[name]))
+                for name in chain if breakers[name].available()]
+    start = time.perf_counter()
+    result, name, _ = HedgedCaller(hedge_delay=5, deadline=5).call(attempts)
+    assert (result, name) == ("rápido", "qwen")
+    assert time.perf_counter() - start < 0.1
+    print("✅ Modelo com circuito aberto pulado OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do circuit breaker")
+    print("=" * 50)
+    test_opens_on_error_rate()
+    test_slow_calls_count_as_bad()
+    test_half_open_probe()
+    test_open_model_is_skipped_in_chain()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,91 @@
+"""
+Testes do armazenamento de corpora em memória (reconstrução por mtime/tamanho + hash)
+"""
+
+import os
+import time
+import tempfile
+
+from utils.corpus_store import CorpusStore
+
+def write(path, text, mtime=None):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+def make_store():
+    builds = []
+
+    def build_fn(path, previous):
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+        builds.append((text, previous.text if previous is not None else None))
+        return text, text.split(), None
+
+    return CorpusStore(build_fn), builds
+
+def test_rebuild_on_change():
+    """Conteúdo novo reconstrói e notifica; a versão anterior vai para o build incremental"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "hanseniase.md")
+        write(path, "dose mensal", mtime=time.time() - 100)
+        store, builds = make_store()
+        swaps = []
+        store.listeners.append(lambda key, previous, current: swaps.append((previous.text, current.text)))
+
+        first = store.get("hanseniase", path)
+        assert first.chunks == ["dose", "mensal"] and len(builds) == 1
+        assert store.get("hanseniase", path) is first and len(builds) == 1
+        assert store.version("hanseniase", path) == first.content_hash
+
+        write(path, "dose diária nova")
+        assert store.version("hanseniase", path) is None
+        second = store.get("hanseniase", path)
+        assert second.text == "dose diária nova" and second.content_hash != first.content_hash
+        assert builds[-1] == ("dose diária nova", "dose mensal")
+        assert swaps == [("dose mensal", "dose diária nova")]
+        assert store.version("hanseniase", path) == second.content_hash
+    print("✅ Reconstrução quando o arquivo muda OK")
+
+def test_touch_without_change():
+    """mtime novo com o mesmo conteúdo (mesmo hash) não reconstrói"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "hanseniase.md")
+        write(path, "dose mensal", mtime=time.time() - 100)
+        store, builds = make_store()
+        first = store.get("hanseniase", path)
+
+        os.utime(path, None)
+        assert store.get("hanseniase", path) is first and len(builds) == 1
+        assert store.status("hanseniase", path)["state"] == "loaded"
+    print("✅ Arquivo tocado sem mudança OK")
+
+def test_missing_and_failed_build():
+    """Arquivo removido some do store; falha na construção mantém a versão anterior"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "hanseniase.md")
+        assert CorpusStore(lambda path, previous: None).get("x", path) is None
+
+        write(path, "dose mensal", mtime=time.time() - 100)
+        store, _ = make_store()
+        first = store.get("hanseniase", path)
+
+        def broken(path, previous):
+            raise ValueError("PDF corrompido")
+        store.build_fn = broken
+        write(path, "outro texto")
+        assert store.get("hanseniase", path) is first
+        assert store.status("hanseniase", path) == {"state": "error", "error": "PDF corrompido"}
+
+        os.remove(path)
+        assert store.get("hanseniase", path) is None and store.peek("hanseniase") is None
+    print("✅ Arquivo ausente e falha na construção OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do armazenamento de corpora")
+    print("=" * 50)
+    test_rebuild_on_change()
+    test_touch_without_change()
+    test_missing_and_failed_build()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,95 @@
+"""
+Testes da reindexação incremental do corpus (store + watcher)
+"""
+
+import os
+import time
+import tempfile
+import threading
+
+from utils.corpus_store import CorpusStore
+from utils import corpus_watcher
+from utils.corpus_watcher import CorpusWatcher
+from utils.markdown_chunker import chunk_markdown
+
+SAMPLE_MD = """# ROTEIRO
+
+Introdução do roteiro.
+
+## ETAPA 01
+
+Avaliação inicial do paciente.
+
+## ETAPA 02
+
+Orientações e plano de cuidado.
+"""
+
+def write_file(path, text, mtime):
+    """Escreve o arquivo com mtime explícito (independe da resolução do sistema de arquivos)"""
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.utime(path, (mtime, mtime))
+
+def test_watcher_swaps_corpus():
+    """Watcher detecta a mudança, reconstrói com a versão anterior e notifica a troca"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tese.md")
+        write_file(path, SAMPLE_MD, 1000)
+        
+        builds = []
+        def build_fn(source, previous):
+            builds.append(previous)
+            with open(source, 'r', encoding='utf-8') as file:
+                text = file.read()
+            return text, chunk_markdown(text), None
+        
+        swaps = []
+        store = CorpusStore(build_fn)
+        store.listeners.append(lambda key, old, new: swaps.append((old.content_hash, new.content_hash)))
+        first = store.get("tese", path)
+        assert first is not None and builds == [None]
+        
+        watcher = CorpusWatcher({"tese": path}, lambda key, source: store.get(key, source), interval=0)
+        assert watcher.check_now() == []
+        
+        # mtime muda mas o conteúdo não: nada é reconstruído
+        write_file(path, SAMPLE_MD, 2000)
+        assert watcher.check_now() == []
+        assert store.get("tese", path) is first
+        
+        write_file(path, SAMPLE_MD + "\n## ETAPA 03\n\nPós-dispensação.\n", 3000)
+        assert watcher.check_now() == ["tese"]
+        current = store.peek("tese")
+        assert current is not first and builds[-1] is first
+        assert len(current.chunks) == 4
+        assert swaps == [(first.content_hash, current.content_hash)]
+    print("✅ Watcher e troca atômica do corpus OK")
+
+def test_watcher_restarts_after_fork():
+    """Observador iniciado no master (preload_app): start_all recria a thread no worker"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tese.md")
+        write_file(path, SAMPLE_MD, 1000)
+        changed = threading.Event()
+        watcher = CorpusWatcher({"tese": path}, lambda key, source: changed.set(), interval=0.05).start()
+
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            corpus_watcher.start_all()
+            write_file(path, SAMPLE_MD + "\nNovo parágrafo.\n", 2000)
+            os.write(write_end, b"1" if changed.wait(2) else b"0")
+            os._exit(0)
+        os.waitpid(pid, 0)
+        assert os.read(read_end, 1) == b"1"
+        watcher.stop()
+        time.sleep(0.1)
+    print("✅ Observador recriado no processo filho OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes de reindexação incremental")
+    print("=" * 50)
+    test_watcher_swaps_corpus()
+    test_watcher_restarts_after_fork()
+    print("\n✅ Todos os testes passaram!")
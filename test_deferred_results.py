@@ -0,0 +1,98 @@
+"""
+Testes da execução com orçamento de latência (resultado na hora, adiado ou em cache)
+"""
+
+import time
+import threading
+
+from utils.deferred_results import DeferredResults
+
+def test_within_budget():
+    """Execução rápida devolve o resultado na hora e o guarda para a mesma chave"""
+    deferred = DeferredResults()
+    calls = []
+    status, result, ticket = deferred.run("a", lambda: calls.append(1) or "enriquecida", budget_ms=500)
+    assert (status, result, ticket) == ("completed", "enriquecida", None)
+    time.sleep(0.01)
+    assert deferred.run("a", lambda: calls.append(1) or "outra", budget_ms=500) == ("cached", "enriquecida", None)
+    assert len(calls) == 1
+    print("✅ Resultado dentro do orçamento OK")
+
+def test_over_budget_is_deferred():
+    """Execução lenta: o chamador segue sem esperar e busca o resultado pelo ticket"""
+    deferred = DeferredResults()
+    release = threading.Event()
+
+    def slow():
+        release.wait(2)
+        return "enriquecida"
+
+    start = time.perf_counter()
+    status, result, ticket = deferred.run("b", slow, budget_ms=20)
+    elapsed = time.perf_counter() - start
+    assert status == "deferred" and result is None and ticket
+    assert elapsed < 0.5
+    assert deferred.poll(ticket) == ("pending", None)
+
+    # Mesma pergunta durante a geração não dispara outra execução
+    assert deferred.run("b", lambda: "duplicada", budget_ms=10)[0] == "deferred"
+
+    release.set()
+    for _ in range(100):
+        if deferred.poll(ticket)[0] == "ready":
+            break
+        time.sleep(0.01)
+    assert deferred.poll(ticket) == ("ready", "enriquecida")
+    assert deferred.run("b", slow, budget_ms=20) == ("cached", "enriquecida", None)
+    print(f"✅ Resultado adiado OK (chamador liberado em {elapsed * 1000:.0f} ms)")
+
+def test_bounded_queue():
+    """Com o executor ocupado e a fila cheia, chaves novas são dispensadas na hora"""
+    deferred = DeferredResults(max_workers=1, max_pending=2)
+    release = threading.Event()
+    calls = []
+
+    def slow(name):
+        calls.append(name)
+        release.wait(2)
+        return name
+
+    assert deferred.run("a", lambda: slow("a"), budget_ms=10)[0] == "deferred"
+    assert deferred.run("b", lambda: slow("b"), budget_ms=10)[0] == "deferred"
+    start = time.perf_counter()
+    assert deferred.run("c", lambda: slow("c"), budget_ms=500) == ("skipped", None, None)
+    assert time.perf_counter() - start < 0.1
+    # Chave já em andamento continua compartilhando a execução
+    assert deferred.run("a", lambda: slow("a"), budget_ms=10)[0] == "deferred"
+
+    release.set()
+    for _ in range(100):
+        if deferred.stats()["pending"] == 0:
+            break
+        time.sleep(0.01)
+    assert calls == ["a", "b"]
+    assert deferred.stats()["skipped"] == 1
+    # Com a fila livre, a chave dispensada volta a ser executada
+    assert deferred.run("c", lambda: slow("c"), budget_ms=500) == ("completed", "c", None)
+    print("✅ Fila limitada OK")
+
+def test_failures():
+    """Falhas não vão para o cache; tickets desconhecidos são informados"""
+    deferred = DeferredResults()
+
+    def broken():
+        raise RuntimeError("falha na geração")
+
+    assert deferred.run("c", broken, budget_ms=500) == ("failed", None, None)
+    assert deferred.poll("inexistente") == ("unknown", None)
+    assert deferred.stats()["stored_results"] == 0
+    print("✅ Falhas OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes da execução com orçamento de latência")
+    print("=" * 50)
+    test_within_budget()
+    test_over_budget_is_deferred()
+    test_bounded_queue()
+    test_failures()
+    print("\n✅ Todos os testes passaram!")
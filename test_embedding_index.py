@@ -0,0 +1,102 @@
+"""
+Testes do índice de embeddings dos chunks (chave do cache, persistência em disco e top-k)
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from utils.embedding_index import EmbeddingIndex, cache_prefix, corpus_hash, top_k_indices
+
+class CountingModel:
+    """Modelo de embedding determinístico que conta os textos codificados"""
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(text), text.count("a") + 1, 1.0] for text in texts], dtype=np.float32)
+
+CHUNKS = ["dose supervisionada mensal", "rifampicina 600 mg", "clofazimina diária"]
+
+def test_cache_key():
+    """A chave muda com o texto, com as fronteiras dos chunks e com o modelo"""
+    key = corpus_hash(CHUNKS, "mini")
+    assert corpus_hash(list(CHUNKS), "mini") == key
+    assert corpus_hash(CHUNKS, "outro") != key
+    assert corpus_hash(CHUNKS[:2] + ["clofazimina diária."], "mini") != key
+    # Mesmo texto concatenado, fronteiras diferentes
+    assert corpus_hash(["ab", "c"], "mini") != corpus_hash(["a", "bc"], "mini")
+    print("✅ Chave do cache OK")
+
+def test_disk_round_trip():
+    """Segunda construção do mesmo corpus carrega do disco sem codificar nada"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        model = CountingModel()
+        first = EmbeddingIndex.build(CHUNKS, model, "mini", cache_dir=cache_dir)
+        assert len(model.encoded) == 3
+        assert np.allclose(np.linalg.norm(first.embeddings, axis=1), 1.0)
+
+        second = EmbeddingIndex.build(CHUNKS, model, "mini", cache_dir=cache_dir)
+        assert len(model.encoded) == 3
+        assert second.corpus_hash == first.corpus_hash
+        assert np.array_equal(second.embeddings, first.embeddings)
+
+        # Corpus alterado: chave nova, recalcula
+        EmbeddingIndex.build(CHUNKS + ["novo chunk"], model, "mini", cache_dir=cache_dir)
+        assert len(model.encoded) == 7
+    print("✅ Persistência em disco OK")
+
+def test_old_versions_pruned():
+    """Ao salvar uma versão nova, as antigas do mesmo corpus e modelo saem do disco; as demais ficam"""
+    def cached(model_name, source, chunks):
+        return f"{cache_prefix(model_name, source)}{corpus_hash(chunks, model_name)}.npy"
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        model = CountingModel()
+        for model_name, source in (("mini", "hanseniase.md"), ("outro", "hanseniase.md"), ("mini", "tuberculose.md")):
+            EmbeddingIndex.build(CHUNKS, model, model_name, cache_dir=cache_dir, source=source)
+        changed = CHUNKS + ["novo chunk"]
+        EmbeddingIndex.build(changed, model, "mini", cache_dir=cache_dir, source="hanseniase.md")
+        assert sorted(os.listdir(cache_dir)) == sorted([
+            cached("mini", "hanseniase.md", changed),
+            cached("outro", "hanseniase.md", CHUNKS),
+            cached("mini", "tuberculose.md", CHUNKS),
+        ])
+    print("✅ Versões antigas removidas do cache OK")
+
+def test_incremental_reuse():
+    """Com a versão anterior, só os chunks novos são codificados"""
+    model = CountingModel()
+    previous = EmbeddingIndex.build(CHUNKS, model, "mini", cache_dir=None)
+    changed = [CHUNKS[0], "texto novo da seção", CHUNKS[2]]
+    index = EmbeddingIndex.build(changed, model, "mini", cache_dir=None, previous=(CHUNKS, previous))
+    assert model.encoded[3:] == ["texto novo da seção"]
+    assert np.array_equal(index.embeddings[0], previous.embeddings[0])
+    assert np.array_equal(index.embeddings[2], previous.embeddings[2])
+    print("✅ Reaproveitamento incremental OK")
+
+def test_top_k_order():
+    """top_k em ordem decrescente de score, igual a uma ordenação completa"""
+    scores = np.random.default_rng(0).random(1000).astype(np.float32)
+    for k in (1, 3, 10, 1000, 2000):
+        expected = np.argsort(scores)[::-1][:k]
+        assert np.array_equal(top_k_indices(scores, k), expected)
+    assert len(top_k_indices(scores, 0)) == 0
+
+    index = EmbeddingIndex.build(CHUNKS, CountingModel(), "mini", cache_dir=None)
+    indices, similarities = index.search(index.embeddings[1], top_k=3)
+    assert indices[0] == 1 and abs(similarities[0] - 1.0) < 1e-5
+    assert all(similarities[i] >= similarities[i + 1] for i in range(len(similarities) - 1))
+    print("✅ Ordem do top-k OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do índice de embeddings")
+    print("=" * 50)
+    test_cache_key()
+    test_disk_round_trip()
+    test_old_versions_pruned()
+    test_incremental_reuse()
+    test_top_k_order()
+    print("\n✅ Todos os testes passaram!")
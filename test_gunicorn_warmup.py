@@ -0,0 +1,80 @@
+"""
+Verificação da inicialização sob gunicorn com a configuração do repositório (preload_app)
+Sobe um app WSGI mínimo com um Warmup e confere que cada worker carrega no próprio processo
+(o hook post_worker_init do gunicorn.conf.py), sem depender de requisição para disparar a carga
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CHECK_APP = '''
+import os
+import json
+import time
+
+from utils.warmup import Warmup
+
+loaded = {}
+
+def load_models():
+    time.sleep(0.2)
+    loaded["pid"] = os.getpid()
+
+warmup = Warmup("gunicorn-check").add("models", load_models)
+
+def app(environ, start_response):
+    # ready() não dispara a carga: quem carrega é o hook do gunicorn
+    body = json.dumps({"pid": os.getpid(), "ready": warmup.ready(), "loaded_in": loaded.get("pid")}).encode()
+    start_response("200 OK", [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+    return [body]
+'''
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_workers_warm_up_after_fork():
+    """Com preload_app, cada worker fica pronto sozinho e a carga roda no pid do worker"""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "check_app.py"), "w", encoding="utf-8") as file:
+            file.write(CHECK_APP)
+        env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY="2")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+             "--pythonpath", f"{tmp},{ROOT}", "--bind", f"127.0.0.1:{port}", "check_app:app"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            status = None
+            deadline = time.time() + 15
+            while time.time() < deadline:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2) as response:
+                        status = json.loads(response.read())
+                    if status["ready"]:
+                        break
+                except OSError:
+                    pass
+                time.sleep(0.1)
+            assert status and status["ready"], f"worker não ficou pronto: {status}"
+            assert status["loaded_in"] == status["pid"] != server.pid
+        finally:
+            server.terminate()
+            server.wait(10)
+    print(f"✅ Worker {status['pid']} carregou no próprio processo (master {server.pid})")
+
+if __name__ == "__main__":
+    print("🧪 Verificação da inicialização sob gunicorn")
+    print("=" * 50)
+    test_workers_warm_up_after_fork()
+    print("\n✅ Todos os testes passaram!")
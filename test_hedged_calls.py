@@ -0,0 +1,115 @@
+"""
+Testes das chamadas com hedging (primário imediato, secundários após atraso ou falha)
+"""
+
+import time
+
+from utils.hedged_calls import HedgedCaller
+
+def sleeper(seconds, value):
+    def attempt():
+        time.sleep(seconds)
+        return value
+    return attempt
+
+def test_fast_primary_wins_alone():
+    """Primário rápido: nenhum secundário é disparado"""
+    caller = HedgedCaller(hedge_delay=0.5, deadline=5)
+    result, name, records = caller.call([("llama", sleeper(0.01, "ok")), ("qwen", sleeper(0, "qwen"))])
+    assert (result, name) == ("ok", "llama")
+    assert records[1]["status"] == "not_started"
+    assert caller.stats()["hedged_calls"] == 0
+    print("✅ Primário rápido OK")
+
+def test_slow_primary_is_hedged():
+    """Primário lento: o secundário entra após o atraso e vence; o primário é abandonado"""
+    caller = HedgedCaller(hedge_delay=0.05, deadline=5)
+    start = time.perf_counter()
+    result, name, records = caller.call([("llama", sleeper(1.0, "lento")), ("qwen", sleeper(0.01, "rápido"))])
+    elapsed = time.perf_counter() - start
+    assert (result, name) == ("rápido", "qwen")
+    assert elapsed < 0.5
+    assert records[0]["status"] == "cancelled" and records[1]["status"] == "won"
+    assert records[1]["started_ms"] >= 50
+    print(f"✅ Hedging do primário lento OK ({elapsed * 1000:.0f} ms)")
+
+def test_failure_launches_next_immediately():
+    """Falha do primário dispara o próximo sem esperar o atraso"""
+    def broken():
+        raise RuntimeError("HTTP 503")
+
+    caller = HedgedCaller(hedge_delay=10, deadline=5)
+    start = time.perf_counter()
+    result, name, records = caller.call([("llama", broken), ("qwen", lambda: None), ("gemini", sleeper(0, "gemini"))])
+    assert (result, name) == ("gemini", "gemini")
+    assert time.perf_counter() - start < 1
+    assert records[0]["error"] == "HTTP 503" and records[1]["status"] == "failed"
+    stats = caller.stats()["models"]
+    assert stats["gemini"]["wins"] == 1 and stats["llama"]["failures"] == 1
+    print("✅ Falha dispara o próximo OK")
+
+def test_deadline():
+    """Prazo total limita a chamada mesmo com todos os modelos lentos"""
+    caller = HedgedCaller(hedge_delay=0.01, deadline=0.1)
+    start = time.perf_counter()
+    result, name, records = caller.call([("llama", sleeper(1, "a")), ("qwen", sleeper(1, "b"))])
+    assert result is None and name is None
+    assert time.perf_counter() - start < 0.5
+    assert [record["status"] for record in records] == ["cancelled", "cancelled"]
+    assert caller.stats()["unanswered"] == 1
+    print("✅ Prazo total OK")
+
+def test_losers_are_discarded():
+    """Resultado de perdedora (ex.: stream aberto) vai para o descarte, mesmo chegando depois"""
+    discarded = []
+    caller = HedgedCaller(hedge_delay=0.02, deadline=5)
+    result, name, _ = caller.call([("llama", sleeper(0.2, "lento")), ("qwen", sleeper(0.01, "rápido"))],
+                                  discard=discarded.append)
+    assert (result, name) == ("rápido", "qwen")
+    assert discarded == []
+    time.sleep(0.3)
+    assert discarded == ["lento"]
+    print("✅ Descarte das perdedoras OK")
+
+def test_parallel_cap():
+    """No máximo max_parallel tentativas por chamada; a terceira só entra quando uma falha"""
+    def slow_failure():
+        time.sleep(0.3)
+        return None
+
+    caller = HedgedCaller(hedge_delay=0.02, deadline=5, max_parallel=2)
+    result, name, records = caller.call([
+        ("llama", slow_failure), ("qwen", sleeper(1, "lento")), ("gemini", sleeper(0, "gemini"))
+    ])
+    assert (result, name) == ("gemini", "gemini")
+    assert records[2]["started_ms"] >= 300
+    print(f"✅ Limite de tentativas por chamada OK (terceira entrou em {records[2]['started_ms']:.0f} ms)")
+
+def test_full_pool_skips_hedges():
+    """Com o pool ocupado por tentativas abandonadas, não há secundário por atraso"""
+    caller = HedgedCaller(hedge_delay=0.01, deadline=0.1, max_workers=2)
+    caller.call([("llama", sleeper(0.5, "a")), ("qwen", sleeper(0.5, "b"))])
+    assert caller.stats()["active_attempts"] == 2
+
+    start = time.perf_counter()
+    result, name, records = caller.call([("llama", sleeper(0.01, "ok")), ("qwen", sleeper(0, "qwen"))])
+    elapsed = time.perf_counter() - start
+    # O primário ficou na fila do executor até o prazo; o secundário não foi disparado
+    assert result is None and elapsed < 0.3
+    assert records[0]["status"] == "cancelled" and records[1]["status"] == "not_started"
+    assert caller.stats()["hedges_skipped"] >= 1
+    time.sleep(0.6)
+    assert caller.stats()["active_attempts"] == 0
+    print(f"✅ Pool cheio não dispara secundários OK ({elapsed * 1000:.0f} ms)")
+
+if __name__ == "__main__":
+    print("🧪 Testes das chamadas com hedging")
+    print("=" * 50)
+    test_fast_primary_wins_alone()
+    test_slow_primary_is_hedged()
+    test_failure_launches_next_immediately()
+    test_deadline()
+    test_losers_are_discarded()
+    test_parallel_cap()
+    test_full_pool_skips_hedges()
+    print("\n✅ Todos os testes passaram!")
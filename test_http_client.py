@@ -0,0 +1,112 @@
+"""
+Testes do cliente HTTP compartilhado contra um servidor local (sem rede externa)
+Mede conexões abertas com e sem pool e o comportamento das novas tentativas
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from utils.http_client import HttpClient
+
+class StandIn(BaseHTTPRequestHandler):
+    """Imita o endpoint de chat: responde conforme o roteiro do servidor (status, Retry-After)"""
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1  # cabeçalhos e corpo no mesmo envio (evita o atraso do ACK com keep-alive)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.clients.add(self.client_address)
+            status, retry_after = server.script.pop(0) if server.script else (200, None)
+        body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", retry_after)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_server(script=()):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.clients = set()
+    server.script = list(script)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+
+def test_keep_alive_reuses_connection():
+    """Chamadas sequenciais reaproveitam uma única conexão (um handshake só)"""
+    server, url = start_server()
+    calls = 30
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        requests.post(url, json={"q": "x"}, timeout=5)
+    bare = time.perf_counter() - start
+    bare_connections = len(server.clients)
+
+    server.clients.clear()
+    client = HttpClient()
+    start = time.perf_counter()
+    for _ in range(calls):
+        assert client.post(url, json={"q": "x"}).status_code == 200
+    pooled = time.perf_counter() - start
+
+    assert bare_connections == calls
+    assert len(server.clients) == 1 and client.connections_opened() == 1
+    server.shutdown()
+    print(f"✅ Keep-alive OK: {calls} chamadas, {bare_connections} conexões sem pool ({bare * 1000:.0f} ms) "
+          f"x 1 com pool ({pooled * 1000:.0f} ms)")
+
+def test_retries_on_5xx():
+    """503 e 502 são repetidos com backoff até a resposta válida"""
+    server, url = start_server([(503, None), (502, None)])
+    client = HttpClient(max_retries=2, backoff_base=0.01)
+    response = client.post(url, json={})
+    assert response.status_code == 200
+    assert server.requests == 3 and client.stats()["retries"] == 2
+    server.shutdown()
+    print("✅ Novas tentativas em 5xx OK")
+
+def test_retry_after_is_honoured():
+    """429 com Retry-After: a nova tentativa espera o tempo pedido"""
+    server, url = start_server([(429, "1")])
+    client = HttpClient(max_retries=1, backoff_base=0.01)
+    start = time.perf_counter()
+    assert client.post(url, json={}).status_code == 200
+    assert time.perf_counter() - start >= 1.0
+    assert client.stats()["retry_after_waits"] == 1
+    server.shutdown()
+    print("✅ Retry-After respeitado OK")
+
+def test_long_retry_after_and_exhausted_retries():
+    """Retry-After acima do teto devolve o 429 na hora; tentativas esgotadas devolvem o último erro"""
+    server, url = start_server([(429, "120"), (500, None), (500, None)])
+    client = HttpClient(max_retries=1, backoff_base=0.01, backoff_max=5)
+    start = time.perf_counter()
+    assert client.post(url, json={}).status_code == 429
+    assert time.perf_counter() - start < 1
+    assert client.post(url, json={}).status_code == 500
+    assert server.requests == 3
+    server.shutdown()
+    print("✅ Limites das novas tentativas OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do cliente HTTP")
+    print("=" * 50)
+    test_keep_alive_reuses_connection()
+    test_retries_on_5xx()
+    test_retry_after_is_honoured()
+    test_long_retry_after_and_exhausted_retries()
+    print("\n✅ Todos os testes passaram!")
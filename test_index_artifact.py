@@ -0,0 +1,97 @@
+"""
+Testes do índice em disco gerado por build_index.py (versão do formato, memmap e parâmetros)
+"""
+
+import os
+import json
+import tempfile
+
+import numpy as np
+
+from build_index import build_index
+from utils.index_artifact import CHUNK_SIZE, FORMAT_VERSION, IndexArtifact
+
+SOURCE_MD = """# ROTEIRO
+
+Introdução do roteiro de dispensação.
+
+## Rifampicina
+
+Dose supervisionada mensal de 600 mg.
+"""
+
+def build(folder):
+    source_dir = os.path.join(folder, "PDFs")
+    os.makedirs(source_dir)
+    with open(os.path.join(source_dir, "roteiro.md"), "w", encoding="utf-8") as file:
+        file.write(SOURCE_MD)
+    output = os.path.join(folder, "index")
+    version_path = build_index(source_dir, output, with_embeddings=False)
+    return os.path.join(source_dir, "roteiro.md"), output, version_path
+
+def edit_manifest(version_path, **changes):
+    path = os.path.join(version_path, "manifest.json")
+    with open(path, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    manifest.update(changes)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+
+def test_memmap_load():
+    """Arrays abertos com memmap; chunks e postings iguais aos do texto original"""
+    with tempfile.TemporaryDirectory() as folder:
+        source, output, version_path = build(folder)
+        assert os.path.basename(version_path).startswith(f"v{FORMAT_VERSION}-")
+
+        artifact = IndexArtifact.open(output)
+        assert artifact.manifest["format_version"] == FORMAT_VERSION
+        assert artifact.manifest["chunk_size"] == CHUNK_SIZE
+        assert isinstance(artifact.spans, np.memmap)
+        assert isinstance(artifact.postings.doc_ids, np.memmap)
+
+        chunks = artifact.chunks()
+        assert len(chunks) == 2 and chunks[1].startswith("## Rifampicina")
+        assert chunks.section_path(1) == ("ROTEIRO", "Rifampicina")
+        postings = artifact.postings.get("rifampicina")
+        assert postings is not None and [doc for doc, _ in postings] == [1]
+        assert artifact.find_source(source)["chunks"] == [0, 2]
+    print("✅ Carga com memmap OK")
+
+def test_embeddings_slice_without_copy():
+    """Embeddings da fonte são uma fatia do memmap em float16, sem cópia por worker"""
+    with tempfile.TemporaryDirectory() as folder:
+        source, output, version_path = build(folder)
+        embeddings = np.eye(2, 4, dtype=np.float16)
+        np.save(os.path.join(version_path, "embeddings.f16.npy"), embeddings)
+        edit_manifest(version_path, embedding_model="mini", embedding_dim=4)
+
+        text, chunks, index = IndexArtifact.open(output).source_corpus(source, "mini")
+        assert text == SOURCE_MD and len(chunks) == 2
+        assert isinstance(index.embeddings, np.memmap) and index.embeddings.dtype == np.float16
+        assert list(index.search(np.array([0, 1, 0, 0], dtype=np.float32), top_k=1)[0]) == [1]
+        assert IndexArtifact.open(output).source_corpus(source, "outro-modelo") is None
+    print("✅ Fatia dos embeddings OK")
+
+def test_format_and_parameters_checked():
+    """Outro formato não abre; outro tamanho de chunk ou extração não é usado"""
+    with tempfile.TemporaryDirectory() as folder:
+        source, output, version_path = build(folder)
+        np.save(os.path.join(version_path, "embeddings.f16.npy"), np.eye(2, 4, dtype=np.float16))
+        edit_manifest(version_path, embedding_model="mini", chunk_size=CHUNK_SIZE + 500)
+        assert IndexArtifact.open(output).source_corpus(source, "mini") is None
+
+        edit_manifest(version_path, chunk_size=CHUNK_SIZE, extractor="outro-extrator")
+        assert IndexArtifact.open(output).source_corpus(source, "mini") is None
+
+        edit_manifest(version_path, format_version=FORMAT_VERSION - 1)
+        assert IndexArtifact.open(output) is None
+        assert IndexArtifact.open(os.path.join(folder, "inexistente")) is None
+    print("✅ Versão do formato e parâmetros conferidos OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do índice em disco")
+    print("=" * 50)
+    test_memmap_load()
+    test_embeddings_slice_without_copy()
+    test_format_and_parameters_checked()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,103 @@
+"""
+Testes do chunker de Markdown orientado a seções
+"""
+
+import os
+
+from utils.markdown_chunker import chunk_markdown
+
+SAMPLE_MD = """# ROTEIRO DE DISPENSAÇÃO
+
+Introdução do roteiro.
+
+## ETAPA 01 – AVALIAÇÃO INICIAL
+
+### Anamnese
+
+Pergunte sobre alergias e uso de outros medicamentos.
+
+### Sinais de alerta
+
+Observe reações adversas.
+
+## ETAPA 02 – ORIENTAÇÕES
+
+Explique a dose supervisionada mensal e a dose autoadministrada diária.
+"""
+
+def test_sections_and_offsets():
+    """Cada chunk é um offset no texto original e carrega o caminho da seção"""
+    chunks = chunk_markdown(SAMPLE_MD)
+    assert len(chunks) == 4
+    for (start, end), chunk in zip(chunks.spans, chunks):
+        assert SAMPLE_MD[start:end] == chunk
+
+    # Títulos sem texto seguem junto com o próximo parágrafo
+    assert chunks[1].startswith("## ETAPA 01") and "### Anamnese" in chunks[1]
+    assert chunks.section_path(1) == ("ROTEIRO DE DISPENSAÇÃO", "ETAPA 01 – AVALIAÇÃO INICIAL", "Anamnese")
+    assert chunks.section_path(3) == ("ROTEIRO DE DISPENSAÇÃO", "ETAPA 02 – ORIENTAÇÕES")
+
+    # Sem sobreposição: os chunks cobrem o texto sem duplicar caracteres
+    assert sum(end - start for start, end in chunks.spans) <= len(SAMPLE_MD)
+    print("✅ Seções e offsets OK")
+
+def test_long_sections_split_on_paragraphs():
+    """Seções grandes são cortadas em parágrafos e nunca atravessam títulos"""
+    paragraphs = "\n\n".join(f"Parágrafo {i} " + "texto " * 40 for i in range(10))
+    text = f"## A\n\n{paragraphs}\n\n## B\n\nFim.\n"
+    chunks = chunk_markdown(text, max_chars=600)
+
+    assert all(len(chunk) <= 600 for chunk in chunks)
+    assert all(path == ("A",) for path in chunks.sections[:-1])
+    assert chunks[-1].startswith("## B") and chunks.section_path(len(chunks) - 1) == ("B",)
+    # A seção inteira pode ser recuperada a partir de qualquer um dos seus chunks
+    assert chunks.section_text(2) == text[:text.index("## B")]
+    print("✅ Corte de seções longas OK")
+
+def test_heading_with_oversized_paragraph():
+    """Título seguido de parágrafo maior que o limite não vira um chunk só com o título"""
+    paragraph = "\n".join(f"Linha {i} sobre a dose supervisionada." for i in range(40))
+    text = f"## ETAPA 02 – ORIENTAÇÕES\n\n{paragraph}\n\nOutro parágrafo.\n"
+    chunks = chunk_markdown(text, max_chars=300)
+
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert all(chunk.strip() != "## ETAPA 02 – ORIENTAÇÕES" for chunk in chunks)
+    assert chunks[0].startswith("## ETAPA 02") and "Linha 0 " in chunks[0]
+    # O parágrafo grande é cortado em fim de frase/linha, sem perder texto
+    assert all(chunk.endswith(("\n", ". ")) for chunk in chunks[:-1])
+    assert "".join(chunks) == text
+    print("✅ Título com parágrafo maior que o limite OK")
+
+def test_plain_text():
+    """Texto sem títulos (ex.: extraído de PDF) é tratado como uma seção sem caminho"""
+    text = ("Frase sobre hanseníase. " * 200).strip()
+    chunks = chunk_markdown(text, max_chars=1500)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 1500 for chunk in chunks)
+    assert all(chunk.endswith(". ") for chunk in chunks[:-1])
+    assert "".join(chunks) == text
+    assert chunks.section_path(0) == ()
+    print("✅ Texto simples OK")
+
+def test_thesis():
+    """Tese real: cada chunk pertence a uma ETAPA/seção do roteiro"""
+    path = "PDFs/Roteiro de Dsispensação - Hanseníase.md"
+    if not os.path.exists(path):
+        print("⚠️ Tese não encontrada, teste ignorado")
+        return
+    with open(path, 'r', encoding='utf-8') as file:
+        text = file.read()
+    chunks = chunk_markdown(text, max_chars=1500)
+    assert len(chunks) > 0
+    assert all(chunks.section_path(i) for i in range(len(chunks)))
+    print(f"✅ Tese dividida em {len(chunks)} chunks por seção")
+
+if __name__ == "__main__":
+    print("🧪 Testes do chunker de Markdown")
+    print("=" * 50)
+    test_sections_and_offsets()
+    test_long_sections_split_on_paragraphs()
+    test_heading_with_oversized_paragraph()
+    test_plain_text()
+    test_thesis()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,84 @@
+"""
+Testes do registro de modelos (carga única por processo, referências e relatório)
+Usa um carregador falso, sem baixar modelos
+"""
+
+import time
+import threading
+
+from utils.model_registry import ModelRegistry
+
+class FakeModel:
+    def __init__(self, name, **options):
+        self.name = name
+        self.options = options
+
+def fake_registry(delay=0.0):
+    """Registro com um carregador lento que conta as cargas"""
+    registry = ModelRegistry()
+    loads = []
+
+    def load(name, **options):
+        time.sleep(delay)
+        loads.append(name)
+        return FakeModel(name, **options)
+
+    registry.loaders["fake"] = load
+    return registry, loads
+
+def test_loaded_once_concurrently():
+    """Vários pontos de entrada pedindo o mesmo modelo ao mesmo tempo recebem a mesma instância"""
+    registry, loads = fake_registry(delay=0.05)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.acquire("fake", "roberta")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == ["roberta"]
+    assert all(model is models[0] for model in models)
+    assert registry.memory_report()["models"][0]["refs"] == 8
+    print("✅ Carga única com acessos concorrentes OK")
+
+def test_options_are_part_of_identity():
+    """Backends diferentes do mesmo modelo são entradas diferentes"""
+    registry, loads = fake_registry()
+    torch_model = registry.acquire("fake", "roberta", backend="torch")
+    quantized = registry.acquire("fake", "roberta", backend="quantized")
+    assert torch_model is not quantized
+    assert registry.acquire("fake", "roberta", backend="torch") is torch_model
+    assert len(loads) == 2
+    print("✅ Opções de carga na identidade do modelo OK")
+
+def test_release_unloads_last_reference():
+    """O modelo sai do registro quando a última referência é devolvida"""
+    registry, loads = fake_registry()
+    registry.acquire("fake", "minilm")
+    registry.acquire("fake", "minilm")
+    registry.release("fake", "minilm")
+    assert registry.memory_report()["models"][0]["refs"] == 1
+    registry.release("fake", "minilm")
+    assert registry.memory_report() == {"models": [], "total_mb": 0}
+    registry.acquire("fake", "minilm")
+    assert loads == ["minilm", "minilm"]
+    print("✅ Contagem de referências OK")
+
+def test_memory_report():
+    """Relatório por modelo; objetos sem pesos torch não têm tamanho"""
+    registry, _ = fake_registry()
+    registry.acquire("fake", "dialogpt", max_length=100)
+    entry = registry.memory_report()["models"][0]
+    assert entry["kind"] == "fake" and entry["name"] == "dialogpt"
+    assert entry["options"] == {"max_length": 100}
+    assert entry["size_mb"] is None and entry["load_seconds"] >= 0
+    print("✅ Relatório de memória OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do registro de modelos")
+    print("=" * 50)
+    test_loaded_once_concurrently()
+    test_options_are_part_of_identity()
+    test_release_unloads_last_reference()
+    test_memory_report()
+    print("\n✅ Todos os testes passaram!")
@@ -48,6 +48,9 @@ def test_diseases_list():
         for disease in result:
             status = "✅" if disease.get('pdf_exists') else "❌"
             print(f"   {status} {disease['name']} ({disease['id']})")
+            corpus = disease.get('corpus', {})
+            if corpus:
+                print(f"      - Corpus: {corpus.get('state')} ({corpus.get('chunks', 0)} chunks)")
         return True
     else:
         print(f"❌ Erro: {result}")
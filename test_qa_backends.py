@@ -0,0 +1,113 @@
+"""
+Testes da seleção do backend de QA (QA_BACKEND) e da volta para torch sem optimum
+Os carregadores do transformers/optimum são substituídos por registradores: não precisa de torch nem optimum
+"""
+
+import os
+import sys
+import types
+import tempfile
+import importlib
+from contextlib import contextmanager
+
+from utils import qa_backends
+
+MODEL_NAME = "deepset/roberta-base-squad2"
+
+class FakeORTModel:
+    """Registra o carregamento do modelo ONNX e grava um model.onnx vazio ao salvar"""
+    loads = []
+
+    @classmethod
+    def from_pretrained(cls, name, export=False):
+        cls.loads.append((name, export))
+        return cls()
+
+    def save_pretrained(self, model_dir):
+        os.makedirs(model_dir, exist_ok=True)
+        open(os.path.join(model_dir, "model.onnx"), "wb").close()
+
+@contextmanager
+def stub_modules(with_optimum):
+    """transformers (e optimum, se pedido) trocados por registradores; sem optimum o import falha"""
+    calls = []
+
+    def pipeline(task, **kwargs):
+        calls.append((task, kwargs))
+        return {"task": task, **kwargs}
+
+    transformers = types.ModuleType("transformers")
+    transformers.pipeline = pipeline
+    transformers.AutoTokenizer = types.SimpleNamespace(from_pretrained=lambda name: f"tokenizer:{name}")
+    onnxruntime = types.ModuleType("optimum.onnxruntime")
+    onnxruntime.ORTModelForQuestionAnswering = FakeORTModel
+    stubs = {
+        "transformers": transformers,
+        "optimum": types.ModuleType("optimum") if with_optimum else None,
+        "optimum.onnxruntime": onnxruntime if with_optimum else None,
+    }
+    saved = {name: sys.modules.get(name, False) for name in stubs}
+    device, cache_dir = qa_backends._device, qa_backends.ONNX_CACHE_DIR
+    with tempfile.TemporaryDirectory() as folder:
+        sys.modules.update(stubs)
+        qa_backends._device = lambda: -1
+        qa_backends.ONNX_CACHE_DIR = folder
+        FakeORTModel.loads = []
+        try:
+            yield calls
+        finally:
+            for name, module in saved.items():
+                if module is False:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+            qa_backends._device, qa_backends.ONNX_CACHE_DIR = device, cache_dir
+
+@contextmanager
+def qa_backend_env(value):
+    """Recarrega utils.qa_backends com QA_BACKEND definido e restaura o módulo no fim"""
+    previous = os.environ.get("QA_BACKEND")
+    os.environ["QA_BACKEND"] = value
+    try:
+        yield importlib.reload(qa_backends)
+    finally:
+        if previous is None:
+            os.environ.pop("QA_BACKEND")
+        else:
+            os.environ["QA_BACKEND"] = previous
+        importlib.reload(qa_backends)
+
+def test_backend_from_env():
+    """QA_BACKEND define o padrão de load_qa_pipeline (sem diferenciar maiúsculas)"""
+    with qa_backend_env("ONNX") as module:
+        assert module.DEFAULT_QA_BACKEND == "onnx"
+        assert module.load_qa_pipeline.__defaults__ == ("onnx",)
+    assert qa_backends.DEFAULT_QA_BACKEND == os.environ.get("QA_BACKEND", "torch").lower()
+    print("✅ Seleção por QA_BACKEND OK")
+
+def test_onnx_exported_once():
+    """Backend onnx: exporta na primeira carga e reaproveita a exportação do disco depois"""
+    with stub_modules(with_optimum=True) as calls:
+        qa = qa_backends.load_qa_pipeline(MODEL_NAME, "onnx")
+        assert isinstance(qa["model"], FakeORTModel) and qa["tokenizer"] == f"tokenizer:{MODEL_NAME}"
+        qa_backends.load_qa_pipeline(MODEL_NAME, "onnx")
+        assert FakeORTModel.loads == [(MODEL_NAME, True), (qa_backends._onnx_model_dir(MODEL_NAME), False)]
+        assert len(calls) == 2
+    print("✅ Backend onnx com exportação reaproveitada OK")
+
+def test_fallback_to_torch():
+    """Sem optimum (ou com backend desconhecido) o pipeline é o torch original"""
+    for backend in ("onnx", "tpu"):
+        with stub_modules(with_optimum=False) as calls:
+            qa = qa_backends.load_qa_pipeline(MODEL_NAME, backend)
+            assert calls == [("question-answering", {"model": MODEL_NAME, "tokenizer": MODEL_NAME, "device": -1})]
+            assert qa["model"] == MODEL_NAME and FakeORTModel.loads == []
+    print("✅ Volta para torch sem optimum OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes dos backends de QA")
+    print("=" * 50)
+    test_backend_from_env()
+    test_onnx_exported_once()
+    test_fallback_to_torch()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,109 @@
+"""
+Testes do micro-batching do pipeline de QA
+"""
+
+import os
+import time
+import threading
+
+from utils.qa_batcher import QABatcher
+
+class RecordingPipeline:
+    """Pipeline de QA mínimo: registra o tamanho de cada lote recebido"""
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, question, context, batch_size=1, **options):
+        self.batches.append(len(question))
+        time.sleep(self.delay)
+        results = [{"answer": f"{q}|{c}", "score": 0.9} for q, c in zip(question, context)]
+        return results[0] if len(results) == 1 else results
+
+def test_concurrent_requests_share_batches():
+    """20 usuários simultâneos viram poucos forward passes e cada um recebe a sua resposta"""
+    qa = RecordingPipeline()
+    batcher = QABatcher(qa, max_batch_size=8, max_wait_ms=50)
+    answers = {}
+
+    def ask(i):
+        answers[i] = batcher(question=f"p{i}", context=f"c{i}", max_answer_len=200)
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(answers[i]["answer"] == f"p{i}|c{i}" for i in range(20))
+    assert max(qa.batches) <= 8 and len(qa.batches) < 20
+    stats = batcher.stats()
+    assert stats["requests"] == 20 and stats["batches"] == len(qa.batches)
+    print(f"✅ 20 perguntas em {len(qa.batches)} lotes {qa.batches}")
+
+def test_list_of_questions():
+    """Uma lista de perguntas sobre o mesmo contexto vai em um único lote e volta como lista"""
+    qa = RecordingPipeline(delay=0)
+    batcher = QABatcher(qa, max_batch_size=4, max_wait_ms=0)
+    results = batcher(question=["a", "b", "c"], context="ctx")
+    assert [result["answer"] for result in results] == ["a|ctx", "b|ctx", "c|ctx"]
+    # As variações de uma mesma requisição nunca são separadas em lotes diferentes
+    assert qa.batches == [3]
+    print("✅ Lista de perguntas OK")
+
+def test_failure_isolated():
+    """Uma pergunta inválida falha sozinha; as demais do lote são respondidas"""
+    class FailingPipeline(RecordingPipeline):
+        def __call__(self, question, context, batch_size=1, **options):
+            if "erro" in question:
+                raise ValueError("entrada inválida")
+            return super().__call__(question, context, batch_size, **options)
+
+    batcher = QABatcher(FailingPipeline(delay=0), max_batch_size=4, max_wait_ms=50)
+    ok = batcher.submit("ok", "ctx")
+    bad = batcher.submit("erro", "ctx")
+    assert ok.result()["answer"] == "ok|ctx"
+    try:
+        bad.result()
+        assert False, "esperava ValueError"
+    except ValueError:
+        pass
+    print("✅ Falha isolada por pergunta OK")
+
+def test_disabled():
+    """max_batch_size=1 chama o pipeline diretamente, sem thread"""
+    qa = RecordingPipeline(delay=0)
+    batcher = QABatcher(qa, max_batch_size=1)
+    assert batcher(question="a", context="b")["answer"] == "a|b"
+    assert batcher._worker is None and qa.batches == [1]
+    print("✅ Batching desativado OK")
+
+def test_worker_restarts_after_fork():
+    """Batcher criado antes do fork (preload_app): o filho ganha a sua thread em vez de travar"""
+    qa = RecordingPipeline(delay=0)
+    batcher = QABatcher(qa, max_batch_size=4, max_wait_ms=5)
+    assert batcher(question="antes", context="pai")["answer"] == "antes|pai"
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            answer = batcher.submit(question="depois", context="filho").result(timeout=2)["answer"]
+        except Exception:
+            answer = ""
+        os.write(write_end, b"1" if answer == "depois|filho" else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 1) == b"1"
+    assert batcher(question="ainda", context="pai")["answer"] == "ainda|pai"
+    print("✅ Thread de lote recriada no processo filho OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do micro-batching de QA")
+    print("=" * 50)
+    test_concurrent_requests_share_batches()
+    test_list_of_questions()
+    test_failure_isolated()
+    test_disabled()
+    test_worker_restarts_after_fork()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,96 @@
+"""
+Testes do motor de QA em lote (contexto pré-tokenizado, variações em um forward pass)
+Compara as respostas com o pipeline do transformers no conjunto fixo de utils.qa_backends
+"""
+
+import time
+from types import SimpleNamespace
+
+import torch
+
+from utils.qa_backends import CHECK_CONTEXT, CHECK_QUESTIONS, load_qa_pipeline
+from utils.qa_engine import QAEngine, TokenizedContext, _Feature
+
+MODEL_NAME = "deepset/roberta-base-squad2"
+
+def test_tokenized_context_offsets():
+    """Offsets das passagens são deslocados para o texto unido por espaço"""
+    context = TokenizedContext(["abc de", "fgh"], [([1, 2], [(0, 3), (4, 6)]), ([3], [(0, 3)])])
+    assert context.text == "abc de fgh"
+    assert len(context) == 3
+    assert [context.text[start:end] for start, end in context.offsets] == ["abc", "de", "fgh"]
+    print("✅ Offsets do contexto pré-tokenizado OK")
+
+def test_engine_matches_pipeline():
+    """Mesmas respostas do pipeline; variações e contexto em cache em um único forward pass"""
+    qa_pipeline = load_qa_pipeline(MODEL_NAME, "torch")
+    engine = QAEngine(qa_pipeline)
+
+    passages = CHECK_CONTEXT.split(". ")
+    engine.pretokenize(passages)
+    context = engine.context(passages)
+
+    agreements = 0
+    for question in CHECK_QUESTIONS:
+        expected = qa_pipeline(question=question, context=context.text, max_answer_len=200)
+        result = engine(question=question, context=context, max_answer_len=200)
+        agreements += result["answer"].strip() == expected["answer"].strip()
+    print(f"   Concordância com o pipeline: {agreements}/{len(CHECK_QUESTIONS)}")
+    assert agreements >= len(CHECK_QUESTIONS) - 1
+
+    start = time.perf_counter()
+    engine(question=CHECK_QUESTIONS[0], context=context, max_answer_len=200)
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    results = engine(question=CHECK_QUESTIONS[:4], context=context, max_answer_len=200)
+    batched = time.perf_counter() - start
+    assert len(results) == 4
+    print(f"✅ 1 pergunta: {single * 1000:.0f} ms, 4 variações no mesmo forward: {batched * 1000:.0f} ms")
+
+def test_pack_single_window():
+    """Contexto maior que a janela é empacotado em uma janela só, com o corte reportado"""
+    engine = QAEngine(load_qa_pipeline(MODEL_NAME, "torch"))
+    question = CHECK_QUESTIONS[1]
+    passages = [CHECK_CONTEXT] * 4
+    context = engine.pack(passages, question, scores=[0.9, 0.8, 0.7, 0.6])
+    assert context.truncated and context.dropped > 0
+    assert len(context) <= engine.context_budget(engine.encode_question(question))
+
+    before = engine.stats()["windows"]
+    result = engine(question=question, context=context, max_answer_len=200)
+    assert engine.stats()["windows"] - before == 1
+    assert "600 mg" in result["answer"]
+    print(f"✅ Empacotamento em uma janela ({len(context)} tokens, {context.dropped} passagens descartadas)")
+
+class DeviceStandIn:
+    """Modelo mínimo em outro dispositivo: exige as entradas nele, como um modelo na GPU"""
+    def __init__(self, device):
+        self.device = torch.device(device)
+        self.seen = []
+
+    def __call__(self, **inputs):
+        self.seen = sorted((name, tensor.device) for name, tensor in inputs.items())
+        assert all(tensor.device == self.device for tensor in inputs.values()), self.seen
+        rows, length = inputs["input_ids"].shape
+        return SimpleNamespace(start_logits=torch.zeros(rows, length), end_logits=torch.zeros(rows, length))
+
+def test_inputs_follow_model_device():
+    """Tensores do lote vão para o dispositivo do modelo (backend torch na GPU com CUDA)"""
+    tokenizer = SimpleNamespace(model_max_length=512, model_input_names=["input_ids", "token_type_ids", "attention_mask"],
+                                pad_token_id=0)
+    model = DeviceStandIn("meta")
+    engine = QAEngine(SimpleNamespace(tokenizer=tokenizer, model=model))
+    features = [_Feature(0, [101, 7, 8, 102], [0, 0, 1, 1], 2, 0, 2), _Feature(1, [101, 9, 102], [0, 1, 1], 2, 0, 1)]
+    start_logits, end_logits = engine._forward(features)
+    assert start_logits.shape == end_logits.shape == (2, 4)
+    assert [device.type for _, device in model.seen] == ["meta", "meta", "meta"]
+    print("✅ Entradas no dispositivo do modelo OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do motor de QA")
+    print("=" * 50)
+    test_tokenized_context_offsets()
+    test_inputs_follow_model_device()
+    test_engine_matches_pipeline()
+    test_pack_single_window()
+    print("\n✅ Todos os testes passaram!")
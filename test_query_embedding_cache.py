@@ -0,0 +1,56 @@
+"""
+Testes do cache LRU de embeddings das perguntas
+"""
+
+from utils.query_embedding_cache import QueryEmbeddingCache, normalize_question
+
+class CountingModel:
+    """Modelo de embedding mínimo que conta as chamadas de encode"""
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, text):
+        self.calls.append(text)
+        return [float(len(text))]
+
+def test_normalize_question():
+    assert normalize_question("  Qual a dose   da Rifampicina? ") == "qual a dose da rifampicina"
+    assert normalize_question("Qual a dose da rifampicina") == "qual a dose da rifampicina"
+    print("✅ Normalização da pergunta OK")
+
+def test_shared_across_personas():
+    """A mesma pergunta (com variações de forma) é codificada uma única vez"""
+    cache = QueryEmbeddingCache(max_size=10)
+    model = CountingModel()
+    first = cache.encode(model, "Qual a dose da rifampicina?", "mini")
+    second = cache.encode(model, "qual a dose da  rifampicina", "mini")
+    assert first is second and len(model.calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # Outro modelo de embedding não reaproveita o vetor
+    cache.encode(model, "Qual a dose da rifampicina?", "outro")
+    assert len(model.calls) == 2
+    print("✅ Reaproveitamento entre personalidades OK")
+
+def test_lru_eviction():
+    """Ao exceder o limite sai a pergunta menos usada recentemente"""
+    cache = QueryEmbeddingCache(max_size=2)
+    model = CountingModel()
+    cache.encode(model, "a", "mini")
+    cache.encode(model, "b", "mini")
+    cache.encode(model, "a", "mini")
+    cache.encode(model, "c", "mini")
+    assert cache.stats()["size"] == 2
+    cache.encode(model, "a", "mini")
+    assert model.calls == ["a", "b", "c"]
+    cache.encode(model, "b", "mini")
+    assert model.calls == ["a", "b", "c", "b"]
+    print("✅ Remoção LRU OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do cache de embeddings das perguntas")
+    print("=" * 50)
+    test_normalize_question()
+    test_shared_across_personas()
+    test_lru_eviction()
+    print("\n✅ Todos os testes passaram!")
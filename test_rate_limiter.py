@@ -0,0 +1,104 @@
+"""
+Testes do limitador token bucket por chave (burst, fila, prazo e desvio para outro modelo)
+"""
+
+import time
+import asyncio
+
+from utils.rate_limiter import RateLimitExceeded, TokenBucket, per_worker_quota
+from utils.hedged_calls import HedgedCaller
+
+def test_burst_then_delay():
+    """O burst passa na hora; a chamada seguinte espera a próxima ficha"""
+    bucket = TokenBucket("llama", rate_per_minute=600, burst=3, max_queue=5)  # uma ficha a cada 0,1 s
+    start = time.perf_counter()
+    waits = [bucket.acquire(max_wait=1) for _ in range(4)]
+    elapsed = time.perf_counter() - start
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0.05 < waits[3] <= 0.1 and elapsed >= 0.08
+    stats = bucket.stats()
+    assert stats["admitted"] == 4 and stats["delayed"] == 1 and stats["queued"] == 0
+    print(f"✅ Burst e espera OK (4ª chamada esperou {1000 * waits[3]:.0f} ms)")
+
+def test_rejections():
+    """Espera maior que o prazo ou fila cheia: recusa imediata, sem consumir ficha"""
+    bucket = TokenBucket("qwen", rate_per_minute=60, burst=1, max_queue=1)  # uma ficha por segundo
+    bucket.acquire()
+    start = time.perf_counter()
+    try:
+        bucket.acquire(max_wait=0.5)
+        raise AssertionError("espera acima do prazo aceita")
+    except RateLimitExceeded:
+        pass
+    assert time.perf_counter() - start < 0.01
+
+    async def queue_full():
+        waiting = asyncio.ensure_future(bucket.acquire_async(max_wait=5))
+        await asyncio.sleep(0.01)
+        try:
+            await bucket.acquire_async(max_wait=5)
+            raise AssertionError("fila cheia aceitou chamada")
+        except RateLimitExceeded:
+            pass
+        # Cancelar quem espera devolve a ficha reservada
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+    tokens_before = bucket.stats()["tokens"]
+    asyncio.run(queue_full())
+    stats = bucket.stats()
+    assert stats["rejected_deadline"] == 1 and stats["rejected_queue_full"] == 1
+    assert stats["queued"] == 0 and stats["admitted"] == 1
+    assert stats["tokens"] >= tokens_before
+    print("✅ Recusas por prazo e fila cheia OK")
+
+def test_penalize_after_429():
+    """Um 429 do provedor segura a chave pelo Retry-After"""
+    bucket = TokenBucket("gemini", rate_per_minute=6000, burst=5)
+    bucket.penalize(0.2)
+    try:
+        bucket.acquire(max_wait=0.1)
+        raise AssertionError("chave penalizada aceitou chamada")
+    except RateLimitExceeded:
+        pass
+    assert bucket.acquire(max_wait=0.5) >= 0.1
+    print("✅ Penalização após 429 OK")
+
+def test_exhausted_key_routes_to_next_model():
+    """Chave sem ficha falha na hora e o hedging passa para o próximo modelo sem esperar o atraso"""
+    limiters = {"llama": TokenBucket("llama", rate_per_minute=1, burst=1), "qwen": TokenBucket("qwen")}
+    limiters["llama"].acquire()
+
+    def attempt(name):
+        def call():
+            limiters[name].acquire(max_wait=0.5)
+            return f"resposta {name}"
+        return call
+
+    start = time.perf_counter()
+    result, name, records = HedgedCaller(hedge_delay=5, deadline=5).call(
+        [("llama", attempt("llama")), ("qwen", attempt("qwen"))]
+    )
+    assert (result, name) == ("resposta qwen", "qwen")
+    assert "limitador" in records[0]["error"]
+    assert time.perf_counter() - start < 0.1
+    print("✅ Desvio para o próximo modelo OK")
+
+def test_quota_split_between_workers():
+    """Com vários workers do gunicorn, as taxas somam a cota da chave; o burst é dividido (mínimo 1)"""
+    assert per_worker_quota(20, 5, 1) == (20, 5)
+    assert per_worker_quota(20, 5, 4) == (5, 1)
+    assert per_worker_quota(20, 5, 0) == (20, 5)
+    rate, burst = per_worker_quota(20, 2, 3)
+    assert abs(3 * rate - 20) < 1e-9 and burst == 1
+    print("✅ Cota dividida entre os workers OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do limitador token bucket")
+    print("=" * 50)
+    test_burst_then_delay()
+    test_rejections()
+    test_penalize_after_429()
+    test_exhausted_key_routes_to_next_model()
+    test_quota_split_between_workers()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,71 @@
+"""
+Testes do cache semântico das respostas (similaridade, partição, TTL e LRU)
+"""
+
+import time
+
+import numpy as np
+
+from utils.semantic_cache import SemanticCache
+
+def vector(*values):
+    return np.array(values, dtype=np.float32)
+
+def test_paraphrase_hit():
+    """Pergunta próxima de uma já respondida reaproveita a resposta; distante vai ao modelo"""
+    cache = SemanticCache(threshold=0.95, max_size=10, ttl=60)
+    cache.store("dr_gasnelio", "v1", "qual a dose da rifampicina?", vector(1, 0, 0), "600 mg mensal", {"model": "llama"})
+
+    entry, similarity = cache.lookup("dr_gasnelio", "v1", vector(0.99, 0.05, 0))
+    assert entry and entry.answer == "600 mg mensal" and entry.metadata["model"] == "llama"
+    assert similarity > 0.95
+
+    entry, similarity = cache.lookup("dr_gasnelio", "v1", vector(0.6, 0.8, 0))
+    assert entry is None and abs(similarity - 0.6) < 1e-6
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+    assert stats["similarity_histogram"]["0.95-1.00"] == 1
+    assert stats["similarity_histogram"]["0.50-0.70"] == 1
+    print("✅ Reaproveitamento por similaridade OK")
+
+def test_partitions():
+    """Respostas não passam de uma persona ou versão do corpus para outra"""
+    cache = SemanticCache(threshold=0.9)
+    cache.store("dr_gasnelio", "v1", "pergunta", vector(1, 0), "resposta técnica")
+    assert cache.lookup("ga", "v1", vector(1, 0))[0] is None
+    assert cache.lookup("dr_gasnelio", "v2", vector(1, 0))[0] is None
+    assert cache.lookup("dr_gasnelio", "v1", vector(1, 0))[0].answer == "resposta técnica"
+    print("✅ Partição por persona e versão do corpus OK")
+
+def test_ttl():
+    """Entradas expiradas não são devolvidas"""
+    cache = SemanticCache(threshold=0.9, ttl=0.05)
+    cache.store("ga", "v1", "pergunta", vector(0, 1), "resposta")
+    assert cache.lookup("ga", "v1", vector(0, 1))[0] is not None
+    time.sleep(0.1)
+    assert cache.lookup("ga", "v1", vector(0, 1))[0] is None
+    assert cache.stats()["expired"] == 1 and cache.stats()["size"] == 0
+    print("✅ Expiração por TTL OK")
+
+def test_lru_eviction():
+    """Ao passar do limite, sai a resposta usada há mais tempo"""
+    cache = SemanticCache(threshold=0.9, max_size=2)
+    cache.store("ga", "v1", "a", vector(1, 0, 0), "A")
+    cache.store("ga", "v1", "b", vector(0, 1, 0), "B")
+    assert cache.lookup("ga", "v1", vector(1, 0, 0))[0].answer == "A"  # "a" passa a ser a mais recente
+    cache.store("ga", "v1", "c", vector(0, 0, 1), "C")
+    assert cache.lookup("ga", "v1", vector(0, 1, 0))[0] is None
+    assert cache.lookup("ga", "v1", vector(1, 0, 0))[0].answer == "A"
+    assert cache.lookup("ga", "v1", vector(0, 0, 1))[0].answer == "C"
+    assert cache.stats()["evicted"] == 1
+    print("✅ Remoção LRU OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do cache semântico")
+    print("=" * 50)
+    test_paraphrase_hit()
+    test_partitions()
+    test_ttl()
+    test_lru_eviction()
+    print("\n✅ Todos os testes passaram!")
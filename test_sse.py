@@ -0,0 +1,95 @@
+"""
+Testes do streaming por Server-Sent Events
+Um servidor local imita o stream do OpenRouter (stream: true) para medir o tempo até o primeiro trecho
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from utils.sse import iter_openrouter_deltas, sse_event, strip_persona_header
+
+TOKENS = ["A dose ", "mensal ", "inclui ", "600 mg ", "de rifampicina."]
+
+class OpenRouterStandIn(BaseHTTPRequestHandler):
+    """Envia um comentário de keep-alive e um token a cada 50 ms (chunked), como o OpenRouter"""
+    protocol_version = "HTTP/1.1"
+
+    def send_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.send_chunk(": OPENROUTER PROCESSING\n\n")
+        for token in self.server.tokens:
+            chunk = {"choices": [{"delta": {"content": token}}]}
+            self.send_chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(0.05)
+        if self.server.error:
+            self.send_chunk(f"data: {json.dumps({'error': {'message': self.server.error}})}\n\n")
+        self.send_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+def start_server(tokens=TOKENS, error=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OpenRouterStandIn)
+    server.tokens = tokens
+    server.error = error
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+
+def test_sse_event_format():
+    """Eventos com nome e dados em JSON (acentos preservados)"""
+    assert sse_event("header", {"text": "Gá responde:\n\n"}) == 'event: header\ndata: {"text": "Gá responde:\\n\\n"}\n\n'
+    assert strip_persona_header("ga", "Gá responde:\n\nOlha só") == "Olha só"
+    assert strip_persona_header("dr_gasnelio", "Olá! Aqui é o Dr. Gasnelio.") == "Olá! Aqui é o Dr. Gasnelio."
+    print("✅ Formato dos eventos OK")
+
+def test_deltas_arrive_incrementally():
+    """O primeiro trecho chega muito antes do fim da geração"""
+    server, url = start_server()
+    start = time.perf_counter()
+    response = requests.post(url, json={"stream": True}, stream=True, timeout=5)
+    deltas = iter_openrouter_deltas(response)
+    first = next(deltas)
+    first_at = time.perf_counter() - start
+    rest = list(deltas)
+    total = time.perf_counter() - start
+    assert first + "".join(rest) == "".join(TOKENS)
+    assert first_at < total / 2
+    server.shutdown()
+    print(f"✅ Primeiro trecho em {first_at * 1000:.0f} ms, resposta completa em {total * 1000:.0f} ms")
+
+def test_stream_error():
+    """Erro no meio do stream é levantado para o chamador"""
+    server, url = start_server(tokens=TOKENS[:1], error="Rate limit exceeded")
+    response = requests.post(url, json={"stream": True}, stream=True, timeout=5)
+    received = []
+    try:
+        for delta in iter_openrouter_deltas(response):
+            received.append(delta)
+        raise AssertionError("erro não levantado")
+    except RuntimeError as e:
+        assert str(e) == "Rate limit exceeded"
+    assert received == TOKENS[:1]
+    server.shutdown()
+    print("✅ Erro no stream OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes do streaming SSE")
+    print("=" * 50)
+    test_sse_event_format()
+    test_deltas_arrive_incrementally()
+    test_stream_error()
+    print("\n✅ Todos os testes passaram!")
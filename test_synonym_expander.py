@@ -0,0 +1,60 @@
+"""
+Testes da expansão de consultas por sinônimos (padrão único compilado)
+"""
+
+from utils.bm25 import BM25Retriever
+from utils.synonym_expander import SynonymExpander
+
+SYNONYMS = {
+    'hanseníase': ['lepra', 'doença de hansen'],
+    'dapsona': ['dds'],
+    'isolamento': ['separação', 'isolamento social'],
+}
+
+def test_find_single_pass():
+    """Todos os termos são encontrados em uma passada, preferindo a expressão mais longa"""
+    expander = SynonymExpander(SYNONYMS)
+    assert expander.find("Lepra tem cura? E a DDS?") == ["lepra", "dds"]
+    assert expander.find("O isolamento social é necessário?") == ["isolamento social"]
+    # Apenas palavras inteiras
+    assert expander.find("dapsonas e leprosários") == []
+    print("✅ Busca dos termos OK")
+
+def test_expand_weights():
+    """Termos da pergunta pesam 1.0; sinônimos (nos dois sentidos) pesam menos"""
+    expander = SynonymExpander(SYNONYMS, synonym_weight=0.5)
+    weights = expander.expand("Como tratar a lepra?")
+    assert weights["lepra"] == 1.0 and weights["como"] == 1.0
+    assert weights["hanseníase"] == 0.5 and weights["hansen"] == 0.5
+    assert "de" not in weights
+    print("✅ Pesos da expansão OK")
+
+def test_variants():
+    """Variações trocam um termo por vez pelo substituto preferido"""
+    expander = SynonymExpander(SYNONYMS)
+    assert expander.variants("Lepra e DDS?") == ["hanseníase e dds?", "lepra e dapsona?"]
+    assert expander.variants("Lepra e DDS?", limit=1) == ["hanseníase e dds?"]
+    assert expander.variants("Qual a dose?") == []
+    print("✅ Variações da pergunta OK")
+
+def test_expansion_feeds_retriever():
+    """A expansão encontra o trecho que só usa o termo técnico"""
+    chunks = [
+        "A hanseníase é tratada com poliquimioterapia.",
+        "Orientações gerais sobre o armazenamento.",
+    ]
+    retriever = BM25Retriever(chunks)
+    expander = SynonymExpander(SYNONYMS)
+    assert retriever.search("lepra") == []
+    results = retriever.search(expander.expand("lepra"))
+    assert results and results[0][0] == 0
+    print("✅ Expansão integrada ao BM25 OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes de expansão por sinônimos")
+    print("=" * 50)
+    test_find_single_pass()
+    test_expand_weights()
+    test_variants()
+    test_expansion_feeds_retriever()
+    print("\n✅ Todos os testes passaram!")
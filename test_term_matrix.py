@@ -0,0 +1,44 @@
+"""
+Testes da matriz chunk x termo (pontuação por palavras-chave vetorizada)
+"""
+
+import numpy as np
+
+from utils.bm25 import tokenize
+from utils.embedding_index import top_k_indices
+from utils.term_matrix import TermMatrix
+
+CHUNKS = [
+    "A rifampicina é administrada em dose mensal supervisionada.",
+    "A dapsona é tomada diariamente em casa.",
+    "Orientações sobre armazenamento dos medicamentos.",
+    "Rifampicina e dapsona compõem a poliquimioterapia.",
+]
+
+def naive_scores(chunks, term_weights):
+    """Laço original: soma dos pesos dos termos presentes em cada chunk"""
+    scores = []
+    for chunk in chunks:
+        words = set(tokenize(chunk))
+        scores.append(sum(weight for term, weight in term_weights.items() if term in words))
+    return np.array(scores, dtype=np.float32)
+
+def test_dot_matches_loop():
+    matrix = TermMatrix(CHUNKS)
+    weights = {"rifampicina": 1.0, "dapsona": 1.0, "poliquimioterapia": 0.5, "inexistente": 1.0}
+    assert np.allclose(matrix.dot(weights), naive_scores(CHUNKS, weights))
+    assert np.allclose(matrix.dot({"inexistente": 1.0}), 0.0)
+    print("✅ Produto matriz-vetor igual ao laço original OK")
+
+def test_top_k_indices():
+    scores = np.array([0.1, 0.9, -np.inf, 0.5, 0.7], dtype=np.float32)
+    assert top_k_indices(scores, 2).tolist() == [1, 4]
+    assert top_k_indices(scores, 10).tolist()[:4] == [1, 4, 3, 0]
+    print("✅ Top-k com argpartition OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes da matriz chunk x termo")
+    print("=" * 50)
+    test_dot_matches_loop()
+    test_top_k_indices()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1,91 @@
+"""
+Testes da inicialização em fases (carga em segundo plano e prontidão por componente)
+"""
+
+import os
+import time
+import threading
+
+from utils.warmup import Warmup
+
+def test_background_loading():
+    """start() retorna na hora; os componentes ficam prontos na ordem de registro"""
+    order = []
+    release = threading.Event()
+
+    def load_models():
+        release.wait(2)
+        order.append("models")
+
+    warmup = Warmup().add("models", load_models).add("corpus", lambda: order.append("corpus"))
+    start = time.perf_counter()
+    warmup.start()
+    assert time.perf_counter() - start < 0.1
+    assert warmup.loading() and not warmup.ready()
+    assert warmup.report()["components"]["models"]["status"] == "loading"
+
+    release.set()
+    assert warmup.wait(timeout=2)
+    assert order == ["models", "corpus"]
+    assert warmup.report()["ready"]
+    print("✅ Carga em segundo plano OK")
+
+def test_bounded_wait():
+    """Requisições que chegam cedo esperam no máximo o timeout"""
+    release = threading.Event()
+    warmup = Warmup().add("models", lambda: release.wait(2)).start()
+    start = time.perf_counter()
+    assert not warmup.wait("models", timeout=0.05)
+    assert time.perf_counter() - start < 0.5
+    assert warmup.loading("models")
+    release.set()
+    assert warmup.wait("models", timeout=2)
+    print("✅ Espera limitada OK")
+
+def test_failure_is_reported():
+    """Uma falha é registrada e não impede os componentes seguintes"""
+    def broken():
+        raise RuntimeError("download falhou")
+
+    warmup = Warmup().add("models", broken).add("corpus", lambda: None).run()
+    report = warmup.report()["components"]
+    assert report["models"]["status"] == "failed" and report["models"]["error"] == "download falhou"
+    assert report["corpus"]["status"] == "ready"
+    assert not warmup.wait("models", timeout=0) and not warmup.loading()
+    print("✅ Falhas reportadas OK")
+
+def test_reloads_after_fork():
+    """Processo filho (worker do gunicorn com preload) não herda a thread: recarrega o que faltava"""
+    release = threading.Event()
+    loaded_in = []
+    parent = os.getpid()
+
+    def load_models():
+        loaded_in.append(os.getpid())
+        if os.getpid() == parent:
+            release.wait(2)
+
+    warmup = Warmup().add("corpus", lambda: None).add("models", load_models).start()
+    assert warmup.wait("corpus", timeout=2) and warmup.loading("models")
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # No filho a carga do pai nunca termina; a espera dispara a recarga neste processo
+        ok = warmup.wait("models", timeout=2) and loaded_in[-1] == os.getpid()
+        os.write(write_end, b"1" if ok else b"0")
+        os._exit(0)
+    release.set()
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 1) == b"1"
+    assert warmup.wait(timeout=2) and loaded_in == [os.getpid()]
+    print("✅ Recarga no processo filho OK")
+
+if __name__ == "__main__":
+    print("🧪 Testes da inicialização em fases")
+    print("=" * 50)
+    test_background_loading()
+    test_bounded_wait()
+    test_failure_is_reported()
+    test_reloads_after_fork()
+    print("\n✅ Todos os testes passaram!")
@@ -0,0 +1 @@
+"""Utilitários compartilhados pelos chatbots (busca, índices e caches)"""
@@ -0,0 +1,206 @@
+"""
+Índice aproximado de vizinhos mais próximos (IVF) implementado sobre NumPy
+Os vetores são agrupados por k-means esférico; a busca visita apenas as
+nprobe listas mais próximas da pergunta (nprobe maior = mais recall, mais latência).
+Abaixo de exact_threshold vetores a busca é exata (força bruta).
+As listas guardam apenas ids: os candidatos são lidos da matriz de vetores, que pode
+ser a matriz compartilhada do índice de embeddings (memmap float16, sem cópia).
+"""
+
+import os
+import math
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NPROBE = int(os.environ.get("ANN_NPROBE", 8))
+DEFAULT_EXACT_THRESHOLD = int(os.environ.get("ANN_MIN_CHUNKS", 10000))
+ASSIGN_BLOCK_ROWS = 16384
+
+
+def _top_k(scores, top_k):
+    n = len(scores)
+    if top_k >= n:
+        return np.argsort(scores)[::-1]
+    candidates = np.argpartition(scores, n - top_k)[n - top_k:]
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+def _assign(vectors, centroids):
+    """Lista (centroide de maior produto interno) de cada vetor, em blocos"""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def _scores(vectors, query):
+    """Produto interno com a pergunta; matrizes float16 são convertidas em blocos"""
+    if vectors.dtype == np.float32:
+        return vectors @ query
+    scores = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        scores[start:start + len(block)] = block @ query
+    return scores
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=10, seed=0):
+    """k-means com centroides normalizados (similaridade cosseno)"""
+    rng = np.random.default_rng(seed)
+    centroids = np.asarray(vectors[rng.choice(len(vectors), n_clusters, replace=False)], dtype=np.float32)
+    for _ in range(iterations):
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_clusters)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        empty = counts == 0
+        sums = np.zeros_like(centroids)
+        if (~empty).any():
+            sums[~empty] = np.add.reduceat(np.asarray(vectors, dtype=np.float32)[order], starts[~empty], axis=0)
+        if empty.any():
+            # Reinicializa clusters vazios com vetores aleatórios
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, dim, n_lists=None, nprobe=DEFAULT_NPROBE, exact_threshold=DEFAULT_EXACT_THRESHOLD,
+                 train_sample=None, seed=0):
+        """
+        Args:
+            dim: Dimensão dos vetores (normalizados)
+            n_lists: Número de listas invertidas (padrão: ~sqrt(n) no treino)
+            nprobe: Listas visitadas por busca (controle recall/latência)
+            exact_threshold: Abaixo desse tamanho a busca é exata
+            train_sample: Vetores usados no k-means (padrão: 40 por lista)
+        """
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.train_sample = train_sample
+        self.seed = seed
+
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._shared = False
+        self.centroids = None
+        self._lists = []         # ids contíguos por lista
+
+    @classmethod
+    def over(cls, vectors, **kwargs):
+        """
+        Índice somente leitura sobre uma matriz existente (ex.: memmap float16), sem copiá-la
+
+        Os ids são as linhas da matriz; o treino é feito na construção quando
+        a matriz atinge exact_threshold.
+        """
+        index = cls(vectors.shape[1], **kwargs)
+        index._vectors = vectors
+        index._size = len(vectors)
+        index._shared = True
+        if index._size >= index.exact_threshold:
+            index.train()
+        return index
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    @property
+    def vectors(self):
+        return self._vectors[:self._size]
+
+    def add(self, vectors):
+        """
+        Insere vetores incrementalmente; os ids são sequenciais a partir de len(self)
+
+        Ao ultrapassar exact_threshold pela primeira vez o quantizador é treinado;
+        depois disso novos vetores só são atribuídos à lista mais próxima.
+        """
+        if self._shared:
+            raise ValueError("Índice sobre matriz compartilhada é somente leitura")
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) == 0:
+            return
+        start = self._size
+        needed = start + len(vectors)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors), 1024)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:start] = self._vectors[:start]
+            self._vectors = grown
+        self._vectors[start:needed] = vectors
+        self._size = needed
+
+        if self.trained:
+            self._assign_to_lists(np.arange(start, needed), vectors)
+        elif self._size >= self.exact_threshold:
+            self.train()
+
+    def train(self):
+        """Treina o quantizador (k-means) e distribui todos os vetores nas listas"""
+        n = self._size
+        n_lists = self.n_lists or max(1, int(math.sqrt(n)))
+        n_lists = min(n_lists, n)
+        sample_size = min(n, self.train_sample or 40 * n_lists)
+        rng = np.random.default_rng(self.seed)
+        sample_ids = rng.choice(n, sample_size, replace=False) if sample_size < n else np.arange(n)
+        self.centroids = spherical_kmeans(self.vectors[sample_ids], n_lists, seed=self.seed)
+        self.n_lists = n_lists
+        self._lists = [np.zeros(0, dtype=np.int64) for _ in range(n_lists)]
+        self._assign_to_lists(np.arange(n), self.vectors)
+        logger.info(f"Índice IVF treinado: {n} vetores em {n_lists} listas")
+
+    def _assign_to_lists(self, ids, vectors):
+        """Anexa os ids às listas já compactadas; a busca só lê (sem mutação concorrente)"""
+        labels = _assign(vectors, self.centroids)
+        order = np.argsort(labels, kind="stable")
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        for group in np.split(order, boundaries):
+            if len(group):
+                list_id = labels[group[0]]
+                self._lists[list_id] = np.concatenate([self._lists[list_id], ids[group]])
+
+    def search(self, query, top_k=3, nprobe=None, exact=False):
+        """
+        Busca os top_k vetores de maior produto interno com a pergunta
+
+        Args:
+            query: Vetor normalizado da pergunta
+            top_k: Quantidade de resultados
+            nprobe: Sobrescreve o nprobe padrão nesta busca
+            exact: Força busca exata (referência para medir recall)
+
+        Returns:
+            (ids, scores) em ordem decrescente de score
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if self._size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        if exact or not self.trained:
+            scores = _scores(self.vectors, query)
+            ids = _top_k(scores, top_k)
+            return ids, scores[ids]
+
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        probe = _top_k(self.centroids @ query, nprobe)
+        # Ids ordenados: leitura sequencial das linhas quando a matriz é um memmap
+        candidate_ids = np.sort(np.concatenate([self._lists[list_id] for list_id in probe]))
+        if len(candidate_ids) == 0:
+            return candidate_ids, np.zeros(0, dtype=np.float32)
+        candidate_vectors = np.asarray(self._vectors[candidate_ids], dtype=np.float32)
+        scores = candidate_vectors @ query
+        best = _top_k(scores, top_k)
+        return candidate_ids[best], scores[best]
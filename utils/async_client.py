@@ -0,0 +1,238 @@
+"""
+Cliente HTTP assíncrono (asyncio + aiohttp) para as chamadas remotas (OpenRouter, Langflow)
+Um event loop próprio numa thread em segundo plano mantém todas as chamadas em andamento
+do processo: esperar pela rede não ocupa uma thread por chamada, só uma vaga do semáforo.
+As chamadas têm prazo (deadline) e são canceladas de verdade: a conexão é fechada quando
+o prazo estoura ou quando quem espera desiste. Respostas 429/5xx e falhas de conexão são
+repetidas com a mesma política do HttpClient (backoff com jitter, respeitando Retry-After),
+sempre dentro do prazo.
+
+Uso a partir de código síncrono: async_http_client.run(coro, timeout)
+Uso a partir de uma view async (outro event loop): await async_http_client.wrap(coro)
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import concurrent.futures
+
+from utils.http_client import (DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX, DEFAULT_MAX_RETRIES, RETRY_STATUSES,
+                               backoff_delay, retry_after_seconds)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("ASYNC_MAX_CONCURRENCY", 200))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+DEFAULT_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 60))
+
+
+class AsyncResponse:
+    """Resposta já lida: status, corpo (JSON, ou texto se não for JSON) e cabeçalhos"""
+
+    __slots__ = ("status", "data", "headers")
+
+    def __init__(self, status, data, headers):
+        self.status = status
+        self.data = data
+        self.headers = headers
+
+
+class AsyncHttpClient:
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX):
+        """
+        Args:
+            max_concurrency: Chamadas simultâneas (as demais esperam uma vaga, dentro do prazo)
+            connect_timeout: Segundos para estabelecer a conexão
+            read_timeout: Segundos sem receber dados antes de desistir
+            max_retries: Novas tentativas em 429/5xx e falhas de conexão (como no HttpClient)
+            backoff_base: Espera base do backoff exponencial
+            backoff_max: Teto da espera; um Retry-After maior que isso encerra as tentativas
+        """
+        self.max_concurrency = max_concurrency
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.loop = None
+        self._thread = None
+        self._session = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+        # Métricas (alteradas só dentro do loop)
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.retries = 0
+        self.retry_after_waits = 0
+        self.retry_after_exceeded = 0
+
+    @property
+    def available(self):
+        return aiohttp is not None
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="async-http", daemon=True)
+                self._thread.start()
+                self.loop = loop
+                logger.info(f"Loop assíncrono iniciado (até {self.max_concurrency} chamadas simultâneas)")
+        return self.loop
+
+    def submit(self, coro):
+        """Agenda a corrotina no loop do cliente: concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro, timeout=None):
+        """Executa a corrotina a partir de código síncrono; no timeout, a cancela e levanta TimeoutError"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def wrap(self, coro):
+        """Aguarda a corrotina a partir de outro event loop; cancelar quem espera cancela a chamada"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def _get_session(self):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp não instalado (pip install aiohttp)")
+        if asyncio.get_running_loop() is not self.loop:
+            raise RuntimeError("Chamadas do AsyncHttpClient devem rodar no loop do cliente (use run/wrap)")
+        if self._session is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            )
+        return self._session
+
+    async def request(self, method, url, deadline, **kwargs):
+        """
+        Requisição com prazo total (inclui a espera por uma vaga e as novas tentativas)
+
+        Returns:
+            AsyncResponse da última tentativa
+        """
+        session = self._get_session()
+        try:
+            return await asyncio.wait_for(self._request_with_retries(session, method, url, **kwargs), deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+
+    async def _request_with_retries(self, session, method, url, **kwargs):
+        """Mesma política do HttpClient.request; a vaga do semáforo é liberada durante a espera"""
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                response = await self._request(session, method, url, **kwargs)
+            except aiohttp.ClientConnectorError as e:
+                # Falha ao conectar; timeout de leitura não é repetido (o tempo já foi gasto)
+                if attempt >= self.max_retries:
+                    raise
+                delay, reason = backoff_delay(attempt, self.backoff_base, self.backoff_max), f"falha de conexão: {e}"
+            else:
+                if response.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = retry_after_seconds(response)
+                if delay is not None and delay > self.backoff_max:
+                    self.retry_after_exceeded += 1
+                    return response
+                if delay is None:
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                else:
+                    self.retry_after_waits += 1
+                reason = f"HTTP {response.status}"
+
+            attempt += 1
+            self.retries += 1
+            logger.warning(f"{method} {url}: {reason}; nova tentativa {attempt}/{self.max_retries} em {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _request(self, session, method, url, **kwargs):
+        async with self._semaphore:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    if response.content_type == "application/json":
+                        data = await response.json()
+                    else:
+                        data = await response.text()
+                    return AsyncResponse(response.status, data, response.headers)
+            finally:
+                self.in_flight -= 1
+
+    async def request_json(self, method, url, deadline, **kwargs):
+        """
+        Requisição com prazo total
+
+        Returns:
+            (status HTTP, corpo em JSON, ou texto se não for JSON)
+        """
+        response = await self.request(method, url, deadline, **kwargs)
+        return response.status, response.data
+
+    async def post(self, url, deadline, **kwargs):
+        return await self.request("POST", url, deadline, **kwargs)
+
+    async def post_json(self, url, deadline, **kwargs):
+        return await self.request_json("POST", url, deadline, **kwargs)
+
+    async def get_json(self, url, deadline, **kwargs):
+        return await self.request_json("GET", url, deadline, **kwargs)
+
+    def close(self):
+        """Fecha a sessão e para o loop"""
+        if self.loop is None:
+            return
+        if self._session is not None:
+            self.run(self._session.close(), timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop = self._thread = self._session = self._semaphore = None
+
+    def stats(self):
+        """Chamadas em andamento e desfechos para o health check"""
+        return {
+            "available": self.available,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "retries": self.retries,
+            "retry_after_waits": self.retry_after_waits,
+            "retry_after_exceeded": self.retry_after_exceeded
+        }
+
+
+# Cliente assíncrono compartilhado do processo (o loop só começa na primeira chamada)
+async_http_client = AsyncHttpClient()
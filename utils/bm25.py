@@ -0,0 +1,122 @@
+"""
+Recuperação por palavras-chave com índice invertido e pontuação BM25
+O índice é construído uma vez por corpus; o custo da consulta depende apenas
+dos termos da pergunta e de suas listas de postings, não do tamanho do corpus
+"""
+
+import re
+import heapq
+import math
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Tokeniza em palavras minúsculas (mesmo critério de re.findall(r'\\w+') usado nos apps)"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def split_chunks(full_text, chunk_size, overlap):
+    """Janela deslizante de caracteres usada pelos apps baseados em Markdown"""
+    chunks = []
+    for i in range(0, len(full_text), chunk_size - overlap):
+        chunk = full_text[i:i + chunk_size]
+        if chunk.strip():
+            chunks.append(chunk)
+    return chunks
+
+
+class BM25Retriever:
+    def __init__(self, documents, k1=1.5, b=0.75, postings=None, doc_lengths=None):
+        """
+        Constrói o índice invertido
+
+        Args:
+            documents: Lista de textos (chunks) do corpus
+            k1: Saturação da frequência do termo
+            b: Peso da normalização pelo tamanho do documento
+            postings: Postings já calculados (ex.: artefato em disco); termo -> [(doc_id, tf)]
+            doc_lengths: Tamanho em tokens de cada documento (obrigatório com postings)
+        """
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+
+        if postings is None:
+            postings, doc_lengths = self.build_postings(documents)
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+
+        n_docs = len(doc_lengths)
+        avgdl = (sum(doc_lengths) / n_docs) if n_docs else 0.0
+        self.avgdl = avgdl
+        self.idf = {
+            term: math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+        # Denominador dependente do documento, pré-calculado
+        self.length_norm = [
+            k1 * (1 - b + b * (length / avgdl if avgdl else 0.0))
+            for length in doc_lengths
+        ]
+
+    @staticmethod
+    def build_postings(documents):
+        """Lista de postings (doc_id, tf) por termo e tamanho de cada documento"""
+        postings = {}
+        doc_lengths = []
+        for doc_id, document in enumerate(documents):
+            frequencies = {}
+            tokens = tokenize(document)
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for term, tf in frequencies.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+            doc_lengths.append(len(tokens))
+        return postings, doc_lengths
+
+    def __len__(self):
+        return len(self.documents)
+
+    def query_terms(self, query):
+        """Termos distintos da pergunta (str) ou pesos já expandidos (dict termo -> peso)"""
+        if isinstance(query, dict):
+            return query
+        return {term: 1.0 for term in set(tokenize(query))}
+
+    def search(self, query, top_k=None):
+        """
+        Pontua os documentos que contêm algum termo da pergunta
+
+        Args:
+            query: Texto da pergunta ou dict termo -> peso
+            top_k: Quantidade de resultados (None retorna todos os documentos com match)
+
+        Returns:
+            Lista de (doc_id, score) em ordem decrescente de score
+        """
+        scores = {}
+        k1_plus_1 = self.k1 + 1
+        for term, weight in self.query_terms(query).items():
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term] * weight
+            for doc_id, tf in plist:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * k1_plus_1 / (tf + self.length_norm[doc_id])
+
+        if top_k is None:
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+@lru_cache(maxsize=8)
+def get_chunk_retriever(full_text, chunk_size, overlap):
+    """Retriever compartilhado por corpus e parâmetros de chunking (construído uma única vez)"""
+    retriever = BM25Retriever(split_chunks(full_text, chunk_size, overlap))
+    logger.info(f"Índice BM25 construído: {len(retriever)} chunks, {len(retriever.postings)} termos")
+    return retriever
@@ -0,0 +1,163 @@
+"""
+Circuit breaker por modelo remoto (modelo + chave de API)
+- closed: chamadas passam; as últimas `window` são observadas
+- open: taxa de chamadas ruins (erro ou mais lentas que slow_call_ms) passou do limite;
+  o modelo é pulado na hora durante open_seconds
+- half-open: depois do intervalo, uma chamada de teste decide entre fechar e reabrir
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_WINDOW = int(os.environ.get("BREAKER_WINDOW", 20))
+DEFAULT_MIN_CALLS = int(os.environ.get("BREAKER_MIN_CALLS", 5))
+DEFAULT_FAILURE_RATE = float(os.environ.get("BREAKER_FAILURE_RATE", 0.5))
+DEFAULT_SLOW_CALL_MS = float(os.environ.get("BREAKER_SLOW_CALL_MS", 20000))
+DEFAULT_OPEN_SECONDS = float(os.environ.get("BREAKER_OPEN_SECONDS", 30))
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada porque o circuito do modelo está aberto"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, window=DEFAULT_WINDOW, min_calls=DEFAULT_MIN_CALLS, failure_rate=DEFAULT_FAILURE_RATE,
+                 slow_call_ms=DEFAULT_SLOW_CALL_MS, open_seconds=DEFAULT_OPEN_SECONDS, half_open_probes=1):
+        """
+        Args:
+            name: Nome do modelo (aparece no health check)
+            window: Quantas chamadas recentes entram na taxa
+            min_calls: Mínimo de chamadas na janela antes de abrir o circuito
+            failure_rate: Fração de chamadas ruins (erro ou lentas) que abre o circuito
+            slow_call_ms: Latência a partir da qual uma chamada bem-sucedida conta como ruim
+            open_seconds: Tempo aberto antes da chamada de teste
+            half_open_probes: Chamadas de teste simultâneas no estado half-open
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window)  # (ruim, latência em ms)
+        self.opened_at = None
+        self.probes = 0
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.calls = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _refresh(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self.probes = 0
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(f"Circuito aberto para {self.name} por {self.open_seconds:g}s")
+
+    def available(self):
+        """Se uma chamada seria aceita agora (sem reservar a chamada de teste)"""
+        with self._lock:
+            self._refresh()
+            return self.state == CLOSED or (self.state == HALF_OPEN and self.probes < self.half_open_probes)
+
+    def allow(self):
+        """Reserva a chamada: True se pode seguir; no half-open, conta como chamada de teste"""
+        with self._lock:
+            self._refresh()
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self.probes < self.half_open_probes:
+                self.probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success, latency_ms):
+        """Registra o desfecho de uma chamada autorizada por allow()"""
+        bad = not success or latency_ms > self.slow_call_ms
+        with self._lock:
+            self.calls += 1
+            self.outcomes.append((bad, latency_ms))
+            if self.state == HALF_OPEN:
+                if bad:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                    logger.info(f"Circuito fechado para {self.name}")
+            elif self.state == CLOSED and len(self.outcomes) >= self.min_calls:
+                if sum(outcome[0] for outcome in self.outcomes) / len(self.outcomes) >= self.failure_rate:
+                    self._open()
+
+    def call(self, fn):
+        """Executa fn() sob o circuito; resultado vazio ou exceção contam como falha"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuito aberto para {self.name}")
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            self.record(False, 1000 * (time.perf_counter() - start))
+            raise
+        self.record(bool(result), 1000 * (time.perf_counter() - start))
+        return result
+
+    async def acall(self, fn):
+        """Versão assíncrona de call(): fn() devolve uma corrotina; cancelamento não conta como desfecho"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuito aberto para {self.name}")
+        start = time.perf_counter()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception:
+            self.record(False, 1000 * (time.perf_counter() - start))
+            raise
+        self.record(bool(result), 1000 * (time.perf_counter() - start))
+        return result
+
+    def release(self):
+        """Devolve a reserva de allow() de uma chamada abandonada sem desfecho"""
+        with self._lock:
+            if self.state == HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def report(self):
+        """Estado e métricas recentes para o health check"""
+        with self._lock:
+            self._refresh()
+            recent = list(self.outcomes)
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(self.open_seconds - (time.monotonic() - self.opened_at), 0.0), 1)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "recent_calls": len(recent),
+                "recent_failure_rate": round(sum(bad for bad, _ in recent) / len(recent), 2) if recent else 0.0,
+                "recent_avg_latency_ms": round(sum(ms for _, ms in recent) / len(recent), 1) if recent else None,
+                "retry_in_s": retry_in,
+                "calls": self.calls,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened
+            }
@@ -0,0 +1,158 @@
+"""
+Armazenamento em memória de corpora por chave (ex.: por doença)
+Texto, chunks e índice são construídos sob demanda na primeira pergunta e
+reconstruídos apenas quando o arquivo de origem muda (mtime/tamanho + hash)
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Hash SHA-256 do conteúdo do arquivo"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CorpusEntry:
+    """Corpus carregado: texto extraído, chunks e índice de busca"""
+
+    __slots__ = ("path", "text", "chunks", "index", "mtime", "size",
+                 "content_hash", "loaded_at", "load_seconds", "term_matrix")
+
+    def __init__(self, path, text, chunks, index, mtime, size, content_hash, load_seconds):
+        self.path = path
+        self.text = text
+        self.chunks = chunks
+        self.index = index
+        self.mtime = mtime
+        self.size = size
+        self.content_hash = content_hash
+        self.loaded_at = datetime.now().isoformat()
+        self.load_seconds = load_seconds
+        # Matriz chunk x termo, construída sob demanda por quem faz busca por palavras-chave
+        self.term_matrix = None
+
+
+class CorpusStore:
+    def __init__(self, build_fn):
+        """
+        Args:
+            build_fn: Função build_fn(path, previous) -> (text, chunks, index);
+                previous é a versão anterior do corpus (ou None) para reaproveitamento incremental
+        """
+        self.build_fn = build_fn
+        self.entries = {}
+        self.listeners = []
+        self.errors = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _is_fresh(self, entry, stat):
+        """Verifica se a entrada ainda corresponde ao arquivo em disco"""
+        if entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+            return True
+        # mtime mudou: só reconstrói se o conteúdo realmente mudou
+        if file_sha256(entry.path) == entry.content_hash:
+            entry.mtime = stat.st_mtime
+            entry.size = stat.st_size
+            return True
+        return False
+
+    def get(self, key, path):
+        """
+        Retorna o corpus da chave, construindo ou reconstruindo se necessário
+
+        Returns:
+            CorpusEntry ou None se o arquivo não existir / falhar ao processar
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.entries.pop(key, None)
+            return None
+
+        entry = self.entries.get(key)
+        if entry is not None and entry.path == path and self._is_fresh(entry, stat):
+            return entry
+
+        with self._lock_for(key):
+            # Outra thread pode ter construído enquanto esperávamos
+            entry = self.entries.get(key)
+            if entry is not None and entry.path == path and self._is_fresh(entry, stat):
+                return entry
+
+            previous = self.entries.get(key)
+            start = time.perf_counter()
+            try:
+                content_hash = file_sha256(path)
+                text, chunks, index = self.build_fn(path, previous)
+            except Exception as e:
+                logger.error(f"Erro ao construir corpus '{key}' ({path}): {e}")
+                self.errors[key] = str(e)
+                return previous
+
+            entry = CorpusEntry(path, text, chunks, index, stat.st_mtime, stat.st_size,
+                                content_hash, time.perf_counter() - start)
+            # Troca atômica: requisições em andamento continuam com a versão anterior
+            self.entries[key] = entry
+            self.errors.pop(key, None)
+            logger.info(f"Corpus '{key}' carregado: {len(chunks)} chunks em {entry.load_seconds:.2f}s")
+
+        if previous is not None:
+            for listener in self.listeners:
+                try:
+                    listener(key, previous, entry)
+                except Exception as e:
+                    logger.error(f"Erro ao notificar troca do corpus '{key}': {e}")
+        return entry
+
+    def version(self, key, path):
+        """Hash do corpus em memória se ainda corresponde ao arquivo; None se não carregado ou desatualizado"""
+        entry = self.entries.get(key)
+        if entry is None or entry.path != path:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if entry.mtime != stat.st_mtime or entry.size != stat.st_size:
+            return None
+        return entry.content_hash
+
+    def peek(self, key):
+        """Versão atual do corpus sem verificar o arquivo (caminho quente das requisições)"""
+        return self.entries.get(key)
+
+    def status(self, key, path):
+        """Estado de carregamento do corpus para relatórios (ex.: /api/diseases)"""
+        if not os.path.exists(path):
+            return {"state": "missing"}
+        if key in self.errors:
+            return {"state": "error", "error": self.errors[key]}
+        entry = self.entries.get(key)
+        if entry is None:
+            return {"state": "not_loaded"}
+        stat = os.stat(path)
+        stale = entry.mtime != stat.st_mtime or entry.size != stat.st_size
+        return {
+            "state": "stale" if stale else "loaded",
+            "chunks": len(entry.chunks),
+            "characters": len(entry.text),
+            "content_hash": entry.content_hash[:12],
+            "loaded_at": entry.loaded_at,
+            "load_seconds": round(entry.load_seconds, 3)
+        }
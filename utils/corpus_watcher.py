@@ -0,0 +1,93 @@
+"""
+Observador de arquivos do corpus (Markdown/PDF)
+Detecta mudanças por mtime/tamanho confirmadas por hash e dispara a reindexação
+incremental sem reiniciar o processo (sem recarregar os modelos)
+
+A thread de verificação é por processo: sob gunicorn com preload_app, start_all() no hook
+post_worker_init recria em cada worker a thread dos observadores iniciados no master
+"""
+
+import os
+import logging
+import threading
+
+from utils.corpus_store import file_sha256
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_INTERVAL = float(os.environ.get("CORPUS_WATCH_INTERVAL", 5))
+
+# Observadores iniciados no processo (start_all os reinicia depois do fork)
+_started = []
+
+class CorpusWatcher:
+    def __init__(self, sources, on_change, interval=DEFAULT_WATCH_INTERVAL):
+        """
+        Args:
+            sources: Dict chave -> caminho do arquivo observado
+            on_change: Callback on_change(key, path) chamado quando o conteúdo muda
+            interval: Intervalo de verificação em segundos
+        """
+        self.sources = dict(sources)
+        self.on_change = on_change
+        self.interval = interval
+        self._state = {key: self._fingerprint(path) for key, path in self.sources.items()}
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    @staticmethod
+    def _fingerprint(path, previous=None):
+        """(mtime, tamanho, hash); o hash só é recalculado se mtime/tamanho mudarem"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if previous and (stat.st_mtime, stat.st_size) == previous[:2]:
+            return previous
+        return (stat.st_mtime, stat.st_size, file_sha256(path))
+
+    def check_now(self):
+        """Verifica todas as fontes uma vez; retorna as chaves cujo conteúdo mudou"""
+        changed = []
+        for key, path in self.sources.items():
+            previous = self._state.get(key)
+            current = self._fingerprint(path, previous)
+            if current is None or current is previous:
+                continue
+            self._state[key] = current
+            if previous and current[2] == previous[2]:
+                continue
+            logger.info(f"Mudança detectada no corpus '{key}': {path}")
+            changed.append(key)
+            try:
+                self.on_change(key, path)
+            except Exception as e:
+                logger.error(f"Erro ao reindexar corpus '{key}': {e}")
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check_now()
+
+    def start(self):
+        """
+        Inicia a verificação periódica em uma thread daemon (interval <= 0 desativa), uma vez
+        por processo: num filho de fork a thread do pai não existe e é recriada
+        """
+        if self.interval > 0 and self._pid != os.getpid() and not self._stop.is_set():
+            if self._pid is None:
+                _started.append(self)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="corpus-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def start_all():
+    """Recria neste processo as threads dos observadores iniciados antes do fork (hook post_worker_init)"""
+    for watcher in _started:
+        watcher.start()
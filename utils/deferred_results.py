@@ -0,0 +1,123 @@
+"""
+Execução com orçamento de latência
+A função roda em um executor; se terminar dentro do orçamento o resultado volta na hora,
+senão o chamador segue sem ele e recebe um ticket. O resultado atrasado fica em cache
+(a próxima chamada com a mesma chave o recebe pronto) e pode ser consultado pelo ticket.
+A fila do executor é limitada: com max_pending execuções em andamento ou na fila, chamadas
+com chaves novas são dispensadas na hora ("skipped") em vez de acumular trabalho atrasado.
+"""
+
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 256
+DEFAULT_MAX_PENDING = 2
+
+
+class DeferredResults:
+    def __init__(self, max_workers=1, max_size=DEFAULT_MAX_SIZE, max_pending=DEFAULT_MAX_PENDING, name="deferred"):
+        """
+        Args:
+            max_workers: Execuções simultâneas (1 para modelos que já ocupam todos os núcleos)
+            max_size: Máximo de resultados e tickets guardados (LRU)
+            max_pending: Execuções em andamento + na fila; acima disso novas chaves são dispensadas
+            name: Prefixo das threads do executor
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.max_size = max_size
+        self.max_pending = max(max_pending, max_workers)
+        self.results = OrderedDict()
+        self.pending = {}
+        self.tickets = OrderedDict()
+        self._lock = threading.RLock()
+
+        # Métricas
+        self.cached = 0
+        self.completed = 0
+        self.deferred = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def run(self, key, fn, budget_ms):
+        """
+        Executa fn() com orçamento de latência (chamadas com a mesma chave compartilham a execução)
+
+        Returns:
+            (status, resultado, ticket): status "cached" ou "completed" trazem o resultado;
+            "deferred" traz o ticket para consulta posterior; "failed" e "skipped" (fila cheia)
+            não trazem nada
+        """
+        with self._lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                self.cached += 1
+                return "cached", self.results[key], None
+            future = self.pending.get(key)
+            if future is None:
+                if len(self.pending) >= self.max_pending:
+                    self.skipped += 1
+                    return "skipped", None, None
+                future = self.executor.submit(fn)
+                self.pending[key] = future
+                future.add_done_callback(lambda done, key=key: self._store(key, done))
+
+        try:
+            result = future.result(timeout=budget_ms / 1000.0)
+        except FutureTimeout:
+            ticket = uuid.uuid4().hex
+            with self._lock:
+                self.tickets[ticket] = key
+                while len(self.tickets) > self.max_size:
+                    self.tickets.popitem(last=False)
+                self.deferred += 1
+            return "deferred", None, ticket
+        except Exception as e:
+            logger.error(f"Erro na execução adiada: {e}")
+            with self._lock:
+                self.failed += 1
+            return "failed", None, None
+
+        with self._lock:
+            self.completed += 1
+        return "completed", result, None
+
+    def _store(self, key, future):
+        with self._lock:
+            self.pending.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self.results[key] = future.result()
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+
+    def poll(self, ticket):
+        """Situação de um resultado adiado: ("ready", resultado), ("pending" | "failed" | "unknown", None)"""
+        with self._lock:
+            key = self.tickets.get(ticket)
+            if key is None:
+                return "unknown", None
+            if key in self.results:
+                return "ready", self.results[key]
+            if key in self.pending:
+                return "pending", None
+            return "failed", None
+
+    def stats(self):
+        """Métricas para o health check"""
+        with self._lock:
+            return {
+                "cached": self.cached,
+                "completed": self.completed,
+                "deferred": self.deferred,
+                "failed": self.failed,
+                "skipped": self.skipped,
+                "pending": len(self.pending),
+                "max_pending": self.max_pending,
+                "stored_results": len(self.results)
+            }
@@ -0,0 +1,184 @@
+"""
+Índice de embeddings dos chunks do corpus
+Calcula os vetores uma única vez por corpus e persiste em disco para reuso entre reinícios
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+from utils.ann_index import IVFIndex, DEFAULT_EXACT_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", os.path.join("cache", "embeddings"))
+
+# Linhas convertidas para float32 por vez quando os embeddings estão em float16 (memmap)
+SIMILARITY_BLOCK_ROWS = 4096
+
+
+def corpus_hash(chunks, model_name):
+    """Hash de conteúdo do corpus (texto e fronteiras dos chunks + modelo de embedding)"""
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for chunk in chunks:
+        digest.update(b"\x00")
+        digest.update(chunk.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cache_prefix(model_name, source):
+    """Prefixo dos arquivos do cache de um corpus (fonte + modelo); versões antigas compartilham o prefixo"""
+    return re.sub(r"[^\w.-]+", "_", f"{model_name}--{source}") + "--"
+
+
+def prune_cache(cache_dir, prefix, keep_path):
+    """Remove as versões antigas do mesmo corpus e modelo, mantendo keep_path"""
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and name.endswith(".npy") and path != keep_path:
+            try:
+                os.remove(path)
+                logger.info(f"Versão antiga do índice de embeddings removida: {path}")
+            except OSError as e:
+                logger.warning(f"Não foi possível remover {path}: {e}")
+
+
+def normalize_rows(matrix):
+    """Normaliza as linhas para norma L2 unitária (cosseno vira produto interno)"""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        norm = np.linalg.norm(matrix)
+        return matrix / norm if norm > 0 else matrix
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, top_k):
+    """Índices dos top_k maiores scores em ordem decrescente (argpartition + ordenação parcial)"""
+    n = len(scores)
+    if n == 0 or top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k >= n:
+        return np.argsort(scores)[::-1]
+    candidates = np.argpartition(scores, n - top_k)[n - top_k:]
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+class EmbeddingIndex:
+    """Matriz contígua de embeddings normalizados, uma linha por chunk"""
+
+    def __init__(self, embeddings, corpus_hash, model_name):
+        self.embeddings = embeddings
+        self.corpus_hash = corpus_hash
+        self.model_name = model_name
+        self._ann = None
+        self._ann_lock = threading.Lock()
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    @classmethod
+    def build(cls, chunks, embedding_model, model_name, cache_dir=DEFAULT_CACHE_DIR, previous=None, source="corpus"):
+        """
+        Constrói (ou carrega do disco) o índice para a lista de chunks
+
+        Args:
+            chunks: Lista de textos do corpus
+            embedding_model: Modelo com método encode (SentenceTransformer)
+            model_name: Nome do modelo, parte da chave do cache
+            cache_dir: Diretório de persistência (None desativa)
+            previous: (chunks, EmbeddingIndex) da versão anterior; só chunks novos são recalculados
+            source: Identificação do corpus (ex.: nome do PDF); ao salvar, as versões antigas
+                do mesmo corpus e modelo são apagadas do cache
+
+        Returns:
+            EmbeddingIndex pronto para busca
+        """
+        chunks = list(chunks)
+        key = corpus_hash(chunks, model_name)
+        prefix = cache_prefix(model_name, source)
+        cache_path = os.path.join(cache_dir, f"{prefix}{key}.npy") if cache_dir else None
+
+        if cache_path and os.path.exists(cache_path):
+            try:
+                embeddings = np.load(cache_path)
+                if embeddings.shape[0] == len(chunks):
+                    logger.info(f"Índice de embeddings carregado do disco: {cache_path}")
+                    return cls(embeddings, key, model_name)
+                logger.warning(f"Índice em disco inconsistente, recalculando: {cache_path}")
+            except Exception as e:
+                logger.warning(f"Erro ao ler índice de embeddings ({cache_path}): {e}")
+
+        if not chunks:
+            embeddings = np.zeros((0, 0), dtype=np.float32)
+        elif previous is not None and len(previous[1]) and previous[1].model_name == model_name:
+            embeddings = cls._reuse_rows(chunks, embedding_model, *previous)
+        else:
+            embeddings = normalize_rows(embedding_model.encode(chunks))
+            logger.info(f"Índice de embeddings calculado: {len(chunks)} chunks")
+
+        if cache_path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as file:
+                    np.save(file, embeddings)
+                os.replace(tmp_path, cache_path)
+                prune_cache(cache_dir, prefix, cache_path)
+            except Exception as e:
+                logger.warning(f"Não foi possível persistir o índice de embeddings: {e}")
+
+        return cls(embeddings, key, model_name)
+
+    @staticmethod
+    def _reuse_rows(chunks, embedding_model, previous_chunks, previous_index):
+        """Copia as linhas dos chunks inalterados e calcula apenas os chunks novos"""
+        previous_rows = {chunk: row for row, chunk in enumerate(previous_chunks)}
+        embeddings = np.empty((len(chunks), previous_index.embeddings.shape[1]), dtype=np.float32)
+        missing = []
+        for row, chunk in enumerate(chunks):
+            previous_row = previous_rows.get(chunk)
+            if previous_row is None:
+                missing.append(row)
+            else:
+                embeddings[row] = previous_index.embeddings[previous_row]
+        if missing:
+            embeddings[missing] = normalize_rows(embedding_model.encode([chunks[row] for row in missing]))
+        logger.info(f"Índice de embeddings atualizado: {len(missing)} de {len(chunks)} chunks recalculados")
+        return embeddings
+
+    def similarities(self, query_embedding):
+        """Similaridade cosseno da pergunta com todos os chunks (um produto matriz-vetor)"""
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.float32)
+        query = normalize_rows(query_embedding)
+        if self.embeddings.dtype == np.float32:
+            return self.embeddings @ query
+        # float16 em disco: converte em blocos para não materializar a matriz inteira
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SIMILARITY_BLOCK_ROWS):
+            block = self.embeddings[start:start + SIMILARITY_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores
+
+    def ann_index(self):
+        """Índice IVF construído sob demanda na primeira busca em corpora grandes"""
+        if self._ann is None:
+            with self._ann_lock:
+                if self._ann is None:
+                    # Listas só com ids sobre a mesma matriz: nenhuma cópia dos embeddings
+                    self._ann = IVFIndex.over(self.embeddings)
+        return self._ann
+
+    def search(self, query_embedding, top_k=3):
+        """Retorna (índices, scores) dos top_k chunks mais similares (aproximado em corpora grandes)"""
+        if len(self) >= DEFAULT_EXACT_THRESHOLD:
+            return self.ann_index().search(normalize_rows(query_embedding), top_k)
+        scores = self.similarities(query_embedding)
+        indices = top_k_indices(scores, top_k)
+        return indices, scores[indices]
@@ -0,0 +1,286 @@
+"""
+Chamadas com hedging para uma cadeia de modelos remotos
+O primário começa na hora; cada secundário entra após hedge_delay segundos sem resposta
+(ou assim que todas as tentativas em andamento falharem). A primeira resposta válida vence;
+as tentativas que ainda não começaram são canceladas e as em andamento são abandonadas
+(o resultado delas é descartado). Latência e desfecho de cada tentativa ficam registrados.
+acall() faz o mesmo com corrotinas num event loop, onde as perdedoras são canceladas de fato.
+
+Dimensionamento do pool (call): uma tentativa abandonada segura a sua thread até terminar, então
+cada tentativa deve ter o próprio limite de tempo (timeouts do cliente HTTP). Cada chamada usa no
+máximo max_parallel threads; o pool comporta max_workers / max_parallel chamadas com hedging ao
+mesmo tempo. Com o pool cheio, o primário ainda entra (espera na fila do executor), mas nenhum
+secundário é disparado por atraso: o hedging não disputa threads com as chamadas seguintes.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGE_DELAY = float(os.environ.get("OPENROUTER_HEDGE_DELAY_S", 3))
+DEFAULT_DEADLINE = float(os.environ.get("OPENROUTER_DEADLINE_S", 60))
+DEFAULT_MAX_PARALLEL = int(os.environ.get("OPENROUTER_MAX_PARALLEL", 2))
+DEFAULT_MAX_WORKERS = int(os.environ.get("OPENROUTER_HEDGE_WORKERS", 16))
+
+
+def _run_attempt(fn, cancelled):
+    """Executa uma tentativa: (resultado ou None, segundos, erro)"""
+    if cancelled.is_set():
+        return None, 0.0, "cancelled"
+    start = time.perf_counter()
+    try:
+        return fn(), time.perf_counter() - start, None
+    except Exception as e:
+        return None, time.perf_counter() - start, str(e)
+
+
+def _discard(discard, value):
+    """Entrega o resultado de uma tentativa perdedora à função de descarte, sem deixar erro escapar"""
+    if discard is None or not value:
+        return
+    try:
+        discard(value)
+    except Exception as e:
+        logger.warning(f"Erro ao descartar resultado de tentativa perdedora: {e}")
+
+
+async def _run_attempt_async(fn):
+    """Executa uma tentativa assíncrona: (resultado ou None, segundos, erro)"""
+    start = time.perf_counter()
+    try:
+        return await fn(), time.perf_counter() - start, None
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return None, time.perf_counter() - start, str(e)
+
+
+class HedgedCaller:
+    def __init__(self, hedge_delay=DEFAULT_HEDGE_DELAY, deadline=DEFAULT_DEADLINE,
+                 max_parallel=DEFAULT_MAX_PARALLEL, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            hedge_delay: Segundos sem resposta antes de disparar a próxima tentativa
+            deadline: Tempo máximo total da chamada, somando todas as tentativas
+            max_parallel: Tentativas de uma mesma chamada em andamento ao mesmo tempo; as
+                seguintes só entram quando alguma falhar
+            max_workers: Threads para tentativas simultâneas de todas as chamadas (inclui as abandonadas)
+        """
+        self.hedge_delay = hedge_delay
+        self.deadline = deadline
+        self.max_parallel = max(max_parallel, 1)
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged")
+        # Tentativas no executor (em andamento, na fila ou abandonadas ainda rodando)
+        self.active_attempts = 0
+
+        # Métricas por tentativa (nome do modelo)
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.hedged_calls = 0
+        self.unanswered = 0
+        self.hedges_skipped = 0
+        self.per_attempt = {}
+
+    def _submit(self, fn, cancelled):
+        with self._stats_lock:
+            self.active_attempts += 1
+        future = self.executor.submit(_run_attempt, fn, cancelled)
+        future.add_done_callback(self._attempt_finished)
+        return future
+
+    def _attempt_finished(self, future):
+        with self._stats_lock:
+            self.active_attempts -= 1
+
+    def _pool_has_room(self):
+        """Há thread livre para um secundário (as abandonadas ainda contam)"""
+        with self._stats_lock:
+            if self.active_attempts < self.max_workers:
+                return True
+            self.hedges_skipped += 1
+            return False
+
+    def call(self, attempts, discard=None):
+        """
+        Args:
+            attempts: Lista ordenada de (nome, função sem argumentos); None ou vazio conta como falha
+            discard: Função chamada com o resultado de cada tentativa que respondeu mas perdeu,
+                inclusive as abandonadas que terminam depois (ex.: fechar um stream aberto)
+
+        Returns:
+            (resultado, nome de quem respondeu, registros por tentativa); resultado None se ninguém respondeu
+        """
+        started = time.perf_counter()
+        cancelled = threading.Event()
+        records = [{"name": name, "status": "not_started", "started_ms": None, "latency_ms": None}
+                   for name, _ in attempts]
+        running = {}
+        launched = 0
+        next_hedge = started
+        winner = None
+        result = None
+
+        while True:
+            now = time.perf_counter()
+            if launched < len(attempts):
+                # Sem nada em andamento a próxima entra sempre; por atraso, só com vaga na chamada e no pool
+                launch = not running
+                if running and now >= next_hedge and len(running) < self.max_parallel:
+                    launch = self._pool_has_room()
+                    if not launch:
+                        next_hedge = now + self.hedge_delay
+                if launch:
+                    records[launched]["status"] = "running"
+                    records[launched]["started_ms"] = round(1000 * (now - started), 1)
+                    running[self._submit(attempts[launched][1], cancelled)] = launched
+                    launched += 1
+                    next_hedge = now + self.hedge_delay
+            if not running:
+                break
+
+            remaining = started + self.deadline - now
+            if remaining <= 0:
+                break
+            timeout = remaining
+            if launched < len(attempts) and len(running) < self.max_parallel:
+                timeout = min(timeout, max(next_hedge - now, 0))
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index = running.pop(future)
+                value, seconds, error = future.result()
+                if self._settle(records[index], value, seconds, error, winner is None):
+                    winner, result = index, value
+                elif value:
+                    _discard(discard, value)
+            if winner is not None:
+                break
+
+        # Perdedores: as que não começaram são canceladas, as em andamento têm o resultado descartado
+        cancelled.set()
+        for future, index in running.items():
+            if not future.cancel() and discard is not None:
+                future.add_done_callback(lambda late: _discard(discard, late.result()[0]))
+            records[index]["status"] = "cancelled"
+
+        self._record(records, winner)
+        name = attempts[winner][0] if winner is not None else None
+        logger.info(f"Chamada com hedging: vencedor={name}, tentativas={records}")
+        return result, name, records
+
+    async def acall(self, attempts):
+        """
+        Versão assíncrona de call(): cada função devolve uma corrotina. Mesmo retorno e métricas;
+        as tentativas em andamento que perdem (ou quando quem chamou desiste) são canceladas
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        records = [{"name": name, "status": "not_started", "started_ms": None, "latency_ms": None}
+                   for name, _ in attempts]
+        running = {}
+        launched = 0
+        last_launch = started
+        winner = None
+        result = None
+
+        try:
+            while True:
+                now = loop.time()
+                can_hedge = len(running) < self.max_parallel and now - last_launch >= self.hedge_delay
+                if launched < len(attempts) and (not running or can_hedge):
+                    records[launched]["status"] = "running"
+                    records[launched]["started_ms"] = round(1000 * (now - started), 1)
+                    running[asyncio.ensure_future(_run_attempt_async(attempts[launched][1]))] = launched
+                    launched += 1
+                    last_launch = now
+                if not running:
+                    break
+
+                remaining = started + self.deadline - now
+                if remaining <= 0:
+                    break
+                timeout = remaining
+                if launched < len(attempts) and len(running) < self.max_parallel:
+                    timeout = min(timeout, max(last_launch + self.hedge_delay - now, 0))
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    index = running.pop(task)
+                    value, seconds, error = task.result()
+                    if self._settle(records[index], value, seconds, error, winner is None):
+                        winner, result = index, value
+                if winner is not None:
+                    break
+        finally:
+            for task in running:
+                task.cancel()
+
+        for index in running.values():
+            records[index]["status"] = "cancelled"
+
+        self._record(records, winner)
+        name = attempts[winner][0] if winner is not None else None
+        logger.info(f"Chamada assíncrona com hedging: vencedor={name}, tentativas={records}")
+        return result, name, records
+
+    @staticmethod
+    def _settle(record, value, seconds, error, can_win):
+        """Registra o desfecho de uma tentativa; True se ela é a vencedora"""
+        record["latency_ms"] = round(1000 * seconds, 1)
+        if value and can_win:
+            record["status"] = "won"
+            return True
+        record["status"] = "failed"
+        if error:
+            record["error"] = error
+        return False
+
+    def _record(self, records, winner):
+        with self._stats_lock:
+            self.calls += 1
+            self.hedged_calls += sum(1 for record in records if record["started_ms"] is not None) > 1
+            self.unanswered += winner is None
+            for record in records:
+                if record["started_ms"] is None:
+                    continue
+                stats = self.per_attempt.setdefault(
+                    record["name"], {"attempts": 0, "wins": 0, "failures": 0, "cancelled": 0, "total_ms": 0.0, "timed": 0}
+                )
+                stats["attempts"] += 1
+                stats["wins"] += record["status"] == "won"
+                stats["failures"] += record["status"] == "failed"
+                stats["cancelled"] += record["status"] == "cancelled"
+                if record["latency_ms"] is not None:
+                    stats["total_ms"] += record["latency_ms"]
+                    stats["timed"] += 1
+
+    def stats(self):
+        """Métricas de hedging e por modelo para o health check"""
+        with self._stats_lock:
+            return {
+                "hedge_delay_s": self.hedge_delay,
+                "deadline_s": self.deadline,
+                "max_parallel": self.max_parallel,
+                "max_workers": self.max_workers,
+                "active_attempts": self.active_attempts,
+                "calls": self.calls,
+                "hedged_calls": self.hedged_calls,
+                "hedges_skipped": self.hedges_skipped,
+                "unanswered": self.unanswered,
+                "models": {
+                    name: {
+                        "attempts": stats["attempts"],
+                        "wins": stats["wins"],
+                        "failures": stats["failures"],
+                        "cancelled": stats["cancelled"],
+                        "avg_latency_ms": round(stats["total_ms"] / stats["timed"], 1) if stats["timed"] else None
+                    }
+                    for name, stats in self.per_attempt.items()
+                }
+            }
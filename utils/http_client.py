@@ -0,0 +1,149 @@
+"""
+Cliente HTTP compartilhado para APIs externas (OpenRouter)
+Uma Session com pool de conexões keep-alive (sem novo handshake TCP+TLS por chamada),
+timeouts separados de conexão e leitura e novas tentativas com backoff exponencial
+com jitter em 429/5xx, respeitando o cabeçalho Retry-After.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 10))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+DEFAULT_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 60))
+DEFAULT_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 2))
+DEFAULT_BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", 0.5))
+DEFAULT_BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", 8))
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+def retry_after_seconds(response):
+    """Espera pedida pelo servidor no Retry-After (segundos ou data HTTP); None se ausente/inválido"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(attempt, base=DEFAULT_BACKOFF_BASE, maximum=DEFAULT_BACKOFF_MAX):
+    """Espera antes da nova tentativa: sorteada entre 0 e base * 2^tentativa, com teto"""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class HttpClient:
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX):
+        """
+        Args:
+            pool_size: Conexões mantidas abertas por host
+            connect_timeout: Segundos para estabelecer a conexão
+            read_timeout: Segundos de espera pela resposta
+            max_retries: Novas tentativas em 429/5xx e falhas de conexão
+            backoff_base: Espera base do backoff exponencial (sorteada entre 0 e base * 2^tentativa)
+            backoff_max: Teto da espera; um Retry-After maior que isso encerra as tentativas
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        # As novas tentativas são feitas aqui (com Retry-After e métricas), não pelo urllib3
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        # Métricas
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.retry_after_waits = 0
+        self.retry_after_exceeded = 0
+
+    def _backoff(self, attempt):
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max)
+
+    def request(self, method, url, **kwargs):
+        """Mesma interface do requests; timeout padrão (conexão, leitura) e novas tentativas"""
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        attempt = 0
+        while True:
+            with self._stats_lock:
+                self.requests += 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                # Inclui o timeout de conexão; timeout de leitura não é repetido (o tempo já foi gasto)
+                if attempt >= self.max_retries:
+                    raise
+                delay, reason = self._backoff(attempt), f"falha de conexão: {e}"
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = retry_after_seconds(response)
+                if delay is not None and delay > self.backoff_max:
+                    # O servidor pediu mais tempo do que vale esperar: devolve o erro ao chamador
+                    with self._stats_lock:
+                        self.retry_after_exceeded += 1
+                    return response
+                if delay is None:
+                    delay = self._backoff(attempt)
+                else:
+                    with self._stats_lock:
+                        self.retry_after_waits += 1
+                reason = f"HTTP {response.status_code}"
+                response.close()
+
+            attempt += 1
+            with self._stats_lock:
+                self.retries += 1
+            logger.warning(f"{method} {url}: {reason}; nova tentativa {attempt}/{self.max_retries} em {delay:.2f}s")
+            time.sleep(delay)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def connections_opened(self):
+        """Conexões TCP abertas pelo pool desde o início (cada uma é um handshake)"""
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def stats(self):
+        """Métricas de pool e novas tentativas para o health check"""
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "retry_after_waits": self.retry_after_waits,
+                "retry_after_exceeded": self.retry_after_exceeded,
+                "connections_opened": self.connections_opened()
+            }
+
+
+# Cliente compartilhado do processo
+http_client = HttpClient()
@@ -0,0 +1,189 @@
+"""
+Artefato de índice em disco gerado por build_index.py
+Guarda texto dos chunks (offsets no corpus e caminho de seção), embeddings float16 e postings BM25.
+Os arrays são abertos com numpy.memmap, então vários workers do gunicorn
+compartilham a mesma cópia no page cache em vez de cada um recalcular e guardar a sua.
+"""
+
+import os
+import json
+import logging
+
+import numpy as np
+
+from utils.bm25 import BM25Retriever
+from utils.corpus_store import file_sha256
+from utils.embedding_index import EmbeddingIndex
+from utils.markdown_chunker import ChunkedText, chunk_markdown
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+DEFAULT_INDEX_DIR = os.environ.get("INDEX_DIR", "index")
+
+# Extração e divisão compartilhadas por build_index.py e pelos chatbots: o índice em disco só é
+# usado se foi gerado com os mesmos parâmetros (ambos ficam registrados no manifest)
+CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", 1500))
+EXTRACTOR_VERSION = "pypdf2-pages-v1"
+
+
+def read_source(path):
+    """Texto de um arquivo Markdown ou PDF (páginas do PDF unidas por quebra de linha)"""
+    if path.lower().endswith(".pdf"):
+        import PyPDF2
+        with open(path, "rb") as file:
+            reader = PyPDF2.PdfReader(file)
+            return "\n".join((page.extract_text() or "") for page in reader.pages).strip()
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def chunk_source(text, chunk_size=CHUNK_SIZE):
+    """Chunks de uma fonte por seção/parágrafo (offsets sobre o texto, sem sobreposição)"""
+    return chunk_markdown(text, chunk_size)
+
+
+class MemmapPostingList:
+    """Lista de postings de um termo: fatias dos arrays mapeados em memória"""
+
+    __slots__ = ("docs", "tfs")
+
+    def __init__(self, docs, tfs):
+        self.docs = docs
+        self.tfs = tfs
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __iter__(self):
+        return zip(self.docs.tolist(), self.tfs.tolist())
+
+
+class MemmapPostings:
+    """Mapeamento termo -> postings sobre arrays CSR (offsets, doc_ids, tfs) em disco"""
+
+    def __init__(self, terms, offsets, doc_ids, tfs):
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+
+    def __len__(self):
+        return len(self.term_ids)
+
+    def get(self, term, default=None):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return default
+        start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+        return MemmapPostingList(self.doc_ids[start:end], self.tfs[start:end])
+
+    def items(self):
+        for term in self.term_ids:
+            yield term, self.get(term)
+
+
+class IndexArtifact:
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.sources = manifest["sources"]
+
+        with open(os.path.join(path, "corpus.txt"), "r", encoding="utf-8", newline="") as file:
+            self.corpus = file.read()
+        self.spans = np.load(os.path.join(path, "spans.npy"), mmap_mode="r")
+        with open(os.path.join(path, "sections.json"), "r", encoding="utf-8") as file:
+            self.sections = [tuple(section) for section in json.load(file)]
+        self.embeddings = None
+        if manifest.get("embedding_model"):
+            self.embeddings = np.load(os.path.join(path, "embeddings.f16.npy"), mmap_mode="r")
+
+        with open(os.path.join(path, "terms.json"), "r", encoding="utf-8") as file:
+            terms = json.load(file)
+        self.postings = MemmapPostings(
+            terms,
+            np.load(os.path.join(path, "postings_offsets.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "postings_docs.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "postings_tfs.npy"), mmap_mode="r"),
+        )
+        self.doc_lengths = np.load(os.path.join(path, "doc_lengths.npy")).tolist()
+
+    @classmethod
+    def open(cls, index_dir=DEFAULT_INDEX_DIR):
+        """
+        Abre a versão atual do índice (apontada por index_dir/current.json)
+
+        Returns:
+            IndexArtifact ou None se não existir / for de outra versão de formato
+        """
+        pointer = os.path.join(index_dir, "current.json")
+        if not os.path.exists(pointer):
+            return None
+        try:
+            with open(pointer, "r", encoding="utf-8") as file:
+                version_dir = json.load(file)["version"]
+            path = os.path.join(index_dir, version_dir)
+            with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+            if manifest.get("format_version") != FORMAT_VERSION:
+                logger.warning(f"Índice em {path} tem formato {manifest.get('format_version')}, esperado {FORMAT_VERSION}")
+                return None
+            artifact = cls(path, manifest)
+            logger.info(f"Índice em disco aberto: {path} ({manifest['n_chunks']} chunks)")
+            return artifact
+        except Exception as e:
+            logger.error(f"Erro ao abrir índice em disco ({index_dir}): {e}")
+            return None
+
+    def chunk_text(self, chunk_id):
+        start, end = self.spans[chunk_id]
+        return self.corpus[start:end]
+
+    def chunks(self, start=0, end=None):
+        """Chunks [start, end) como offsets sobre o corpus em memória (sem copiar o texto)"""
+        end = len(self.spans) if end is None else end
+        return ChunkedText(self.corpus, self.spans[start:end], self.sections[start:end])
+
+    def bm25_retriever(self):
+        """Retriever BM25 sobre os postings mapeados (todo o corpus)"""
+        return BM25Retriever(self.chunks(), postings=self.postings, doc_lengths=self.doc_lengths)
+
+    def find_source(self, source_path):
+        """Metadados da fonte, se o arquivo ainda corresponde ao que foi indexado"""
+        normalized = os.path.normpath(source_path)
+        for source in self.sources:
+            if os.path.normpath(source["path"]) != normalized:
+                continue
+            if not os.path.exists(source_path) or file_sha256(source_path) != source["sha256"]:
+                logger.warning(f"Fonte alterada desde a indexação, ignorando índice em disco: {source_path}")
+                return None
+            return source
+        return None
+
+    def matches_runtime(self, chunk_size=CHUNK_SIZE):
+        """O índice foi gerado com a mesma extração e o mesmo tamanho de chunk usados em tempo de execução"""
+        built_with = (self.manifest.get("extractor"), self.manifest.get("chunk_size"))
+        if built_with != (EXTRACTOR_VERSION, chunk_size):
+            logger.warning(f"Índice em {self.path} gerado com extração/chunks {built_with}, "
+                           f"esperado {(EXTRACTOR_VERSION, chunk_size)}: ignorando índice em disco")
+            return False
+        return True
+
+    def source_corpus(self, source_path, model_name, chunk_size=CHUNK_SIZE):
+        """
+        Texto, chunks e índice de embeddings de uma fonte, sem recalcular nada
+
+        Returns:
+            (text, chunks, EmbeddingIndex) ou None se a fonte não estiver no índice
+            ou se o índice foi gerado com outra extração/tamanho de chunk
+        """
+        if not self.matches_runtime(chunk_size):
+            return None
+        source = self.find_source(source_path)
+        if source is None or self.embeddings is None or self.manifest["embedding_model"] != model_name:
+            return None
+        first, last = source["chunks"]
+        text = self.corpus[source["start"]:source["end"]]
+        # Fatia contígua do memmap: nenhuma cópia dos embeddings por worker
+        index = EmbeddingIndex(self.embeddings[first:last], source["sha256"], model_name)
+        return text, self.chunks(first, last), index
@@ -0,0 +1,133 @@
+"""
+Divisão de Markdown orientada à estrutura de títulos
+Uma única passada linear identifica a hierarquia (#, ##, ###...) e gera os chunks
+como offsets (início, fim) sobre um único buffer de texto, sem cópias sobrepostas.
+Os chunks nunca atravessam seções, então cada um carrega o caminho da sua seção.
+"""
+
+import re
+
+HEADING_PATTERN = re.compile(r'(#{1,6})[ \t]+(.+?)[ \t#]*$')
+
+
+class ChunkedText:
+    """Sequência de chunks (offsets) sobre um texto compartilhado; se comporta como lista de str"""
+
+    __slots__ = ("text", "spans", "sections")
+
+    def __init__(self, text, spans, sections):
+        self.text = text
+        self.spans = spans
+        self.sections = sections
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        start, end = self.spans[i]
+        return self.text[start:end]
+
+    def __iter__(self):
+        for start, end in self.spans:
+            yield self.text[start:end]
+
+    def section_path(self, i):
+        """Caminho de títulos do chunk, ex.: ('ETAPA 02 – ORIENTAÇÕES...', 'INDICAÇÕES ...')"""
+        return self.sections[i]
+
+    def section_text(self, i):
+        """Seção inteira que contém o chunk i (todos os chunks contíguos da mesma seção)"""
+        first = last = i
+        while first > 0 and self.sections[first - 1] == self.sections[i]:
+            first -= 1
+        while last + 1 < len(self) and self.sections[last + 1] == self.sections[i]:
+            last += 1
+        return self.text[self.spans[first][0]:self.spans[last][1]]
+
+
+def _split_long_block(text, start, end, max_chars, spans, path, sections):
+    """Divide um bloco maior que max_chars em frase > quebra de linha > espaço"""
+    while end - start > max_chars:
+        limit = start + max_chars
+        cut = -1
+        for separator in ('. ', '\n', ' '):
+            position = text.rfind(separator, start + max_chars // 2, limit)
+            if position != -1:
+                cut = position + len(separator)
+                break
+        if cut == -1:
+            cut = limit
+        spans.append((start, cut))
+        sections.append(path)
+        start = cut
+    if text[start:end].strip():
+        spans.append((start, end))
+        sections.append(path)
+
+
+def chunk_markdown(text, max_chars=1500):
+    """
+    Divide o Markdown em chunks que respeitam seções e parágrafos
+
+    Args:
+        text: Texto Markdown (ou texto simples, tratado como uma seção sem título)
+        max_chars: Tamanho máximo de cada chunk
+
+    Returns:
+        ChunkedText com offsets e caminho de seção de cada chunk
+    """
+    spans = []
+    sections = []
+    heading_stack = []
+    path = ()
+
+    chunk_start = None      # início do chunk em construção
+    paragraph_end = None    # fim do último parágrafo completo dentro do chunk
+    has_body = False        # o chunk já tem texto além de títulos
+    position = 0
+    length = len(text)
+
+    def flush(end):
+        nonlocal chunk_start, paragraph_end, has_body
+        if chunk_start is not None and text[chunk_start:end].strip():
+            _split_long_block(text, chunk_start, end, max_chars, spans, path, sections)
+        chunk_start = None
+        paragraph_end = None
+        has_body = False
+
+    while position < length:
+        line_end = text.find('\n', position)
+        line_end = length if line_end == -1 else line_end + 1
+        line = text[position:line_end]
+        stripped = line.strip()
+
+        match = HEADING_PATTERN.match(stripped) if stripped.startswith('#') else None
+        if match:
+            # Novo título: fecha o chunk atual (títulos sem texto seguem junto com o próximo)
+            if has_body:
+                flush(position)
+            level = len(match.group(1))
+            while heading_stack and heading_stack[-1][0] >= level:
+                heading_stack.pop()
+            heading_stack.append((level, match.group(2)))
+            path = tuple(title for _, title in heading_stack)
+            if chunk_start is None:
+                chunk_start = position
+        elif not stripped:
+            # Só conta como ponto de corte depois de algum texto: cortar antes deixaria o título sozinho
+            if has_body:
+                paragraph_end = line_end
+        else:
+            if chunk_start is None:
+                chunk_start = position
+            elif line_end - chunk_start > max_chars and paragraph_end is not None and has_body:
+                # Excedeu o limite: corta no último parágrafo completo
+                flush(paragraph_end)
+                chunk_start = position
+            has_body = True
+        position = line_end
+
+    flush(length)
+    return ChunkedText(text, spans, sections)
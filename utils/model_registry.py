@@ -0,0 +1,152 @@
+"""
+Registro de modelos do processo
+Cada modelo (tipo + nome + opções) é carregado uma única vez, sob demanda, e
+compartilhado por todos os pontos de entrada (app.py, backend/app.py, functions/api.py...),
+com contagem de referências e relatório de memória por modelo
+"""
+
+import time
+import logging
+import threading
+from types import SimpleNamespace
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _load_qa(name, backend=None):
+    """Pipeline de QA (backend por QA_BACKEND) com motor em lote e micro-batching"""
+    from utils.qa_backends import DEFAULT_QA_BACKEND, load_qa_pipeline
+    from utils.qa_engine import QAEngine
+    from utils.qa_batcher import QABatcher
+    return QABatcher(QAEngine(load_qa_pipeline(name, backend or DEFAULT_QA_BACKEND)))
+
+
+def _load_embedding(name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+def _load_text_generation(name, **options):
+    import torch
+    from transformers import pipeline
+    return pipeline("text-generation", model=name, tokenizer=name,
+                    device=0 if torch.cuda.is_available() else -1, **options)
+
+
+def model_size_mb(model):
+    """Memória dos pesos em MB (módulos torch, pipelines e o QABatcher/QAEngine que os envolvem)"""
+    from utils.qa_backends import model_size_mb as weights_mb
+    if hasattr(model, "parameters"):
+        model = SimpleNamespace(model=model)
+    if not hasattr(model, "model"):
+        return None
+    size = weights_mb(model)
+    return round(size, 1) if size is not None else None
+
+
+def warm_up(kind, model):
+    """Uma inferência curta logo após a carga, para a primeira requisição não pagar a inicialização"""
+    if kind == "qa":
+        from utils.qa_backends import CHECK_CONTEXT, CHECK_QUESTIONS
+        model(question=CHECK_QUESTIONS[0], context=CHECK_CONTEXT)
+    elif kind == "embedding":
+        model.encode(["aquecimento do modelo"])
+    elif kind == "text-generation":
+        model("Olá", max_new_tokens=1)
+
+
+class ModelHandle:
+    """Modelo carregado e quem o está usando"""
+
+    __slots__ = ("kind", "name", "options", "model", "refs", "loaded_at", "load_seconds", "size_mb")
+
+    def __init__(self, kind, name, options, model, load_seconds):
+        self.kind = kind
+        self.name = name
+        self.options = options
+        self.model = model
+        self.refs = 0
+        self.loaded_at = datetime.now().isoformat()
+        self.load_seconds = load_seconds
+        self.size_mb = model_size_mb(model)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self.loaders = {
+            "qa": _load_qa,
+            "embedding": _load_embedding,
+            "text-generation": _load_text_generation,
+        }
+        self.handles = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @staticmethod
+    def _key(kind, name, options):
+        return (kind, name, tuple(sorted(options.items())))
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def acquire(self, kind, name, **options):
+        """
+        Modelo compartilhado, carregado na primeira chamada
+
+        Args:
+            kind: "qa", "embedding" ou "text-generation" (ou um tipo registrado em loaders)
+            name: Nome do modelo no Hugging Face
+            **options: Opções do carregamento (fazem parte da identidade do modelo)
+
+        Returns:
+            O modelo (chamadas seguintes com os mesmos argumentos recebem o mesmo objeto)
+        """
+        key = self._key(kind, name, options)
+        with self._lock_for(key):
+            handle = self.handles.get(key)
+            if handle is None:
+                logger.info(f"Carregando modelo {kind}: {name}")
+                start = time.perf_counter()
+                model = self.loaders[kind](name, **options)
+                handle = ModelHandle(kind, name, options, model, time.perf_counter() - start)
+                self.handles[key] = handle
+                logger.info(f"Modelo {kind} {name} carregado em {handle.load_seconds:.1f}s")
+            handle.refs += 1
+            return handle.model
+
+    def release(self, kind, name, **options):
+        """Devolve uma referência; o modelo sai da memória quando ninguém mais o usa"""
+        key = self._key(kind, name, options)
+        with self._lock_for(key):
+            handle = self.handles.get(key)
+            if handle is None:
+                return
+            handle.refs -= 1
+            if handle.refs <= 0:
+                del self.handles[key]
+                logger.info(f"Modelo {kind} {name} descarregado")
+
+    def memory_report(self):
+        """Modelos carregados, referências, tempo de carga e memória dos pesos"""
+        handles = list(self.handles.values())
+        return {
+            "models": [
+                {
+                    "kind": handle.kind,
+                    "name": handle.name,
+                    "options": handle.options,
+                    "refs": handle.refs,
+                    "loaded_at": handle.loaded_at,
+                    "load_seconds": round(handle.load_seconds, 2),
+                    "size_mb": handle.size_mb
+                }
+                for handle in handles
+            ],
+            "total_mb": round(sum(handle.size_mb or 0 for handle in handles), 1)
+        }
+
+
+# Instância única do processo
+model_registry = ModelRegistry()
@@ -0,0 +1,208 @@
+"""
+Backends de inferência do modelo de question-answering
+- torch: modelo fp32 original (padrão)
+- quantized: quantização dinâmica int8 das camadas Linear (PyTorch, só CPU)
+- onnx: modelo exportado para ONNX Runtime via optimum (dependência opcional)
+
+Selecionado pela variável QA_BACKEND. Para comparar concordância e latência com o fp32:
+    python -m utils.qa_backends --model deepset/roberta-base-squad2 --backends quantized onnx
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+QA_BACKENDS = ("torch", "quantized", "onnx")
+DEFAULT_QA_BACKEND = os.environ.get("QA_BACKEND", "torch").lower()
+ONNX_CACHE_DIR = os.environ.get("ONNX_CACHE_DIR", os.path.join("cache", "onnx"))
+
+# Conjunto fixo para a verificação de concordância (trechos do roteiro de dispensação)
+CHECK_CONTEXT = (
+    "A poliquimioterapia única (PQT-U) é o esquema de tratamento da hanseníase recomendado pelo "
+    "Ministério da Saúde. É composta por rifampicina, clofazimina e dapsona. A dose mensal "
+    "supervisionada é administrada na unidade de saúde e inclui 600 mg de rifampicina e 300 mg de "
+    "clofazimina. A dose diária autoadministrada inclui 50 mg de clofazimina e 100 mg de dapsona. "
+    "O tratamento dos casos paucibacilares dura 6 meses e o dos multibacilares dura 12 meses. "
+    "A clofazimina pode causar coloração avermelhada da pele, que desaparece após o término do "
+    "tratamento. A dapsona pode causar anemia hemolítica, principalmente em pacientes com "
+    "deficiência de G6PD. Os medicamentos devem ser armazenados em local seco, longe da luz e do calor."
+)
+CHECK_QUESTIONS = [
+    "Quais medicamentos compõem a PQT-U?",
+    "Qual a dose mensal de rifampicina?",
+    "Quanto tempo dura o tratamento dos casos multibacilares?",
+    "Quanto tempo dura o tratamento paucibacilar?",
+    "Qual efeito a clofazimina pode causar na pele?",
+    "Qual efeito adverso a dapsona pode causar?",
+    "Qual a dose diária de dapsona?",
+    "Onde a dose supervisionada é administrada?",
+    "Como os medicamentos devem ser armazenados?",
+    "Quem recomenda a PQT-U?",
+]
+
+
+def _device():
+    import torch
+    return 0 if torch.cuda.is_available() else -1
+
+
+def _onnx_model_dir(model_name):
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__"))
+
+
+def _load_onnx_model(model_name):
+    """Exporta o modelo para ONNX na primeira vez e reutiliza a exportação do disco depois"""
+    from optimum.onnxruntime import ORTModelForQuestionAnswering
+
+    model_dir = _onnx_model_dir(model_name)
+    if os.path.exists(os.path.join(model_dir, "model.onnx")):
+        return ORTModelForQuestionAnswering.from_pretrained(model_dir)
+    logger.info(f"Exportando {model_name} para ONNX em {model_dir}...")
+    model = ORTModelForQuestionAnswering.from_pretrained(model_name, export=True)
+    model.save_pretrained(model_dir)
+    return model
+
+
+def load_qa_pipeline(model_name, backend=DEFAULT_QA_BACKEND):
+    """
+    Carrega o pipeline "question-answering" com o backend escolhido
+
+    Args:
+        model_name: Nome do modelo no Hugging Face
+        backend: "torch", "quantized" ou "onnx"; backends indisponíveis caem para "torch"
+
+    Returns:
+        Pipeline do transformers (mesma interface em todos os backends)
+    """
+    from transformers import pipeline, AutoTokenizer
+
+    if backend not in QA_BACKENDS:
+        logger.warning(f"QA_BACKEND desconhecido '{backend}', usando torch")
+        backend = "torch"
+
+    if backend == "onnx":
+        try:
+            model = _load_onnx_model(model_name)
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            logger.info(f"Modelo QA {model_name} carregado com ONNX Runtime")
+            return pipeline("question-answering", model=model, tokenizer=tokenizer)
+        except ImportError:
+            logger.warning("optimum[onnxruntime] não instalado, usando torch")
+            backend = "torch"
+        except Exception as e:
+            logger.error(f"Erro ao carregar modelo ONNX, usando torch: {e}")
+            backend = "torch"
+
+    if backend == "quantized":
+        import torch
+        from transformers import AutoModelForQuestionAnswering
+
+        model = AutoModelForQuestionAnswering.from_pretrained(model_name)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        logger.info(f"Modelo QA {model_name} carregado com quantização dinâmica int8")
+        # Os kernels int8 dinâmicos existem apenas em CPU
+        return pipeline("question-answering", model=model, tokenizer=tokenizer, device=-1)
+
+    return pipeline("question-answering", model=model_name, tokenizer=model_name, device=_device())
+
+
+def model_size_mb(qa_pipeline):
+    """Tamanho aproximado dos pesos em MB (parâmetros + buffers; ONNX pelo arquivo exportado)"""
+    model = qa_pipeline.model
+    if hasattr(model, "parameters"):
+        size = sum(p.numel() * p.element_size() for p in model.parameters())
+        size += sum(b.numel() * b.element_size() for b in model.buffers())
+        # Pesos int8 empacotados não aparecem em parameters()
+        for module in model.modules():
+            packed = getattr(module, "_packed_params", None)
+            if packed is not None and hasattr(packed, "_weight_bias"):
+                weight, bias = packed._weight_bias()
+                size += weight.numel() * weight.element_size()
+                if bias is not None:
+                    size += bias.numel() * bias.element_size()
+        return size / 2 ** 20
+    model_path = getattr(model, "model_path", None)
+    if model_path and os.path.exists(model_path):
+        return os.path.getsize(model_path) / 2 ** 20
+    return None
+
+
+def run_check(qa_pipeline, questions=CHECK_QUESTIONS, context=CHECK_CONTEXT, repeats=3):
+    """Respostas e latência média (ms) do pipeline no conjunto fixo de perguntas"""
+    qa_pipeline(question=questions[0], context=context)  # aquecimento
+    answers = []
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            result = qa_pipeline(question=question, context=context, max_answer_len=200)
+        latencies.append((time.perf_counter() - start) / repeats * 1000)
+        answers.append(result["answer"].strip())
+    return answers, sum(latencies) / len(latencies)
+
+
+def _token_f1(a, b):
+    a_tokens, b_tokens = a.lower().split(), b.lower().split()
+    common = sum(min(a_tokens.count(t), b_tokens.count(t)) for t in set(a_tokens))
+    if not common:
+        return 0.0
+    precision, recall = common / len(a_tokens), common / len(b_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def compare_backends(model_name, backends=("quantized", "onnx"), questions=CHECK_QUESTIONS, context=CHECK_CONTEXT):
+    """
+    Compara cada backend com o fp32 (torch): concordância das respostas, latência e tamanho
+
+    Returns:
+        Dict backend -> métricas
+    """
+    reference = load_qa_pipeline(model_name, "torch")
+    reference_answers, reference_ms = run_check(reference, questions, context)
+    report = {"torch": {"latency_ms": round(reference_ms, 1), "size_mb": model_size_mb(reference),
+                        "exact_match": 1.0, "token_f1": 1.0, "speedup": 1.0}}
+    del reference
+
+    for backend in backends:
+        qa = load_qa_pipeline(model_name, backend)
+        answers, latency_ms = run_check(qa, questions, context)
+        report[backend] = {
+            "latency_ms": round(latency_ms, 1),
+            "size_mb": model_size_mb(qa),
+            "exact_match": sum(a == r for a, r in zip(answers, reference_answers)) / len(questions),
+            "token_f1": round(sum(_token_f1(a, r) for a, r in zip(answers, reference_answers)) / len(questions), 3),
+            "speedup": round(reference_ms / latency_ms, 2) if latency_ms else None,
+            "disagreements": [
+                {"question": q, "fp32": r, backend: a}
+                for q, a, r in zip(questions, answers, reference_answers) if a != r
+            ]
+        }
+        del qa
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara backends de inferência do modelo de QA com o fp32")
+    parser.add_argument("--model", default="deepset/roberta-base-squad2")
+    parser.add_argument("--backends", nargs="+", default=["quantized", "onnx"], choices=QA_BACKENDS[1:])
+    args = parser.parse_args()
+
+    print(f"🔬 Verificação de backends para {args.model} ({len(CHECK_QUESTIONS)} perguntas)")
+    report = compare_backends(args.model, args.backends)
+    for backend, metrics in report.items():
+        size = f"{metrics['size_mb']:.0f} MB" if metrics["size_mb"] else "?"
+        print(f"  {backend:10s} {metrics['latency_ms']:8.1f} ms  x{metrics['speedup']}  {size:>8s}  "
+              f"EM={metrics['exact_match']:.2f}  F1={metrics['token_f1']:.2f}")
+        for item in metrics.get("disagreements", []):
+            print(f"    ≠ {item['question']}: '{item['fp32']}' vs '{item[backend]}'")
+    worst = min(metrics["token_f1"] for metrics in report.values())
+    sys.exit(0 if worst >= 0.8 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Micro-batching dinâmico para o pipeline de question-answering
+Requisições concorrentes são agrupadas por alguns milissegundos (ou até o tamanho
+máximo do lote) e executadas em um único forward pass com padding; cada chamador
+recebe o seu resultado. Com uma requisição isolada o custo extra é no máximo max_wait_ms.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get("QA_BATCH_MAX_SIZE", 8))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("QA_BATCH_MAX_WAIT_MS", 10))
+
+# Protege a (re)criação das threads de lote; recriada no filho de um fork, onde a herdada
+# pode ter ficado presa por uma thread que não existe mais
+_worker_lock = threading.Lock()
+
+
+def _reset_worker_lock():
+    global _worker_lock
+    _worker_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_worker_lock)
+
+
+class _Request:
+    """Uma ou mais perguntas de um mesmo chamador; sempre executadas no mesmo lote"""
+
+    __slots__ = ("questions", "contexts", "options", "single", "future", "enqueued_at")
+
+    def __init__(self, questions, contexts, options, single):
+        self.questions = questions
+        self.contexts = contexts
+        self.options = options
+        self.single = single
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+    def __len__(self):
+        return len(self.questions)
+
+
+class QABatcher:
+    def __init__(self, qa_pipeline, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        """
+        Args:
+            qa_pipeline: Pipeline "question-answering" do transformers
+            max_batch_size: Máximo de perguntas por forward pass (<= 1 desativa o batching)
+            max_wait_ms: Tempo máximo que a primeira pergunta do lote espera por companhia
+        """
+        self.pipeline = qa_pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_pid = None
+
+        # Métricas
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.questions = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.batch_sizes = {}
+        self.total_wait = 0.0
+        self.total_inference = 0.0
+
+    @property
+    def tokenizer(self):
+        return self.pipeline.tokenizer
+
+    @property
+    def model(self):
+        return self.pipeline.model
+
+    def __call__(self, question, context, **options):
+        """
+        Mesmo uso do pipeline: qa(question=..., context=..., max_answer_len=..., ...)
+
+        Uma lista de perguntas (ex.: variações da mesma pergunta) vai inteira para o mesmo
+        forward pass e volta como lista de resultados
+        """
+        return self.submit(question, context, **options).result()
+
+    def submit(self, question, context, **options):
+        """Enfileira a(s) pergunta(s) e retorna um Future com o resultado do pipeline"""
+        if isinstance(question, (list, tuple)):
+            contexts = list(context) if isinstance(context, (list, tuple)) else [context] * len(question)
+            request = _Request(list(question), contexts, options, single=False)
+        else:
+            request = _Request([question], [context], options, single=True)
+        if self.max_batch_size <= 1:
+            self._run_batch([request])
+            return request.future
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future
+
+    def _ensure_worker(self):
+        """Uma thread de lote por processo: depois de um fork (preload_app), o filho cria a sua"""
+        pid = os.getpid()
+        if self._worker_pid != pid:
+            with _worker_lock:
+                if self._worker_pid != pid:
+                    if self._worker_pid is not None:
+                        # A thread ficou no processo pai, e a fila herdada pode ter pedidos dele
+                        self._queue = queue.Queue()
+                    self._worker = threading.Thread(target=self._loop, args=(self._queue,), name="qa-batcher", daemon=True)
+                    self._worker.start()
+                    self._worker_pid = pid
+
+    def _loop(self, requests):
+        while True:
+            batch = [requests.get()]
+            size = len(batch[0])
+            deadline = batch[0].enqueued_at + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request)
+
+            # Parâmetros diferentes (ex.: max_answer_len) não podem dividir o mesmo forward pass
+            groups = {}
+            for request in batch:
+                groups.setdefault(tuple(sorted(request.options.items())), []).append(request)
+            for group in groups.values():
+                self._run_batch(group)
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        questions = [question for request in batch for question in request.questions]
+        try:
+            results = self.pipeline(
+                question=questions,
+                context=[context for request in batch for context in request.contexts],
+                batch_size=len(questions),
+                **batch[0].options
+            )
+            if isinstance(results, dict):
+                results = [results]
+            position = 0
+            for request in batch:
+                own = results[position:position + len(request)]
+                position += len(request)
+                request.future.set_result(own[0] if request.single else own)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+            else:
+                # Uma entrada inválida não derruba o lote inteiro: repete individualmente
+                logger.warning(f"Erro no lote de QA ({len(batch)} perguntas), repetindo individualmente: {e}")
+                for request in batch:
+                    self._run_batch([request])
+                return
+        self._record(batch, started)
+
+    def _record(self, batch, started):
+        finished = time.perf_counter()
+        size = sum(len(request) for request in batch)
+        with self._stats_lock:
+            self.requests += len(batch)
+            self.questions += size
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, size)
+            self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+            self.total_wait += sum(started - request.enqueued_at for request in batch)
+            self.total_inference += finished - started
+
+    def stats(self):
+        """Métricas de fila e lotes para o health check"""
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "requests": self.requests,
+                "questions": self.questions,
+                "batches": self.batches,
+                "avg_batch_size": round(self.questions / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "avg_wait_ms": round(1000 * self.total_wait / self.requests, 2) if self.requests else 0.0,
+                "avg_batch_ms": round(1000 * self.total_inference / self.batches, 2) if self.batches else 0.0
+            }
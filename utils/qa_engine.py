@@ -0,0 +1,338 @@
+"""
+Question-answering extrativo direto sobre o modelo (mesma interface do pipeline)
+Todas as perguntas de uma chamada vão em um único forward pass com padding: contextos
+iguais são tokenizados uma única vez e compartilhados entre as perguntas (ex.: variações
+da mesma pergunta), e a escolha do melhor span é feita sobre os logits do lote.
+Os chunks do corpus são tokenizados na indexação (pretokenize) e o contexto de cada
+pergunta é montado concatenando os tokens em cache, sem passar pelo tokenizer; pack()
+escolhe e corta as passagens para caber em uma única janela do modelo.
+"""
+
+import os
+import logging
+import threading
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SEQ_LEN = int(os.environ.get("QA_MAX_SEQ_LEN", 384))
+DEFAULT_DOC_STRIDE = int(os.environ.get("QA_DOC_STRIDE", 128))
+DEFAULT_TOKEN_CACHE_SIZE = int(os.environ.get("QA_TOKEN_CACHE_SIZE", 50000))
+# Sobra de orçamento menor que isso não vale um pedaço de passagem cortada
+MIN_PASSAGE_TOKENS = 32
+
+
+def _softmax(logits):
+    exp = np.exp(logits - logits.max())
+    return exp / exp.sum()
+
+
+class TokenizedContext:
+    """Contexto montado a partir de passagens já tokenizadas (texto = passagens unidas por espaço)"""
+
+    __slots__ = ("passages", "text", "ids", "offsets", "truncated", "dropped")
+
+    def __init__(self, passages, encoded, separator=" ", truncated=False, dropped=0):
+        """
+        Args:
+            passages: Textos das passagens (chunks), na ordem do contexto
+            encoded: (token_ids, offsets) de cada passagem, com offsets relativos à passagem
+            truncated: Alguma passagem foi cortada ou descartada para caber na janela
+            dropped: Quantas passagens ficaram de fora
+        """
+        self.passages = list(passages)
+        self.truncated = truncated
+        self.dropped = dropped
+        self.text = separator.join(self.passages)
+        self.ids = []
+        self.offsets = []
+        shift = 0
+        for passage, (ids, offsets) in zip(self.passages, encoded):
+            self.ids.extend(ids)
+            self.offsets.extend((start + shift, end + shift) for start, end in offsets)
+            shift += len(passage) + len(separator)
+
+    def __len__(self):
+        """Tamanho do contexto em tokens, conhecido antes da inferência"""
+        return len(self.ids)
+
+
+class _Feature:
+    """Uma janela (pergunta + trecho do contexto) do lote"""
+
+    __slots__ = ("item", "input_ids", "token_types", "context_start", "window_start", "window_length")
+
+    def __init__(self, item, input_ids, token_types, context_start, window_start, window_length):
+        self.item = item
+        self.input_ids = input_ids
+        self.token_types = token_types
+        self.context_start = context_start
+        self.window_start = window_start
+        self.window_length = window_length
+
+
+class QAEngine:
+    def __init__(self, qa_pipeline, max_seq_len=DEFAULT_MAX_SEQ_LEN, doc_stride=DEFAULT_DOC_STRIDE):
+        """
+        Args:
+            qa_pipeline: Pipeline "question-answering" (fornece tokenizer e modelo de qualquer backend)
+            max_seq_len: Tamanho máximo da janela em tokens (pergunta + contexto + especiais)
+            doc_stride: Sobreposição entre janelas quando o contexto não cabe em uma só
+        """
+        self.pipeline = qa_pipeline
+        self.tokenizer = qa_pipeline.tokenizer
+        self.model = qa_pipeline.model
+        self.max_seq_len = min(max_seq_len, self.tokenizer.model_max_length)
+        self.doc_stride = doc_stride
+        self.uses_token_types = "token_type_ids" in self.tokenizer.model_input_names
+
+        # Chunk -> (token_ids, offsets); preenchido na indexação e, para chunks novos, sob demanda
+        self.token_cache_size = DEFAULT_TOKEN_CACHE_SIZE
+        self._token_cache = {}
+        self._token_cache_lock = threading.Lock()
+
+        # Métricas: janelas por pergunta (1.0 quando o contexto é empacotado) e cortes do pack()
+        self._stats_lock = threading.Lock()
+        self.questions = 0
+        self.windows = 0
+        self.packed = 0
+        self.truncated = 0
+
+    def encode_context(self, context):
+        """Token IDs e offsets (início, fim) em caracteres do contexto, sem tokens especiais"""
+        if isinstance(context, TokenizedContext):
+            return context.ids, context.offsets
+        encoding = self.tokenizer(context, add_special_tokens=False, return_offsets_mapping=True)
+        return encoding["input_ids"], encoding["offset_mapping"]
+
+    def pretokenize(self, chunks):
+        """Tokeniza (em lote) e guarda em cache os chunks ainda não vistos; retorna quantos foram tokenizados"""
+        with self._token_cache_lock:
+            missing = list(dict.fromkeys(chunk for chunk in chunks if chunk not in self._token_cache))
+        if not missing:
+            return 0
+        encoding = self.tokenizer(missing, add_special_tokens=False, return_offsets_mapping=True)
+        with self._token_cache_lock:
+            for chunk, ids, offsets in zip(missing, encoding["input_ids"], encoding["offset_mapping"]):
+                self._token_cache[chunk] = (ids, [tuple(offset) for offset in offsets])
+            # Chunks de versões antigas do corpus saem primeiro
+            while len(self._token_cache) > self.token_cache_size:
+                del self._token_cache[next(iter(self._token_cache))]
+        logger.info(f"Tokens em cache para {len(missing)} chunks ({len(self._token_cache)} no total)")
+        return len(missing)
+
+    def _encoded_passages(self, passages):
+        self.pretokenize(passages)
+        with self._token_cache_lock:
+            encoded = [self._token_cache.get(passage) for passage in passages]
+        # Passagem removida do cache entre as duas etapas: tokeniza só ela
+        return [item if item is not None else self.encode_context(passage)
+                for item, passage in zip(encoded, passages)]
+
+    def context(self, passages):
+        """Contexto da pergunta montado com os tokens em cache das passagens (sem re-tokenizar)"""
+        passages = list(passages)
+        return TokenizedContext(passages, self._encoded_passages(passages))
+
+    def pack(self, passages, questions, scores=None):
+        """
+        Contexto que cabe em uma única janela do modelo junto com a maior das perguntas
+
+        As passagens entram por densidade de score (score / tokens); a primeira que não cabe
+        inteira é cortada no limite do orçamento e as demais ficam de fora. O contexto final
+        mantém a ordem original das passagens.
+
+        Args:
+            passages: Passagens (chunks) candidatas, em ordem de relevância
+            questions: Pergunta ou variações que serão feitas sobre o contexto
+            scores: Score de relevância de cada passagem (padrão: decrescente pela posição)
+
+        Returns:
+            TokenizedContext com truncated/dropped indicando se algo ficou de fora
+        """
+        passages = list(passages)
+        questions = [questions] if isinstance(questions, str) else list(questions)
+        if scores is None:
+            scores = [1.0 / (rank + 1) for rank in range(len(passages))]
+        encoded = self._encoded_passages(passages)
+        budget = min(self.context_budget(self.encode_question(q)) for q in questions)
+
+        order = sorted(range(len(passages)),
+                       key=lambda i: max(scores[i], 0.0) / max(len(encoded[i][0]), 1), reverse=True)
+        kept = {}
+        remaining = budget
+        for i in order:
+            n_tokens = len(encoded[i][0])
+            if n_tokens <= remaining:
+                kept[i] = n_tokens
+                remaining -= n_tokens
+            elif remaining >= MIN_PASSAGE_TOKENS:
+                kept[i] = remaining
+                remaining = 0
+        if not kept and passages:
+            # Nem a melhor passagem cabe: usa o começo dela
+            kept[order[0]] = max(budget, 1)
+
+        packed_passages = []
+        packed_encoded = []
+        truncated = False
+        for i in sorted(kept):
+            ids, offsets = encoded[i]
+            n_tokens = kept[i]
+            if n_tokens < len(ids):
+                truncated = True
+                ids, offsets = ids[:n_tokens], offsets[:n_tokens]
+                packed_passages.append(passages[i][:offsets[-1][1]])
+            else:
+                packed_passages.append(passages[i])
+            packed_encoded.append((ids, offsets))
+        dropped = len(passages) - len(kept)
+
+        with self._stats_lock:
+            self.packed += 1
+            self.truncated += bool(truncated or dropped)
+        if truncated or dropped:
+            logger.info(f"Contexto ajustado à janela de {budget} tokens: "
+                        f"{dropped} passagem(ns) descartada(s), corte parcial: {truncated}")
+        return TokenizedContext(packed_passages, packed_encoded, truncated=truncated or dropped > 0, dropped=dropped)
+
+    def encode_question(self, question):
+        return self.tokenizer(question, add_special_tokens=False)["input_ids"]
+
+    def context_budget(self, question_ids):
+        """Quantos tokens de contexto cabem em uma janela junto com a pergunta"""
+        return self.max_seq_len - len(question_ids) - self.tokenizer.num_special_tokens_to_add(pair=True)
+
+    def _window_starts(self, n_tokens, budget):
+        """Início de cada janela, com sobreposição doc_stride (como no pipeline)"""
+        starts = [0]
+        step = max(budget - self.doc_stride, 1)
+        while starts[-1] + budget < n_tokens:
+            starts.append(starts[-1] + step)
+        return starts
+
+    def _features(self, item, question_ids, context_ids):
+        budget = max(self.context_budget(question_ids), 1)
+        features = []
+        for window_start in self._window_starts(len(context_ids), budget):
+            window = context_ids[window_start:window_start + budget]
+            input_ids = self.tokenizer.build_inputs_with_special_tokens(question_ids, window)
+            special = self.tokenizer.get_special_tokens_mask(question_ids, window)
+            content = [position for position, flag in enumerate(special) if not flag]
+            token_types = (self.tokenizer.create_token_type_ids_from_sequences(question_ids, window)
+                           if self.uses_token_types else None)
+            features.append(_Feature(item, input_ids, token_types, content[len(question_ids)], window_start, len(window)))
+        return features
+
+    def _forward(self, features):
+        """Um único forward pass com padding para todas as janelas; retorna logits em numpy"""
+        length = max(len(feature.input_ids) for feature in features)
+        pad_id = self.tokenizer.pad_token_id or 0
+        input_ids = torch.full((len(features), length), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(features), length), dtype=torch.long)
+        token_type_ids = torch.zeros((len(features), length), dtype=torch.long) if self.uses_token_types else None
+        for row, feature in enumerate(features):
+            size = len(feature.input_ids)
+            input_ids[row, :size] = torch.tensor(feature.input_ids, dtype=torch.long)
+            attention_mask[row, :size] = 1
+            if token_type_ids is not None:
+                token_type_ids[row, :size] = torch.tensor(feature.token_types, dtype=torch.long)
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if token_type_ids is not None:
+            inputs["token_type_ids"] = token_type_ids
+        # Backend torch fica na GPU quando há CUDA: os tensores vão para o dispositivo do modelo
+        device = getattr(self.model, "device", None)
+        if device is not None:
+            inputs = {name: tensor.to(device) for name, tensor in inputs.items()}
+        with torch.no_grad():
+            outputs = self.model(**inputs)
+        start_logits, end_logits = outputs.start_logits, outputs.end_logits
+        if hasattr(start_logits, "detach"):
+            start_logits, end_logits = start_logits.detach().float().cpu().numpy(), end_logits.detach().float().cpu().numpy()
+        return np.asarray(start_logits), np.asarray(end_logits)
+
+    @staticmethod
+    def _best_span(start_logits, end_logits, feature, max_answer_len, handle_impossible_answer):
+        """Melhor span da janela: (início, fim) em tokens da janela, score e score de "sem resposta" """
+        size = len(feature.input_ids)
+        first, last = feature.context_start, feature.context_start + feature.window_length
+        # Apenas tokens do contexto (e o primeiro token, quando "sem resposta" é permitido) concorrem
+        masked = np.ones(size, dtype=bool)
+        masked[first:last] = False
+        if handle_impossible_answer:
+            masked[0] = False
+        start = _softmax(np.where(masked, -10000.0, start_logits[:size]))
+        end = _softmax(np.where(masked, -10000.0, end_logits[:size]))
+
+        scores = np.outer(start[first:last], end[first:last])
+        # Fim depois do início e no máximo max_answer_len tokens
+        scores = np.tril(np.triu(scores), max_answer_len - 1)
+        best = int(scores.argmax())
+        i, j = divmod(best, feature.window_length)
+        return i, j, float(scores[i, j]), float(start[0] * end[0])
+
+    def __call__(self, question, context, max_answer_len=15, handle_impossible_answer=False, batch_size=None, **options):
+        """
+        Mesmo uso do pipeline: qa(question=..., context=..., max_answer_len=..., handle_impossible_answer=...)
+
+        question e context podem ser listas (pares) ou uma lista de perguntas com um único contexto;
+        context pode ser str ou TokenizedContext (ver context())
+
+        Returns:
+            Dict {score, start, end, answer} (ou lista de dicts para uma lista de perguntas)
+        """
+        single = not isinstance(question, (list, tuple))
+        questions = [question] if single else list(question)
+        contexts = list(context) if isinstance(context, (list, tuple)) else [context] * len(questions)
+
+        # Contextos repetidos (variações da pergunta, lote do batcher) são tokenizados uma vez
+        encoded_contexts = {}
+        features = []
+        for item, (q, c) in enumerate(zip(questions, contexts)):
+            if c not in encoded_contexts:
+                encoded_contexts[c] = self.encode_context(c)
+            context_ids = encoded_contexts[c][0]
+            if context_ids:
+                features.extend(self._features(item, self.encode_question(q), context_ids))
+
+        with self._stats_lock:
+            self.questions += len(questions)
+            self.windows += len(features)
+
+        results = [{"score": 0.0, "start": 0, "end": 0, "answer": ""} for _ in questions]
+        if features:
+            start_logits, end_logits = self._forward(features)
+            best = {}
+            null_scores = {}
+            for row, feature in enumerate(features):
+                i, j, score, null_score = self._best_span(start_logits[row], end_logits[row], feature,
+                                                          max_answer_len, handle_impossible_answer)
+                null_scores[feature.item] = min(null_score, null_scores.get(feature.item, null_score))
+                if feature.item not in best or score > best[feature.item][0]:
+                    best[feature.item] = (score, feature.window_start + i, feature.window_start + j)
+
+            for item, (score, start_token, end_token) in best.items():
+                if handle_impossible_answer and null_scores[item] > score:
+                    results[item] = {"score": null_scores[item], "start": 0, "end": 0, "answer": ""}
+                    continue
+                context_item = contexts[item]
+                offsets = encoded_contexts[context_item][1]
+                text = context_item.text if isinstance(context_item, TokenizedContext) else context_item
+                start_char, end_char = offsets[start_token][0], offsets[end_token][1]
+                results[item] = {"score": score, "start": start_char, "end": end_char,
+                                 "answer": text[start_char:end_char]}
+        return results[0] if single else results
+
+    def stats(self):
+        """Janelas por pergunta e contextos cortados pelo pack()"""
+        with self._stats_lock:
+            return {
+                "questions": self.questions,
+                "windows": self.windows,
+                "windows_per_question": round(self.windows / self.questions, 2) if self.questions else 0.0,
+                "packed_contexts": self.packed,
+                "truncated_contexts": self.truncated
+            }
@@ -0,0 +1,88 @@
+"""
+Cache LRU dos embeddings das perguntas
+Compartilhado entre personalidades e doenças: a mesma pergunta feita para o
+Dr. Gasnelio e para o Gá é codificada uma única vez
+"""
+
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", 2048))
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_question(question):
+    """Forma canônica da pergunta: minúsculas, espaços colapsados, sem pontuação final"""
+    return WHITESPACE_PATTERN.sub(' ', question.lower()).strip().rstrip('?!.').strip()
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            max_size: Quantidade máxima de perguntas guardadas (as menos usadas saem primeiro)
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, embedding_model, question, model_name):
+        """
+        Embedding da pergunta, calculado apenas na primeira vez
+
+        Args:
+            embedding_model: Modelo SentenceTransformer
+            question: Texto da pergunta
+            model_name: Nome do modelo (faz parte da chave)
+
+        Returns:
+            Vetor do embedding (somente leitura, compartilhado entre requisições)
+        """
+        key = (model_name, normalize_question(question))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+            self.misses += 1
+
+        # Codificação fora do lock: perguntas diferentes não esperam umas pelas outras
+        embedding = embedding_model.encode(key[1])
+        if hasattr(embedding, "setflags"):
+            embedding.setflags(write=False)
+
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return embedding
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Contadores para o health check"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+# Instância única do processo
+query_embedding_cache = QueryEmbeddingCache()
@@ -0,0 +1,149 @@
+"""
+Limitador token bucket por chave de API (cotas por minuto dos modelos :free)
+Cada chamada consome uma ficha; as fichas voltam na taxa configurada até o limite do burst.
+Sem ficha, a chamada entra numa fila limitada e espera a sua vez, desde que a espera caiba
+no prazo; senão é recusada na hora (RateLimitExceeded) para seguir para outra chave/modelo
+em vez de gerar um 429 no provedor.
+O bucket vive em cada processo: com WEB_CONCURRENCY workers do gunicorn, cada um fica com
+a sua fração da cota (taxa e burst divididos), para que a soma não passe do limite da chave.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+def per_worker_quota(rate_per_minute, burst, workers):
+    """Fração da cota da chave para um worker: taxa dividida e burst de pelo menos uma ficha"""
+    workers = max(1, workers)
+    return rate_per_minute / workers, max(1, burst // workers)
+
+
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", 1))
+DEFAULT_RATE_PER_MINUTE, DEFAULT_BURST = per_worker_quota(
+    float(os.environ.get("RATE_LIMIT_PER_MINUTE", 20)), int(os.environ.get("RATE_LIMIT_BURST", 5)), WORKERS
+)
+DEFAULT_MAX_QUEUE = int(os.environ.get("RATE_LIMIT_MAX_QUEUE", 10))
+DEFAULT_MAX_WAIT = float(os.environ.get("RATE_LIMIT_MAX_WAIT_S", 3))
+
+
+class RateLimitExceeded(Exception):
+    """Chamada recusada pelo limitador local (fila cheia ou espera maior que o prazo)"""
+
+
+class TokenBucket:
+    def __init__(self, name, rate_per_minute=DEFAULT_RATE_PER_MINUTE, burst=DEFAULT_BURST,
+                 max_queue=DEFAULT_MAX_QUEUE):
+        """
+        Args:
+            name: Identificação no health check (os modelos da chave, nunca a chave)
+            rate_per_minute: Chamadas por minuto permitidas pela cota
+            burst: Fichas acumuladas no máximo (chamadas seguidas sem esperar)
+            max_queue: Chamadas esperando ficha ao mesmo tempo
+        """
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_queue = max_queue
+
+        # Fichas podem ficar negativas: cada chamada na fila reserva a sua (ordem de chegada)
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.queued = 0
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def _reserve(self, max_wait):
+        """Reserva uma ficha: segundos de espera até ela valer; levanta RateLimitExceeded"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max((1 - self.tokens) / self.rate, self.blocked_until - now, 0.0)
+            if wait > 0 and self.queued >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise RateLimitExceeded(f"Fila do limitador cheia para {self.name}")
+            if wait > max_wait:
+                self.rejected_deadline += 1
+                raise RateLimitExceeded(f"Espera de {wait:.1f}s pelo limitador de {self.name} passa do prazo")
+            self.tokens -= 1
+            self.admitted += 1
+            if wait > 0:
+                self.queued += 1
+                self.delayed += 1
+                self.total_wait += wait
+                self.max_wait_seen = max(self.max_wait_seen, wait)
+            return wait
+
+    def _leave_queue(self, refund=False):
+        with self._lock:
+            self.queued -= 1
+            if refund:
+                self.tokens += 1
+                self.admitted -= 1
+
+    def acquire(self, max_wait=DEFAULT_MAX_WAIT):
+        """Espera (no máximo max_wait segundos) pela vez da chamada; devolve a espera"""
+        wait = self._reserve(max_wait)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                self._leave_queue()
+        return wait
+
+    async def acquire_async(self, max_wait=DEFAULT_MAX_WAIT):
+        """Versão assíncrona de acquire(); se a espera for cancelada, a ficha é devolvida"""
+        wait = self._reserve(max_wait)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._leave_queue(refund=True)
+                raise
+            self._leave_queue()
+        return wait
+
+    def penalize(self, seconds):
+        """O provedor respondeu 429 mesmo assim: zera as fichas e segura novas chamadas por `seconds`"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+            self.blocked_until = max(self.blocked_until, now + seconds)
+        logger.warning(f"429 do provedor para {self.name}: fichas zeradas, novas chamadas seguradas por {seconds:g}s")
+
+    def stats(self):
+        """Fichas, fila e métricas de espera/recusa para o health check"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "name": self.name,
+                "rate_per_minute": round(self.rate * 60, 2),
+                "burst": self.burst,
+                "tokens": round(self.tokens, 2),
+                "queued": self.queued,
+                "max_queue": self.max_queue,
+                "blocked_for_s": round(max(self.blocked_until - now, 0.0), 1),
+                "admitted": self.admitted,
+                "delayed": self.delayed,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_deadline": self.rejected_deadline,
+                "avg_wait_ms": round(1000 * self.total_wait / self.delayed, 1) if self.delayed else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait_seen, 1)
+            }
@@ -0,0 +1,144 @@
+"""
+Cache semântico das respostas dos LLMs remotos
+A pergunta é comparada (cosseno dos embeddings) com as já respondidas para a mesma persona
+e a mesma versão do corpus; acima do limiar, a resposta guardada é reaproveitada sem
+chamar o modelo remoto. Entradas expiram por TTL e as menos usadas saem primeiro (LRU).
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.embedding_index import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.95))
+DEFAULT_MAX_SIZE = int(os.environ.get("SEMANTIC_CACHE_SIZE", 512))
+DEFAULT_TTL = float(os.environ.get("SEMANTIC_CACHE_TTL", 3600))
+
+# Faixas do histograma de similaridade da melhor entrada em cada consulta
+SIMILARITY_BUCKETS = (0.5, 0.7, 0.8, 0.9, 0.95)
+
+
+class CachedAnswer:
+    __slots__ = ("partition", "question", "embedding", "answer", "metadata", "created_at")
+
+    def __init__(self, partition, question, embedding, answer, metadata):
+        self.partition = partition
+        self.question = question
+        self.embedding = embedding
+        self.answer = answer
+        self.metadata = metadata
+        self.created_at = time.monotonic()
+
+
+class SemanticCache:
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+        """
+        Args:
+            threshold: Similaridade mínima (cosseno) para reaproveitar uma resposta
+            max_size: Máximo de respostas guardadas (LRU entre todas as personas)
+            ttl: Segundos até uma resposta expirar
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # id -> CachedAnswer, do menos para o mais usado
+        self._matrices = {}  # partição -> (ids, matriz de embeddings), refeita quando a partição muda
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.histogram = [0] * (len(SIMILARITY_BUCKETS) + 1)
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        self._matrices.pop(entry.partition, None)
+
+    def _partition_matrix(self, partition):
+        cached = self._matrices.get(partition)
+        if cached is None:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry.partition == partition]
+            matrix = np.stack([self._entries[entry_id].embedding for entry_id in ids]) if ids else None
+            cached = self._matrices[partition] = (ids, matrix)
+        return cached
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [entry_id for entry_id, entry in self._entries.items() if now - entry.created_at > self.ttl]
+        for entry_id in expired:
+            self._remove(entry_id)
+        self.expired += len(expired)
+
+    def lookup(self, persona, corpus_version, embedding):
+        """
+        Resposta já dada a uma pergunta equivalente
+
+        Returns:
+            (CachedAnswer ou None, similaridade da entrada mais próxima)
+        """
+        partition = (persona, corpus_version)
+        query = normalize_rows(embedding)
+        with self._lock:
+            self._purge_expired()
+            ids, matrix = self._partition_matrix(partition)
+            if matrix is None:
+                self.misses += 1
+                return None, 0.0
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            self.histogram[int(np.searchsorted(SIMILARITY_BUCKETS, similarity, side="right"))] += 1
+            if similarity < self.threshold:
+                self.misses += 1
+                return None, similarity
+            self.hits += 1
+            self._entries.move_to_end(ids[best])
+            return self._entries[ids[best]], similarity
+
+    def store(self, persona, corpus_version, question, embedding, answer, metadata=None):
+        """Guarda a resposta de uma pergunta para consultas futuras"""
+        partition = (persona, corpus_version)
+        entry = CachedAnswer(partition, question, normalize_rows(embedding), answer, metadata or {})
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            self._matrices.pop(partition, None)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def stats(self):
+        """Taxa de acerto e distribuição das similaridades para o health check"""
+        with self._lock:
+            total = self.hits + self.misses
+            edges = (0.0,) + SIMILARITY_BUCKETS + (1.0,)
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "similarity_histogram": {
+                    f"{low:.2f}-{high:.2f}": count
+                    for low, high, count in zip(edges, edges[1:], self.histogram)
+                }
+            }
@@ -0,0 +1,55 @@
+"""
+Server-Sent Events para as respostas do chat
+O cabeçalho da persona é enviado antes de qualquer processamento e a resposta segue em
+trechos (tokens do OpenRouter com stream: true, ou a resposta inteira do QA local).
+
+Eventos: header {text}, delta {text}, done {metadados} e error {error}
+"""
+
+import json
+
+PERSONA_HEADERS = {
+    "dr_gasnelio": "Dr. Gasnelio responde:\n\n",
+    "ga": "Gá responde:\n\n",
+}
+
+# Sem cache e sem buffer em proxies (nginx/Render), para cada evento sair na hora
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event, data):
+    """Um evento SSE com dados em JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def strip_persona_header(persona, text):
+    """Remove o cabeçalho da persona do início da resposta (ele já foi enviado no evento header)"""
+    header = PERSONA_HEADERS.get(persona, "").strip()
+    if header and text.startswith(header):
+        return text[len(header):].lstrip()
+    return text
+
+
+def iter_openrouter_deltas(response):
+    """Trechos de texto de uma resposta do OpenRouter com stream: true (requests com stream=True)"""
+    # text/event-stream sem charset: o requests assumiria ISO-8859-1
+    response.encoding = "utf-8"
+    # chunk_size=None: cada trecho é entregue assim que chega (o padrão espera juntar 512 bytes)
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        # Linhas vazias separam eventos; ": OPENROUTER PROCESSING" é comentário de keep-alive
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            break
+        chunk = json.loads(payload)
+        if "error" in chunk:
+            error = chunk["error"]
+            raise RuntimeError(error.get("message", error) if isinstance(error, dict) else error)
+        choices = chunk.get("choices") or []
+        delta = choices[0].get("delta", {}).get("content") if choices else None
+        if delta:
+            yield delta
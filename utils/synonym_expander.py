@@ -0,0 +1,92 @@
+"""
+Expansão de consultas por sinônimos com um único padrão compilado
+Todos os termos do dicionário viram uma alternação regex construída uma vez;
+cada pergunta é percorrida uma única vez e gera termos ponderados para o retriever,
+em vez de uma pergunta reescrita por sinônimo
+"""
+
+import re
+
+from utils.bm25 import tokenize
+
+DEFAULT_SYNONYM_WEIGHT = 0.5
+
+# Palavras de ligação das expressões com várias palavras (ex.: "doença de hansen")
+STOPWORDS = frozenset({'a', 'o', 'e', 'de', 'da', 'do', 'das', 'dos', 'em', 'na', 'no', 'não'})
+
+
+class SynonymExpander:
+    def __init__(self, synonyms, synonym_weight=DEFAULT_SYNONYM_WEIGHT):
+        """
+        Compila o dicionário de sinônimos
+
+        Args:
+            synonyms: Dicionário termo -> lista de sinônimos (o grupo inteiro é intercambiável)
+            synonym_weight: Peso dos termos adicionados pela expansão (os da pergunta valem 1.0)
+        """
+        self.synonym_weight = synonym_weight
+
+        # Termo (minúsculo) -> termos relacionados: o termo e seus sinônimos formam um grupo
+        related = {}
+        # Substituto preferido de cada termo nas variações da pergunta (termo principal <-> 1º sinônimo)
+        self.replacements = {}
+        for term, group in synonyms.items():
+            members = {term.lower()} | {synonym.lower() for synonym in group}
+            for member in members:
+                related.setdefault(member, set()).update(members - {member})
+            if group:
+                self.replacements.setdefault(term.lower(), group[0].lower())
+                for synonym in group:
+                    self.replacements.setdefault(synonym.lower(), term.lower())
+
+        # Tokens de expansão pré-calculados por termo
+        self.expansions = {
+            term: frozenset(token for phrase in phrases for token in tokenize(phrase) if token not in STOPWORDS)
+            for term, phrases in related.items()
+        }
+
+        # Mais longos primeiro: "isolamento social" vence "isolamento" na mesma posição
+        alternatives = sorted(self.expansions, key=len, reverse=True)
+        self.pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, alternatives)) + r')\b') if alternatives else None
+
+    def find(self, question):
+        """Termos do dicionário presentes na pergunta (uma passada sobre o texto)"""
+        if self.pattern is None:
+            return []
+        return self.pattern.findall(question.lower())
+
+    def expand(self, question):
+        """
+        Termos ponderados da pergunta expandida
+
+        Returns:
+            Dict termo -> peso (pergunta = 1.0, sinônimos = synonym_weight), pronto para BM25Retriever.search
+        """
+        weights = {token: 1.0 for token in tokenize(question)}
+        for match in self.find(question):
+            for token in self.expansions[match]:
+                if token not in weights:
+                    weights[token] = self.synonym_weight
+        return weights
+
+    def variants(self, question, limit=2):
+        """
+        Variações da pergunta trocando termos do dicionário pelo substituto preferido
+
+        Returns:
+            Até limit perguntas reescritas (uma troca por variação), sem repetir a original
+        """
+        if self.pattern is None:
+            return []
+        lowered = question.lower()
+        variants = []
+        for match in self.pattern.finditer(lowered):
+            replacement = self.replacements.get(match.group(0))
+            if replacement is None:
+                continue
+            variant = lowered[:match.start()] + replacement + lowered[match.end():]
+            if variant != lowered and variant not in variants:
+                variants.append(variant)
+            if len(variants) >= limit:
+                break
+        return variants
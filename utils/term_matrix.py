@@ -0,0 +1,51 @@
+"""
+Matriz esparsa chunk x termo para a pontuação por palavras-chave
+Construída uma vez por corpus em formato CSC (uma coluna de chunks por termo),
+então a sobreposição pergunta/chunk vira um único produto matriz-vetor esparso
+"""
+
+from itertools import chain
+
+import numpy as np
+
+from utils.bm25 import tokenize
+
+
+class TermMatrix:
+    """Presença (0/1) de cada termo em cada chunk: indptr/indices no formato CSC"""
+
+    def __init__(self, chunks):
+        columns = {}
+        for row, chunk in enumerate(chunks):
+            for term in set(tokenize(chunk)):
+                columns.setdefault(term, []).append(row)
+
+        self.n_rows = len(chunks)
+        self.vocabulary = {term: col for col, term in enumerate(columns)}
+        lengths = np.fromiter((len(rows) for rows in columns.values()), dtype=np.int64, count=len(columns))
+        self.indptr = np.zeros(len(columns) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        self.indices = np.fromiter(chain.from_iterable(columns.values()), dtype=np.int32, count=int(self.indptr[-1]))
+
+    def __len__(self):
+        return self.n_rows
+
+    def dot(self, term_weights):
+        """
+        Produto matriz-vetor com os pesos da pergunta
+
+        Args:
+            term_weights: Dict termo -> peso (ex.: SynonymExpander.expand)
+
+        Returns:
+            Array com, para cada chunk, a soma dos pesos dos termos presentes nele
+        """
+        columns = [(self.vocabulary[term], weight) for term, weight in term_weights.items() if term in self.vocabulary]
+        if not columns:
+            return np.zeros(self.n_rows, dtype=np.float32)
+        cols = np.fromiter((col for col, _ in columns), dtype=np.int64, count=len(columns))
+        weights = np.fromiter((weight for _, weight in columns), dtype=np.float32, count=len(columns))
+        starts = self.indptr[cols]
+        counts = self.indptr[cols + 1] - starts
+        rows = np.concatenate([self.indices[start:start + count] for start, count in zip(starts, counts)])
+        return np.bincount(rows, weights=np.repeat(weights, counts), minlength=self.n_rows).astype(np.float32)
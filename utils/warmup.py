@@ -0,0 +1,144 @@
+"""
+Inicialização em fases
+O servidor HTTP sobe imediatamente; modelos e corpus são carregados em uma thread de
+fundo (com uma inferência de aquecimento) e cada componente informa se já está pronto.
+Requisições que chegam antes esperam no máximo WARMUP_WAIT_SECONDS e, depois disso,
+usam a resposta de contingência do ponto de entrada.
+
+Threads não sobrevivem ao fork: com preload_app do gunicorn o módulo é importado no master,
+então a carga começa em cada worker (hook post_worker_init chamando start_all(), ou na
+primeira espera/health check do processo), nunca no import.
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WAIT_SECONDS = float(os.environ.get("WARMUP_WAIT_SECONDS", 10))
+
+# Instâncias criadas no processo (start_all as inicia depois do fork)
+_instances = []
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class _Component:
+    __slots__ = ("name", "load", "status", "error", "started_at", "seconds", "done")
+
+    def __init__(self, name, load):
+        self.name = name
+        self.load = load
+        self.status = PENDING
+        self.error = None
+        self.started_at = None
+        self.seconds = None
+        self.done = threading.Event()
+
+
+class Warmup:
+    def __init__(self, name="warmup"):
+        """
+        Args:
+            name: Nome da thread de fundo (aparece nos logs)
+        """
+        self.name = name
+        self.components = {}
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        _instances.append(self)
+
+    def add(self, component, load):
+        """Registra um componente; os componentes carregam na ordem em que foram registrados"""
+        self.components[component] = _Component(component, load)
+        return self
+
+    def start(self):
+        """
+        Carrega os componentes em uma thread de fundo, uma vez por processo (chamadas repetidas
+        não fazem nada); num processo filho, o que não estava pronto antes do fork é recarregado
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                if self._pid is not None:
+                    self._reset_unfinished()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def _reset_unfinished(self):
+        """A thread de carga ficou no processo pai: o que ela não concluiu volta a pending"""
+        for name, component in self.components.items():
+            if component.status != READY:
+                self.components[name] = _Component(name, component.load)
+
+    def run(self):
+        """Carrega os componentes na thread atual; uma falha não impede os seguintes"""
+        for component in self.components.values():
+            if component.done.is_set():
+                continue
+            component.status = LOADING
+            component.started_at = datetime.now().isoformat()
+            start = time.perf_counter()
+            try:
+                component.load()
+                component.status = READY
+            except Exception as e:
+                component.status = FAILED
+                component.error = str(e)
+                logger.error(f"Erro ao carregar {component.name}: {e}")
+            component.seconds = time.perf_counter() - start
+            component.done.set()
+            if component.status == READY:
+                logger.info(f"{component.name} pronto em {component.seconds:.1f}s")
+        return self
+
+    def ready(self, component=None):
+        """Se o componente (ou todos, sem argumento) está pronto"""
+        names = [component] if component else list(self.components)
+        return all(self.components[name].status == READY for name in names)
+
+    def loading(self, component=None):
+        """Se o componente (ou algum, sem argumento) ainda não terminou de carregar"""
+        names = [component] if component else list(self.components)
+        return any(self.components[name].status in (PENDING, LOADING) for name in names)
+
+    def wait(self, component=None, timeout=DEFAULT_WAIT_SECONDS):
+        """Espera o componente (ou todos) terminar de carregar, por no máximo timeout segundos"""
+        self.start()
+        deadline = time.perf_counter() + timeout
+        names = [component] if component else list(self.components)
+        for name in names:
+            if not self.components[name].done.wait(max(deadline - time.perf_counter(), 0)):
+                return False
+        return self.ready(component)
+
+    def report(self):
+        """Prontidão por componente para o health check"""
+        self.start()
+        return {
+            "ready": self.ready(),
+            "components": {
+                component.name: {
+                    "status": component.status,
+                    "started_at": component.started_at,
+                    "seconds": round(component.seconds, 2) if component.seconds is not None else None,
+                    "error": component.error
+                }
+                for component in self.components.values()
+            }
+        }
+
+
+def start_all():
+    """Inicia neste processo a carga de todas as instâncias (hook post_worker_init do gunicorn)"""
+    for warmup in _instances:
+        warmup.start()